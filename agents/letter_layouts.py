@@ -0,0 +1,301 @@
+"""
+Reportlab layouts for the sanction letters, with per-process caching.
+
+Style sheets, ParagraphStyles, TableStyles and the static blocks of each
+letter (header, terms and conditions, signature) are built once per process.
+A request only lays out the customer and loan tables and the handful of
+paragraphs that carry customer values; static flowables are shallow-copied
+so their parsed markup is reused while wrap state stays per build.
+
+Imported by agents.sanction_renderer on the first render, so reportlab is
+only loaded by processes that actually draw a letter.
+"""
+
+import copy
+import io
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import letter, A4
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+
+from .sanction_renderer import calculate_emi
+
+
+class LetterRenderer(ABC):
+    """Base renderer: static parts are built lazily, once per process"""
+
+    pagesize = A4
+    doc_kwargs = {}
+
+    def __init__(self):
+        self._static = None
+        self._lock = threading.Lock()
+
+    def static_parts(self):
+        if self._static is None:
+            with self._lock:
+                if self._static is None:
+                    self._static = self.build_static()
+        return self._static
+
+    @abstractmethod
+    def build_static(self):
+        """Flowables and styles shared by every letter of this layout"""
+
+    @abstractmethod
+    def build_story(self, static, customer_data, today):
+        """The flowables for one customer's letter"""
+
+    def render(self, customer_data, today=None):
+        """Render a letter into a BytesIO positioned at the start"""
+        static = self.static_parts()
+        buffer = io.BytesIO()
+        doc = SimpleDocTemplate(buffer, pagesize=self.pagesize, **self.doc_kwargs)
+        doc.build(self.build_story(static, customer_data, today or datetime.now()))
+        buffer.seek(0)
+        return buffer
+
+
+class StaticParagraph(Paragraph):
+    """Paragraph whose line breaking is memoised per available width.
+
+    The cache dict is shared by every shallow copy, so a static block is
+    broken into lines once per process rather than once per letter.
+    """
+
+    def __init__(self, text, style):
+        Paragraph.__init__(self, text, style)
+        self._wrap_cache = {}
+
+    def wrap(self, availWidth, availHeight):
+        cached = self._wrap_cache.get(availWidth)
+        if cached is None:
+            Paragraph.wrap(self, availWidth, availHeight)
+            self._wrap_cache[availWidth] = (self._wrapWidths, self.blPara, self.height)
+        else:
+            self.width = availWidth
+            self._wrapWidths, self.blPara, self.height = cached
+        return self.width, self.height
+
+
+def _reuse(flowables):
+    """Fresh shallow copies of cached flowables for one build"""
+    return [copy.copy(f) for f in flowables]
+
+
+class SanctionLetterRenderer(LetterRenderer):
+    """A4 sanction letter issued by SanctionAgent"""
+
+    pagesize = A4
+
+    def build_static(self):
+        styles = getSampleStyleSheet()
+        title_style = ParagraphStyle(
+            'CustomTitle',
+            parent=styles['Heading1'],
+            fontSize=16,
+            textColor=colors.HexColor('#003366'),
+            spaceAfter=12,
+            alignment=1
+        )
+        heading_style = ParagraphStyle(
+            'CustomHeading',
+            parent=styles['Heading2'],
+            fontSize=12,
+            textColor=colors.HexColor('#003366'),
+            spaceAfter=6
+        )
+        normal_style = ParagraphStyle(
+            'CustomNormal',
+            parent=styles['Normal'],
+            fontSize=10,
+            spaceAfter=6
+        )
+        table_style = TableStyle([
+            ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#E8F0F7')),
+            ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), 10),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+            ('GRID', (0, 0), (-1, -1), 1, colors.grey),
+        ])
+
+        terms_text = """
+        1. This sanction letter is valid for 30 days from the date of issue.<br/>
+        2. The loan is subject to satisfactory completion of all formalities and documentation.<br/>
+        3. The interest rate is fixed for the entire tenure of the loan.<br/>
+        4. Prepayment is allowed without any penalty.<br/>
+        5. The borrower must maintain a minimum balance as per bank norms.<br/>
+        6. All terms and conditions as per the loan agreement shall apply.
+        """
+
+        return {
+            'normal': normal_style,
+            'table_style': table_style,
+            'header': [
+                StaticParagraph("TATA CAPITAL LIMITED", title_style),
+                StaticParagraph("Personal Loan Sanction Letter", heading_style),
+                Spacer(1, 0.2*inch),
+            ],
+            'customer_heading': [StaticParagraph("<b>CUSTOMER DETAILS</b>", heading_style)],
+            'loan_heading': [StaticParagraph("<b>LOAN DETAILS</b>", heading_style)],
+            'footer': [
+                StaticParagraph("<b>TERMS & CONDITIONS</b>", heading_style),
+                StaticParagraph(terms_text, normal_style),
+                Spacer(1, 0.3*inch),
+                StaticParagraph("_" * 50, normal_style),
+                StaticParagraph("Authorized Signatory<br/>Tata Capital Limited", normal_style),
+            ],
+        }
+
+    def build_story(self, static, customer_data, today):
+        normal_style = static['normal']
+        elements = _reuse(static['header'])
+
+        # Date and Reference
+        elements.append(Paragraph(f"<b>Date:</b> {today.strftime('%d-%m-%Y')}", normal_style))
+        elements.append(Paragraph(f"<b>Reference No:</b> TCL/PL/{customer_data.get('customer_id', 'XXXX')}/{today.strftime('%Y%m%d')}", normal_style))
+        elements.append(Spacer(1, 0.2*inch))
+
+        # Customer Details
+        elements.extend(_reuse(static['customer_heading']))
+        customer_table = Table([
+            ['Name', customer_data.get('name', 'N/A')],
+            ['Customer ID', customer_data.get('customer_id', 'N/A')],
+            ['Age', str(customer_data.get('age', 'N/A'))],
+            ['City', customer_data.get('city', 'N/A')],
+            ['Phone', customer_data.get('phone', 'N/A')],
+            ['Email', customer_data.get('email', 'N/A')],
+        ], colWidths=[2*inch, 4*inch])
+        customer_table.setStyle(static['table_style'])
+        elements.append(customer_table)
+        elements.append(Spacer(1, 0.2*inch))
+
+        # Loan Details
+        elements.extend(_reuse(static['loan_heading']))
+        loan_amount = customer_data.get('loan_amount', 0)
+        interest_rate = 12.0
+        tenure = 36
+        emi = calculate_emi(loan_amount, interest_rate, tenure)
+        total_amount = emi * tenure
+
+        loan_table = Table([
+            ['Loan Amount', f"₹{loan_amount:,.2f}"],
+            ['Interest Rate', f"{interest_rate}% p.a."],
+            ['Tenure', f"{tenure} months"],
+            ['Monthly EMI', f"₹{emi:,.2f}"],
+            ['Total Amount Payable', f"₹{total_amount:,.2f}"],
+            ['Credit Score', str(customer_data.get('credit_score', 'N/A'))],
+        ], colWidths=[2*inch, 4*inch])
+        loan_table.setStyle(static['table_style'])
+        elements.append(loan_table)
+        elements.append(Spacer(1, 0.2*inch))
+
+        # Terms and Conditions, Signature
+        elements.extend(_reuse(static['footer']))
+        return elements
+
+
+class SummaryLetterRenderer(LetterRenderer):
+    """Letter-size sanction summary issued by the mock agent"""
+
+    pagesize = letter
+    doc_kwargs = {'topMargin': 50, 'bottomMargin': 50}
+
+    def build_static(self):
+        styles = getSampleStyleSheet()
+        normal = styles['Normal']
+        table_style = TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 12),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black)
+        ])
+
+        return {
+            'normal': normal,
+            'table_style': table_style,
+            'header': [
+                StaticParagraph("<b>TATA CAPITAL LIMITED</b>", styles['Title']),
+                Spacer(1, 20),
+                StaticParagraph("<b>PERSONAL LOAN SANCTION LETTER</b>", styles['Heading2']),
+                Spacer(1, 30),
+            ],
+            'approval_intro': [
+                Spacer(1, 12),
+                StaticParagraph("We are pleased to inform you that your loan application has been approved.", normal),
+            ],
+            'approval_outro': [
+                StaticParagraph("based on your profile and income verification.", normal),
+                Spacer(1, 12),
+                StaticParagraph("This sanction is valid for 30 days from the date of this letter.", normal),
+                StaticParagraph("Please visit our nearest branch to complete the documentation process.", normal),
+                Spacer(1, 12),
+                StaticParagraph("Thank you for choosing Tata Capital.", normal),
+                Spacer(1, 12),
+                StaticParagraph("Yours sincerely,", normal),
+                StaticParagraph("Loan Processing Team", normal),
+                StaticParagraph("Tata Capital Limited", normal),
+            ],
+        }
+
+    def build_story(self, static, customer_data, today):
+        normal = static['normal']
+        story = _reuse(static['header'])
+
+        # Date and reference
+        story.append(Paragraph(f"Date: {today.strftime('%B %d, %Y')}", normal))
+        story.append(Paragraph(f"Reference No: TC/{customer_data.get('phone', '0000000000')[-4:]}/{today.strftime('%Y%m%d')}", normal))
+        story.append(Spacer(1, 20))
+
+        # Customer Details Table
+        customer_table = Table([
+            ['CUSTOMER DETAILS', ''],
+            ['Name', customer_data.get('name', 'N/A')],
+            ['Customer ID', f"TC{customer_data.get('phone', '0000000000')[-6:]}"],
+            ['Age', str(customer_data.get('age', 'N/A'))],
+            ['City', customer_data.get('city', 'N/A')],
+            ['Phone', customer_data.get('phone', 'N/A')],
+            ['Email', customer_data.get('email', 'N/A')]
+        ], colWidths=[150, 300])
+        customer_table.setStyle(static['table_style'])
+        story.append(customer_table)
+        story.append(Spacer(1, 30))
+
+        # Loan Details
+        loan_table = Table([
+            ['LOAN DETAILS', ''],
+            ['Loan Type', customer_data.get('loan_type', 'Personal').title()],
+            ['Loan Amount', f"₹{customer_data.get('loan_amount', 0):,}"],
+            ['Monthly Income', f"₹{customer_data.get('monthly_income', 0):,}"],
+            ['Interest Rate', '10.99% per annum'],
+            ['Tenure', '60 months'],
+            ['EMI Amount', f"₹{int(customer_data.get('loan_amount', 0) * 0.022):,}"]
+        ], colWidths=[150, 300])
+        loan_table.setStyle(static['table_style'])
+        story.append(loan_table)
+        story.append(Spacer(1, 30))
+
+        # Approval message
+        story.append(Paragraph(f"Dear {customer_data.get('name', 'Customer')},", normal))
+        story.extend(_reuse(static['approval_intro']))
+        story.append(Paragraph(f"The loan amount of ₹{customer_data.get('loan_amount', 0):,} has been sanctioned", normal))
+        story.extend(_reuse(static['approval_outro']))
+        return story
+
+
+RENDERERS = {
+    'sanction': SanctionLetterRenderer(),
+    'summary': SummaryLetterRenderer(),
+}
+
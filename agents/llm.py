@@ -0,0 +1,66 @@
+"""
+Instrumented Groq chat completions.
+
+All agents call the LLM through chat_completion() so every request is timed
+and its token usage, errors and retries are counted per model. Transient
+failures (rate limits, timeouts, connection and 5xx errors) are retried here
+with exponential backoff rather than inside the Groq client, which is built
+with max_retries=0 so that each retry is visible in the metrics.
+"""
+
+import os
+import time
+
+from services import tracing
+from services.instruments import LLM_SECONDS, LLM_TOKENS, LLM_ERRORS, LLM_RETRIES
+
+LLM_MAX_RETRIES = int(os.getenv('LLM_MAX_RETRIES', 2))
+LLM_RETRY_BACKOFF = float(os.getenv('LLM_RETRY_BACKOFF', 0.5))
+
+# Matched by class name so this module does not need to import groq
+RETRYABLE_ERRORS = {'RateLimitError', 'APITimeoutError', 'APIConnectionError', 'InternalServerError'}
+
+# Called with each attempt's latency in seconds (e.g. the chat admission limiter)
+_latency_listeners = []
+
+
+def add_latency_listener(listener):
+    _latency_listeners.append(listener)
+
+
+def _report_latency(seconds):
+    for listener in _latency_listeners:
+        listener(seconds)
+
+
+def chat_completion(client, model, messages, purpose='chat', retries=None, **params):
+    """client.chat.completions.create() with latency, token, error and retry metrics"""
+    retries = LLM_MAX_RETRIES if retries is None else retries
+    attempt = 0
+    while True:
+        start = time.perf_counter()
+        try:
+            with tracing.span('llm', model=model, purpose=purpose, attempt=attempt + 1) as span:
+                response = client.chat.completions.create(model=model, messages=messages, **params)
+        except Exception as e:
+            error = type(e).__name__
+            elapsed = time.perf_counter() - start
+            LLM_SECONDS.observe(elapsed, model, purpose, 'error')
+            _report_latency(elapsed)
+            LLM_ERRORS.inc(model, purpose, error)
+            if error not in RETRYABLE_ERRORS or attempt >= retries:
+                raise
+            LLM_RETRIES.inc(model, purpose)
+            time.sleep(LLM_RETRY_BACKOFF * 2 ** attempt)
+            attempt += 1
+            continue
+
+        elapsed = time.perf_counter() - start
+        LLM_SECONDS.observe(elapsed, model, purpose, 'ok')
+        _report_latency(elapsed)
+        usage = getattr(response, 'usage', None)
+        if usage is not None:
+            LLM_TOKENS.inc(model, purpose, 'prompt', amount=getattr(usage, 'prompt_tokens', 0) or 0)
+            LLM_TOKENS.inc(model, purpose, 'completion', amount=getattr(usage, 'completion_tokens', 0) or 0)
+            span.set_attribute('total_tokens', getattr(usage, 'total_tokens', None))
+        return response
@@ -4,6 +4,10 @@ from .verification_agent import VerificationAgent
 from .underwriting_agent import UnderwritingAgent
 import json
 
+from .llm import chat_completion
+from services import tracing
+from services.instruments import STAGE_SECONDS, STAGE_ERRORS
+
 class MasterAgent:
     """Master Agent - Orchestrates all worker agents using Groq AI"""
     
@@ -19,7 +23,7 @@ class MasterAgent:
                 "Recommended fix: pip install 'groq==0.3.0' and 'httpx==0.24.1', then restart the app."
             ) from e
 
-        self.client = Groq(api_key=os.getenv('GROQ_API_KEY'))
+        self.client = Groq(api_key=os.getenv('GROQ_API_KEY'), max_retries=0)
         self.model = 'mixtral-8x7b-32768'
         self.sales_agent = SalesAgent()
         self.verification_agent = VerificationAgent()
@@ -52,37 +56,41 @@ class MasterAgent:
             })
             
             # Get AI response based on current stage
-            if stage == 'greeting':
-                response = self._handle_greeting_stage(user_message, messages)
-            elif stage == 'qualification':
-                response = self._handle_qualification_stage(user_message, messages, customer_data)
-            elif stage == 'personal_details':
-                response = self._handle_personal_details_stage(user_message, messages, customer_data)
-            elif stage == 'verification':
-                response = self._handle_verification_stage(user_message, messages, customer_data, conversation)
-            elif stage == 'underwriting':
-                response = self._handle_underwriting_stage(customer_data, conversation)
-            elif stage == 'salary_verification':
-                response = {'message': "Please upload your salary slip to proceed.", 'action': 'waiting_for_upload'}
-            else:
-                response = {'message': "How can I assist you with your loan application?"}
+            with STAGE_SECONDS.time(stage), tracing.span('stage', stage=stage):
+                if stage == 'greeting':
+                    response = self._handle_greeting_stage(user_message, messages, conversation_id)
+                elif stage == 'qualification':
+                    response = self._handle_qualification_stage(user_message, messages, customer_data, conversation_id)
+                elif stage == 'personal_details':
+                    response = self._handle_personal_details_stage(user_message, messages, customer_data, conversation_id)
+                elif stage == 'verification':
+                    response = self._handle_verification_stage(user_message, messages, customer_data, conversation, conversation_id)
+                elif stage == 'underwriting':
+                    response = self._handle_underwriting_stage(customer_data, conversation, conversation_id)
+                elif stage == 'salary_verification':
+                    response = {'message': "Please upload your salary slip to proceed.", 'action': 'waiting_for_upload'}
+                else:
+                    response = {'message': "How can I assist you with your loan application?"}
             
             # Update conversation data
             conversation['customer_data'] = customer_data
             return response
             
         except Exception as e:
+            STAGE_ERRORS.inc(stage)
             print(f"Error in master agent: {str(e)}")
             return {'message': "I encountered an error. Please try again.", 'error': str(e)}
     
-    def _handle_greeting_stage(self, user_message, messages):
+    def _handle_greeting_stage(self, user_message, messages, conversation_id):
         """Handle greeting stage with AI"""
         system_prompt = """You are a friendly and professional loan sales assistant for Tata Capital. 
         Your goal is to greet the customer warmly and assess if they're interested in a personal loan.
         Keep responses concise and engaging. If they show interest, prepare to move to qualification stage."""
         
-        response = self.client.chat.completions.create(
-            model=self.model,
+        response = chat_completion(
+            self.client,
+            self.model,
+            purpose='greeting',
             messages=[
                 {'role': 'system', 'content': system_prompt},
                 *messages
@@ -94,8 +102,10 @@ class MasterAgent:
         bot_message = response.choices[0].message.content
         
         # Check if customer is interested
-        interest_check = self.client.chat.completions.create(
-            model=self.model,
+        interest_check = chat_completion(
+            self.client,
+            self.model,
+            purpose='interest_check',
             messages=[
                 {'role': 'system', 'content': 'Determine if the user is interested in a personal loan. Reply with only "yes" or "no".'},
                 {'role': 'user', 'content': user_message}
@@ -107,7 +117,7 @@ class MasterAgent:
         is_interested = 'yes' in interest_check.choices[0].message.content.lower()
         
         if is_interested:
-            self.conversation_stage[list(self.conversation_stage.keys())[-1]] = 'qualification'
+            self.conversation_stage[conversation_id] = 'qualification'
             return {
                 'message': bot_message + "\n\nWhat loan amount are you looking for?",
                 'action': 'move_to_qualification'
@@ -115,14 +125,16 @@ class MasterAgent:
         
         return {'message': bot_message, 'action': 'greeting'}
     
-    def _handle_qualification_stage(self, user_message, messages, customer_data):
+    def _handle_qualification_stage(self, user_message, messages, customer_data, conversation_id):
         """Handle qualification stage with AI"""
         system_prompt = """You are a loan qualification assistant. Extract the loan amount from the user's message.
         The user might say amounts like "2 lakhs", "5 lakhs", "500000", etc.
         Reply with a JSON object: {"loan_amount": <number>, "message": "<response>"}"""
         
-        response = self.client.chat.completions.create(
-            model=self.model,
+        response = chat_completion(
+            self.client,
+            self.model,
+            purpose='loan_amount',
             messages=[
                 {'role': 'system', 'content': system_prompt},
                 {'role': 'user', 'content': user_message}
@@ -138,7 +150,7 @@ class MasterAgent:
             
             if loan_amount:
                 customer_data['loan_amount'] = int(loan_amount)
-                self.conversation_stage[list(self.conversation_stage.keys())[-1]] = 'personal_details'
+                self.conversation_stage[conversation_id] = 'personal_details'
                 return {
                     'message': f"Great! A loan of ₹{loan_amount:,.0f} noted. Now, what's your full name?",
                     'action': 'move_to_personal_details'
@@ -148,7 +160,7 @@ class MasterAgent:
         
         return {'message': "Could you please specify the loan amount? (e.g., 2 lakhs, 5 lakhs, 500000)"}
     
-    def _handle_personal_details_stage(self, user_message, messages, customer_data):
+    def _handle_personal_details_stage(self, user_message, messages, customer_data, conversation_id):
         """Handle personal details collection with AI"""
         if 'name' not in customer_data:
             customer_data['name'] = user_message.strip()
@@ -167,7 +179,7 @@ class MasterAgent:
         
         elif 'city' not in customer_data:
             customer_data['city'] = user_message.strip()
-            self.conversation_stage[list(self.conversation_stage.keys())[-1]] = 'verification'
+            self.conversation_stage[conversation_id] = 'verification'
             return {
                 'message': "Thank you! Now let me verify your KYC details. What's your registered phone number?",
                 'action': 'move_to_verification'
@@ -175,7 +187,7 @@ class MasterAgent:
         
         return {'message': "Please provide your details."}
     
-    def _handle_verification_stage(self, user_message, messages, customer_data, conversation):
+    def _handle_verification_stage(self, user_message, messages, customer_data, conversation, conversation_id):
         """Handle verification stage with AI"""
         if 'phone' not in customer_data:
             customer_data['phone'] = user_message.strip()
@@ -188,7 +200,7 @@ class MasterAgent:
             verification_result = self.verification_agent.verify_kyc(customer_data)
             
             if verification_result['verified']:
-                self.conversation_stage[list(self.conversation_stage.keys())[-1]] = 'underwriting'
+                self.conversation_stage[conversation_id] = 'underwriting'
                 return {
                     'message': "Perfect! Your KYC details are verified. Let me check your eligibility...",
                     'action': 'start_underwriting',
@@ -203,12 +215,12 @@ class MasterAgent:
         
         return {'message': "Please provide your details."}
     
-    def _handle_underwriting_stage(self, customer_data, conversation):
+    def _handle_underwriting_stage(self, customer_data, conversation, conversation_id):
         """Handle underwriting stage with AI"""
         underwriting_result = self.underwriting_agent.evaluate_eligibility(customer_data)
         
         if underwriting_result['status'] == 'approved':
-            self.conversation_stage[list(self.conversation_stage.keys())[-1]] = 'approval'
+            self.conversation_stage[conversation_id] = 'approval'
             conversation['status'] = 'completed'
             return {
                 'message': f"Excellent news! Your loan of ₹{customer_data['loan_amount']:,.0f} has been approved! Your sanction letter is ready for download.",
@@ -217,7 +229,7 @@ class MasterAgent:
             }
         
         elif underwriting_result['status'] == 'salary_slip_required':
-            self.conversation_stage[list(self.conversation_stage.keys())[-1]] = 'salary_verification'
+            self.conversation_stage[conversation_id] = 'salary_verification'
             conversation['status'] = 'pending_verification'
             return {
                 'message': "Your loan amount requires salary verification. Please upload your latest salary slip (PDF or image).",
@@ -0,0 +1,325 @@
+import re
+
+from .sanction_renderer import render_letter
+from services import tracing
+from services.instruments import STAGE_SECONDS
+
+# Patterns are compiled once per process instead of on every turn
+GREETING_RE = re.compile(r'\b(?:hello|hi|hey|start)\b', re.IGNORECASE)
+NAME_PREFIX_RE = re.compile(r"^\s*(?:my name is|i am|i'm|this is)\b\s*", re.IGNORECASE)
+SEGMENT_SPLIT_RE = re.compile(r'\s*[,;\n]+\s*')
+DIGIT_RE = re.compile(r'\d')
+AGE_RE = re.compile(r'\b([1-9][0-9]?)\b')
+PHONE_RE = re.compile(r'\b([6-9]\d{9})\b')
+EMAIL_RE = re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b')
+LOAN_TYPE_RE = re.compile(r'(personal|home|car|business)', re.IGNORECASE)
+AMOUNT_RE = re.compile(r'\d+')
+YES_RE = re.compile(r'yes', re.IGNORECASE)
+NO_RE = re.compile(r'no', re.IGNORECASE)
+
+
+def _extract_text(segment):
+    """Free-text slot: the leading words of the segment up to the first number"""
+    words = segment.split()
+    taken = 0
+    while taken < len(words) and not DIGIT_RE.search(words[taken]):
+        taken += 1
+    if not taken:
+        return None, segment
+    return ' '.join(words[:taken]), ' '.join(words[taken:])
+
+
+def _extract_name(segment):
+    """Name slot: "I am Rahul" -> "Rahul"; the prefix goes first so "I am 32" is not a name"""
+    return _extract_text(NAME_PREFIX_RE.sub('', segment))
+
+
+def _extract_pattern(pattern, group=0):
+    """Build an extractor that consumes only the matched span of a segment"""
+    def extract(segment):
+        match = pattern.search(segment)
+        if not match:
+            return None, segment
+        rest = (segment[:match.start()] + ' ' + segment[match.end():]).strip()
+        return match.group(group), rest
+    return extract
+
+
+def _parse_name(raw):
+    # A segment that was only the prefix ("I am") leaves nothing
+    raw = NAME_PREFIX_RE.sub('', raw)
+    return ' '.join(raw.split()[:2]).title() or None
+
+
+def _validate_age(age):
+    if age < 18:
+        return "You must be at least 18 years old to apply for a loan. Please enter your correct age."
+    if age > 80:
+        return "Please enter a valid age (18-80 years)."
+    return None
+
+
+def _validate_loan_amount(amount):
+    if amount < 10000:
+        return "The minimum loan amount is ₹10,000. Please enter a valid amount."
+    if amount > 5000000:
+        return "For amounts above ₹50 lakhs, please visit our branch. Please enter an amount up to ₹50,00,000."
+    return None
+
+
+# Declarative slot table, in collection order. Each slot knows how to pull its
+# value out of a message segment, how to normalise and validate it, and what
+# to say once it is captured (ack) or when it is the next one to ask for (prompt).
+SLOTS = (
+    {
+        'name': 'name',
+        'action': 'collect_name',
+        'extract': _extract_name,
+        'parse': _parse_name,
+        'validate': None,
+        'ack': "Thank you {value}!",
+        'prompt': "To get started, may I have your full name please?",
+        'retry': "Please tell me your full name (letters only).",
+    },
+    {
+        'name': 'age',
+        'action': 'collect_age',
+        'extract': _extract_pattern(AGE_RE, 1),
+        'parse': int,
+        'validate': _validate_age,
+        'ack': "Great! You're {value} years old.",
+        'prompt': "Now I need your age for the application. How old are you?",
+        'retry': "Please enter your age in numbers (e.g., 25).",
+    },
+    {
+        'name': 'city',
+        'action': 'collect_city',
+        'extract': _extract_text,
+        'parse': str.title,
+        'validate': None,
+        'ack': "Thank you! You're from {value}.",
+        'prompt': "What city do you live in?",
+        'retry': "Please enter a valid city name.",
+    },
+    {
+        'name': 'phone',
+        'action': 'collect_phone',
+        'extract': _extract_pattern(PHONE_RE, 1),
+        'parse': str,
+        'validate': None,
+        'ack': "Perfect! Your mobile number {value} has been recorded.",
+        'prompt': "Now please provide your mobile number for verification.",
+        'retry': "Please enter a valid 10-digit mobile number starting with 6, 7, 8, or 9.",
+    },
+    {
+        'name': 'email',
+        'action': 'collect_email',
+        'extract': _extract_pattern(EMAIL_RE),
+        'parse': str.lower,
+        'validate': None,
+        'ack': "Excellent! Your email {value} has been saved.",
+        'prompt': "Now please provide your email address.",
+        'retry': "Please enter a valid email address (e.g., example@gmail.com).",
+    },
+    {
+        'name': 'loan_type',
+        'action': 'collect_loan_type',
+        'extract': _extract_pattern(LOAN_TYPE_RE, 1),
+        'parse': str.lower,
+        'validate': None,
+        'ack': "Great choice! You're interested in a {value} loan.",
+        'prompt': "Now, what type of loan are you interested in? We offer Personal, Home, Car, and Business loans.",
+        'retry': "Please choose from: Personal, Home, Car, or Business loan. Which type interests you?",
+    },
+    {
+        'name': 'loan_amount',
+        'action': 'collect_amount',
+        'extract': _extract_pattern(AMOUNT_RE),
+        'parse': int,
+        'validate': _validate_loan_amount,
+        'ack': "Perfect! You're looking for ₹{value:,}.",
+        'prompt': "What loan amount are you looking for? (Please enter amount in rupees)",
+        'retry': "Please enter a valid loan amount in numbers (e.g., 100000 for ₹1 lakh).",
+    },
+    {
+        'name': 'monthly_income',
+        'action': 'collect_income',
+        'extract': _extract_pattern(AMOUNT_RE),
+        'parse': int,
+        'validate': None,
+        'ack': None,
+        'prompt': "Now, could you please tell me your monthly income?",
+        'retry': "Please enter your monthly income in numbers (e.g., 50000).",
+    },
+)
+
+
+def next_missing_slot(customer_data, start=0):
+    """Index of the first slot at or after `start` that is not yet filled"""
+    for i in range(start, len(SLOTS)):
+        if not customer_data.get(SLOTS[i]['name']):
+            return i
+    return None
+
+
+def fill_slots(message, customer_data):
+    """Extract as many consecutive missing slots as the message provides.
+
+    Segments ("Rahul, 32, Pune") are consumed left to right against the
+    missing slots in order, so one message can fill several slots. Returns
+    (captured, last_index, error) where error is a (slot, message) pair when
+    a value was found but failed validation.
+    """
+    captured = {}
+    index = next_missing_slot(customer_data)
+    last = None
+    segments = [s for s in SEGMENT_SPLIT_RE.split(message.strip()) if s]
+    if index == 0:
+        # Bare greetings ("hi", "hello there") never count as a name
+        segments = [s for s in segments if not GREETING_RE.search(s)]
+
+    while index is not None and segments:
+        slot = SLOTS[index]
+        raw, rest = slot['extract'](segments[0])
+        if raw is None:
+            break
+        value = slot['parse'](raw)
+        if value is None:
+            break
+        if slot['validate']:
+            error = slot['validate'](value)
+            if error:
+                return captured, last, (slot, error)
+        captured[slot['name']] = value
+        customer_data[slot['name']] = value
+        last = index
+        if rest:
+            segments[0] = rest
+        else:
+            segments.pop(0)
+        index = next_missing_slot(customer_data, index + 1)
+
+    return captured, last, None
+
+
+def acknowledge(captured):
+    """One acknowledgement per slot a message filled, in slot order"""
+    return ' '.join(
+        slot['ack'].format(value=captured[slot['name']])
+        for slot in SLOTS if slot['name'] in captured and slot['ack']
+    )
+
+
+class MockAgent:
+    """Deterministic no-LLM agent driven by the SLOTS table"""
+
+    letter_layout = 'summary'
+
+    def __init__(self, name):
+        self.name = name
+
+    def process_message(self, message, conversation, conv_id):
+        start = next_missing_slot(conversation.get('customer_data', {}))
+        stage = SLOTS[start]['name'] if start is not None else 'completed'
+        with STAGE_SECONDS.time(f"mock_{stage}"), tracing.span('stage', stage=f"mock_{stage}"):
+            return self._process_message(message, conversation, start)
+
+    def _process_message(self, message, conversation, start):
+        customer_data = conversation.get('customer_data', {})
+        conversation['customer_data'] = customer_data
+
+        if start is None:
+            return self._handle_completed(message, customer_data)
+
+        captured, last, error = fill_slots(message, customer_data)
+
+        if error:
+            # Slots before the invalid value were still saved; say so
+            slot, text = error
+            message = f"{acknowledge(captured)} {text}" if captured else text
+            return {'message': message, 'action': slot['action'], 'data': captured}
+
+        if last is None:
+            if start == 0 and GREETING_RE.search(message):
+                return {
+                    'message': "Hello! Welcome to Tata Capital. I'm here to help you with your personal loan application. "
+                               + SLOTS[0]['prompt'],
+                    'action': 'collect_name',
+                    'data': {}
+                }
+            slot = SLOTS[start]
+            return {'message': slot['retry'], 'action': slot['action'], 'data': {}}
+
+        if SLOTS[last]['name'] == 'monthly_income':
+            return self._eligibility_response(customer_data, captured)
+
+        nxt = next_missing_slot(customer_data, last + 1)
+        if nxt is None:
+            return self._handle_completed(message, customer_data)
+
+        return {
+            'message': f"{acknowledge(captured)} {SLOTS[nxt]['prompt']}",
+            'action': SLOTS[nxt]['action'],
+            'data': captured
+        }
+
+    def _eligibility_response(self, customer_data, captured):
+        income = customer_data['monthly_income']
+        loan_amount = customer_data.get('loan_amount', 0)
+        max_eligible = income * 60  # 60x income rule
+
+        if loan_amount <= max_eligible:
+            return {
+                'message': f"Excellent! With a monthly income of ₹{income:,}, you're eligible for ₹{loan_amount:,}. Now I need to verify some documents. Please upload your latest salary slip.",
+                'action': 'collect_documents',
+                'data': dict(captured, eligible=True)
+            }
+        return {
+            'message': f"Based on your monthly income of ₹{income:,}, you're eligible for up to ₹{max_eligible:,}. Would you like to proceed with this amount instead?",
+            'action': 'adjust_amount',
+            'data': dict(captured, max_eligible=max_eligible)
+        }
+
+    def _handle_completed(self, message, customer_data):
+        if customer_data.get('documents_verified'):
+            return {
+                'message': f"🎉 Great news {customer_data.get('name', 'Customer')}! Your loan application for ₹{customer_data.get('loan_amount', 0):,} has been approved! Your sanction letter is ready for download.",
+                'action': 'generate_sanction',
+                'data': {'approved': True}
+            }
+        if YES_RE.search(message):
+            return {
+                'message': "Great! Please upload your salary slip to continue with the verification process.",
+                'action': 'collect_documents',
+                'data': {}
+            }
+        if NO_RE.search(message):
+            return {
+                'message': "No problem! Feel free to restart the application when you're ready. Thank you for considering Tata Capital!",
+                'action': 'end_conversation',
+                'data': {}
+            }
+        return {
+            'message': "I'm here to help you with your loan application. Is there anything specific you'd like to know about our loan process?",
+            'action': 'clarification',
+            'data': {}
+        }
+
+    def verify_salary_slip(self, customer_data, filepath, slip=None):
+        # Prefer figures read from the slip; fall back to what the customer told us
+        slip = slip or {}
+        return {
+            'success': True,
+            'message': "Salary slip verified successfully! All details match your application.",
+            'verification_data': {
+                'monthly_salary': slip.get('net_salary') or customer_data.get('monthly_income', 75000),
+                'employer': slip.get('employer') or 'TCS Limited',
+                'pay_period': slip.get('pay_period'),
+                'employment_type': 'Permanent',
+                'documents_verified': True
+            }
+        }
+
+    def generate_pdf(self, customer_data):
+        # Styles and static blocks are cached by the renderer
+        return render_letter('summary', customer_data)
@@ -0,0 +1,153 @@
+"""
+Salary slip text extraction.
+
+Text is pulled from uploaded PDFs one page at a time and fed through a small
+set of compiled patterns for the net salary, employer and pay period. Pages
+are only read until every field has been found, so a long payroll export
+costs no more than its first page in the common case. Image uploads carry no
+text layer and come back with nothing extracted for manual review.
+"""
+
+import re
+
+from .sanction_renderer import calculate_emi
+
+# Bump when patterns change so cached extractions are recomputed
+PARSER_VERSION = 1
+
+# Payroll exports can run to dozens of pages; the fields are always up front
+MAX_PAGES = 10
+
+# Indian (1,23,456.00) or western (123,456.00) grouping, or a bare figure of 3+ digits
+_AMOUNT = r'(\d{1,3}(?:,\d{2,3})+(?:\.\d{1,2})?|\d{3,}(?:\.\d{1,2})?)'
+
+NET_SALARY_RE = re.compile(
+    r'(?:net\s*(?:pay(?:able)?|salary|amount(?:\s*payable)?|earnings)|take[\s-]*home(?:\s*pay)?)'
+    r'[^\d\n]{0,25}' + _AMOUNT,
+    re.IGNORECASE
+)
+EMPLOYER_RE = re.compile(
+    r'^[ \t]*(?:employer|company|organi[sz]ation)(?:[ \t]*name)?[ \t]*[:\-][ \t]*(\S.*?)[ \t]*$',
+    re.IGNORECASE | re.MULTILINE
+)
+COMPANY_LINE_RE = re.compile(
+    r'^[ \t]*(\S.*?\b(?:limited|ltd\.?|pvt\.?|private|llp|inc\.?|corporation|corp\.?))[ \t]*$',
+    re.IGNORECASE | re.MULTILINE
+)
+PAY_PERIOD_RE = re.compile(
+    r'(?:pay\s*period|pay\s*slip\s*for|payslip\s*for|salary\s*(?:slip\s*)?for|for\s*the\s*month\s*of|month)'
+    r'(?:\s*the\s*month(?:\s*of)?)?\s*[:\-]?\s*'
+    r'(?:([A-Za-z]{3,9})[\s,\'-]*(\d{4}|\d{2})\b|(\d{1,2})[/-](\d{4})\b)',
+    re.IGNORECASE
+)
+
+MONTHS = {
+    name: number
+    for number, names in enumerate((
+        ('jan', 'january'), ('feb', 'february'), ('mar', 'march'), ('apr', 'april'),
+        ('may',), ('jun', 'june'), ('jul', 'july'), ('aug', 'august'),
+        ('sep', 'sept', 'september'), ('oct', 'october'), ('nov', 'november'), ('dec', 'december'),
+    ), start=1)
+    for name in names
+}
+
+FIELDS = ('net_salary', 'employer', 'pay_period')
+
+
+def _parse_amount(text):
+    return float(text.replace(',', ''))
+
+
+def _parse_period(match):
+    """Normalise a pay period match to YYYY-MM, or None if it is not a real month"""
+    month_name, year, month_number, numeric_year = match.groups()
+    if month_name:
+        month = MONTHS.get(month_name.lower())
+        year = int(year) + 2000 if len(year) == 2 else int(year)
+    else:
+        month = int(month_number)
+        year = int(numeric_year)
+    if not month or not 1 <= month <= 12:
+        return None
+    return f"{year:04d}-{month:02d}"
+
+
+def _search_employer(text):
+    match = EMPLOYER_RE.search(text) or COMPANY_LINE_RE.search(text)
+    return match.group(1).strip() if match else None
+
+
+def _search_period(text):
+    for match in PAY_PERIOD_RE.finditer(text):
+        period = _parse_period(match)
+        if period:
+            return period
+    return None
+
+
+def extract_fields(pages):
+    """Scan an iterable of page texts and return the fields found.
+
+    Stops pulling pages as soon as net salary, employer and pay period are
+    all known; the first match of each field wins.
+    """
+    fields = dict.fromkeys(FIELDS)
+    pages_scanned = 0
+
+    for text in pages:
+        pages_scanned += 1
+        if fields['net_salary'] is None:
+            match = NET_SALARY_RE.search(text)
+            if match:
+                fields['net_salary'] = _parse_amount(match.group(1))
+        if fields['employer'] is None:
+            fields['employer'] = _search_employer(text)
+        if fields['pay_period'] is None:
+            fields['pay_period'] = _search_period(text)
+        if all(value is not None for value in fields.values()):
+            break
+
+    fields['pages_scanned'] = pages_scanned
+    return fields
+
+
+def iter_pdf_pages(path, max_pages=MAX_PAGES):
+    """Yield the text of each page in turn; pages are parsed only when pulled"""
+    # Imported lazily: only the extraction workers need pypdf
+    from pypdf import PdfReader
+
+    with open(path, 'rb') as f:
+        reader = PdfReader(f)
+        for index, page in enumerate(reader.pages):
+            if index >= max_pages:
+                return
+            yield page.extract_text() or ''
+
+
+def parse_salary_slip(path):
+    """Extract salary slip fields from a stored upload.
+
+    Always returns a dict with the FIELDS keys (None when not found),
+    pages_scanned and parser_version; 'error' is set when the file could not
+    be read at all.
+    """
+    result = dict.fromkeys(FIELDS)
+    result.update(pages_scanned=0, parser_version=PARSER_VERSION)
+
+    if not path.lower().endswith('.pdf'):
+        result['error'] = 'No text layer in image uploads'
+        return result
+
+    try:
+        result.update(extract_fields(iter_pdf_pages(path)))
+    except ImportError:
+        result['error'] = 'pypdf is not installed'
+    except Exception as e:
+        result['error'] = f"Could not read PDF: {e}"
+    return result
+
+
+def check_affordability(loan_amount, salary, interest_rate=12.0, tenure=36, max_ratio=0.5):
+    """Return (emi, affordable) for the standard EMI against a monthly salary"""
+    emi = calculate_emi(loan_amount, interest_rate, tenure)
+    return emi, emi <= salary * max_ratio
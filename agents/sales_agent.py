@@ -1,12 +1,16 @@
 import os
-from groq import Groq
 import re
 
+from .llm import chat_completion
+
 class SalesAgent:
     """Sales Agent - Handles customer engagement using Groq AI"""
     
     def __init__(self):
-        self.client = Groq(api_key=os.getenv('GROQ_API_KEY'))
+        # Imported here so loading the module (and app.py) does not pull in groq
+        from groq import Groq
+
+        self.client = Groq(api_key=os.getenv('GROQ_API_KEY'), max_retries=0)
         self.model = 'mixtral-8x7b-32768'
     
     def greet_customer(self, user_message):
@@ -14,8 +18,10 @@ class SalesAgent:
         system_prompt = """You are a friendly Tata Capital loan sales representative. 
         Greet the customer warmly and introduce personal loans. Keep it brief and engaging."""
         
-        response = self.client.chat.completions.create(
-            model=self.model,
+        response = chat_completion(
+            self.client,
+            self.model,
+            purpose='greeting',
             messages=[
                 {'role': 'system', 'content': system_prompt},
                 {'role': 'user', 'content': user_message or 'Hello'}
@@ -0,0 +1,52 @@
+"""
+Sanction letter rendering and cache keys.
+
+The reportlab layouts live in agents.letter_layouts and are imported on the
+first render_letter() call, so importing this module (for the cache key or
+the EMI formula) stays cheap and reportlab is never loaded by a process that
+does not draw a letter.
+"""
+
+import hashlib
+import json
+from datetime import datetime
+
+from services import tracing
+from services.instruments import PDF_RENDER_SECONDS
+
+# Bump whenever the layout or wording of any letter changes
+TEMPLATE_VERSION = 1
+
+# customer_data keys that appear on each letter; anything else never changes
+# the output and is left out of the cache key
+LETTER_FIELDS = {
+    'sanction': ('name', 'customer_id', 'age', 'city', 'phone', 'email', 'loan_amount', 'credit_score'),
+    'summary': ('name', 'age', 'city', 'phone', 'email', 'loan_type', 'loan_amount', 'monthly_income'),
+}
+
+
+def calculate_emi(loan_amount, interest_rate, tenure):
+    """Standard reducing-balance EMI"""
+    monthly_rate = interest_rate / 100 / 12
+    return (loan_amount * monthly_rate * (1 + monthly_rate) ** tenure) / ((1 + monthly_rate) ** tenure - 1)
+
+
+def render_letter(layout, customer_data, today=None):
+    """Render the named letter layout for customer_data into a BytesIO"""
+    with PDF_RENDER_SECONDS.time(layout), tracing.span('pdf_render', layout=layout):
+        from .letter_layouts import RENDERERS
+        return RENDERERS[layout].render(customer_data, today)
+
+
+def letter_cache_key(layout, customer_data, today=None):
+    """Content hash of everything that ends up on the letter.
+
+    Covers the template version, the layout, the issue date printed on the
+    letter and the rendered customer fields, so a cached letter is reused
+    until one of those changes.
+    """
+    today = today or datetime.now()
+    fields = {field: customer_data.get(field) for field in LETTER_FIELDS[layout]}
+    payload = json.dumps([TEMPLATE_VERSION, layout, today.strftime('%Y-%m-%d'), fields],
+                         sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
@@ -1,8 +1,16 @@
 import csv
 import os
 
+from services import tracing
+from services.instruments import LOOKUP_SECONDS, LOOKUPS
+from .salary_slip_parser import parse_salary_slip
+from .underwriting_policy import DEFAULT_POLICY
+
 class UnderwritingAgent:
     """Underwriting Agent - Handles credit evaluation using Groq AI"""
+
+    # Thresholds the decisions below apply (see agents.underwriting_policy)
+    policy = DEFAULT_POLICY
     
     def __init__(self, *args, **kwargs):
         # Lazy import of Groq to avoid module import-time failures on incompatible versions.
@@ -17,33 +25,39 @@ class UnderwritingAgent:
 
         self.credit_scores_file = 'data/credit_scores.csv'
         self.offers_file = 'data/offers.csv'
-        self.client = Groq(api_key=os.getenv('GROQ_API_KEY'))
+        self.client = Groq(api_key=os.getenv('GROQ_API_KEY'), max_retries=0)
         self.model = 'mixtral-8x7b-32768'
     
     def get_credit_score(self, customer_id):
         """Fetch credit score from mock credit bureau"""
-        try:
-            with open(self.credit_scores_file, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    if row['customer_id'] == customer_id:
-                        return int(row['credit_score'])
-        except FileNotFoundError:
-            pass
+        with LOOKUP_SECONDS.time('credit_scores'), tracing.span('lookup', table='credit_scores'):
+            try:
+                with open(self.credit_scores_file, 'r', encoding='utf-8') as f:
+                    reader = csv.DictReader(f)
+                    for row in reader:
+                        if row['customer_id'] == customer_id:
+                            LOOKUPS.inc('credit_scores', 'hit')
+                            return int(row['credit_score'])
+            except FileNotFoundError:
+                pass
         
+        LOOKUPS.inc('credit_scores', 'miss')
         return 750
     
     def get_pre_approved_limit(self, customer_id):
         """Get pre-approved loan limit"""
-        try:
-            with open(self.offers_file, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    if row['customer_id'] == customer_id:
-                        return float(row['pre_approved_limit'])
-        except FileNotFoundError:
-            pass
+        with LOOKUP_SECONDS.time('offers'), tracing.span('lookup', table='offers'):
+            try:
+                with open(self.offers_file, 'r', encoding='utf-8') as f:
+                    reader = csv.DictReader(f)
+                    for row in reader:
+                        if row['customer_id'] == customer_id:
+                            LOOKUPS.inc('offers', 'hit')
+                            return float(row['pre_approved_limit'])
+            except FileNotFoundError:
+                pass
         
+        LOOKUPS.inc('offers', 'miss')
         return 500000
     
     def evaluate_eligibility(self, customer_data):
@@ -56,10 +70,10 @@ class UnderwritingAgent:
         customer_data['credit_score'] = credit_score
         
         # Check credit score
-        if credit_score < 700:
+        if credit_score < self.policy.min_credit_score:
             return {
                 'status': 'rejected',
-                'reason': f'Credit score ({credit_score}) is below minimum requirement (700)',
+                'reason': f'Credit score ({credit_score}) is below minimum requirement ({self.policy.min_credit_score})',
                 'credit_score': credit_score
             }
         
@@ -68,17 +82,18 @@ class UnderwritingAgent:
         customer_data['pre_approved_limit'] = pre_approved_limit
         
         # Check eligibility based on loan amount
-        if loan_amount <= pre_approved_limit:
+        status, _ = self.policy.eligibility(credit_score, loan_amount, pre_approved_limit)
+        if status == 'approved':
             return {
                 'status': 'approved',
                 'message': 'Instant approval',
                 'credit_score': credit_score,
                 'pre_approved_limit': pre_approved_limit,
-                'interest_rate': 12.0,
-                'tenure_months': 36
+                'interest_rate': self.policy.interest_rate,
+                'tenure_months': self.policy.tenure_months
             }
         
-        elif loan_amount <= 2 * pre_approved_limit:
+        elif status == 'salary_slip_required':
             return {
                 'status': 'salary_slip_required',
                 'message': 'Salary slip verification required',
@@ -90,32 +105,52 @@ class UnderwritingAgent:
         else:
             return {
                 'status': 'rejected',
-                'reason': f'Loan amount exceeds maximum limit (₹{2 * pre_approved_limit:,.0f})',
+                'reason': f'Loan amount exceeds maximum limit (₹{self.policy.max_limit_multiple * pre_approved_limit:,.0f})',
                 'credit_score': credit_score,
                 'pre_approved_limit': pre_approved_limit
             }
     
-    def verify_salary_slip(self, customer_data, filepath):
-        """Verify salary slip and approve if EMI <= 50% of salary"""
-        salary = 50000
+    def verify_salary_slip(self, customer_data, filepath, slip=None):
+        """Verify salary slip and approve if the EMI is within the policy's share (50%) of the net salary on it"""
+        if slip is None:
+            slip = parse_salary_slip(filepath)
+        salary = slip.get('net_salary')
         loan_amount = customer_data.get('loan_amount', 0)
         
-        monthly_rate = 0.12 / 12
-        tenure = 36
-        emi = (loan_amount * monthly_rate * (1 + monthly_rate) ** tenure) / ((1 + monthly_rate) ** tenure - 1)
+        if not salary:
+            # Image uploads have no text layer, so they always end up here
+            return {
+                'success': False,
+                'status': 'manual_review',
+                'message': ("We couldn't read the net salary from this document, so our team will review it "
+                            "and get back to you. To be verified right away, upload your salary slip as a PDF."),
+                'slip': slip
+            }
         
-        if emi <= salary * 0.5:
+        emi, affordable = self.policy.affordability(loan_amount, salary)
+        verification_data = {
+            'monthly_salary': salary,
+            'employer': slip.get('employer'),
+            'pay_period': slip.get('pay_period'),
+            'documents_verified': True
+        }
+        
+        if affordable:
             return {
+                'success': True,
                 'status': 'approved',
                 'message': 'Salary verification successful',
                 'salary': salary,
                 'emi': int(emi),
-                'emi_percentage': (emi / salary) * 100
+                'emi_percentage': (emi / salary) * 100,
+                'verification_data': verification_data
             }
         else:
             return {
+                'success': False,
                 'status': 'rejected',
-                'reason': f'EMI (₹{int(emi)}) exceeds 50% of salary',
+                'reason': f'EMI (₹{int(emi)}) exceeds {self.policy.max_emi_ratio:.0%} of salary',
                 'salary': salary,
-                'emi': int(emi)
+                'emi': int(emi),
+                'verification_data': verification_data
             }
@@ -0,0 +1,66 @@
+"""
+Underwriting thresholds and the decisions they lead to, with no I/O.
+
+UnderwritingAgent applies DEFAULT_POLICY to live applications, and
+services.policy_replay replays stored applications through two policies to
+compare them. A policy covers:
+
+- min_credit_score: scores below it are rejected (700)
+- instant_limit_multiple: amounts up to this multiple of the pre-approved
+  limit are approved outright (1x)
+- max_limit_multiple: amounts up to this multiple need a salary slip; above
+  it they are rejected (2x)
+- max_emi_ratio: a slip-verified loan is approved when the EMI is at most
+  this share of the net salary (50%)
+- interest_rate, tenure_months: the terms that EMI is computed on
+"""
+
+from .salary_slip_parser import check_affordability
+
+
+class UnderwritingPolicy:
+    FIELDS = ('min_credit_score', 'instant_limit_multiple', 'max_limit_multiple', 'max_emi_ratio',
+              'interest_rate', 'tenure_months')
+
+    def __init__(self, min_credit_score=700, instant_limit_multiple=1.0, max_limit_multiple=2.0,
+                 max_emi_ratio=0.5, interest_rate=12.0, tenure_months=36):
+        self.min_credit_score = min_credit_score
+        self.instant_limit_multiple = instant_limit_multiple
+        self.max_limit_multiple = max_limit_multiple
+        self.max_emi_ratio = max_emi_ratio
+        self.interest_rate = interest_rate
+        self.tenure_months = tenure_months
+
+    @classmethod
+    def from_dict(cls, values):
+        """A policy from DEFAULT_POLICY's values overridden by `values`; raises ValueError on an unknown field"""
+        unknown = set(values) - set(cls.FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown policy fields: {', '.join(sorted(unknown))}")
+        return cls(**{field: type(getattr(DEFAULT_POLICY, field))(values[field]) for field in values})
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    def eligibility(self, credit_score, loan_amount, pre_approved_limit):
+        """(status, reason): status is 'approved', 'salary_slip_required' or 'rejected'; reason names the failed rule"""
+        if credit_score < self.min_credit_score:
+            return 'rejected', 'credit_score'
+        if loan_amount <= self.instant_limit_multiple * pre_approved_limit:
+            return 'approved', None
+        if loan_amount <= self.max_limit_multiple * pre_approved_limit:
+            return 'salary_slip_required', None
+        return 'rejected', 'over_limit'
+
+    def affordability(self, loan_amount, salary):
+        """(emi, affordable) for the loan against a monthly net salary"""
+        return check_affordability(
+            loan_amount, salary,
+            interest_rate=self.interest_rate, tenure=self.tenure_months, max_ratio=self.max_emi_ratio
+        )
+
+    def __repr__(self):
+        return f"UnderwritingPolicy({', '.join(f'{k}={v!r}' for k, v in self.to_dict().items())})"
+
+
+DEFAULT_POLICY = UnderwritingPolicy()
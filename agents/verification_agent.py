@@ -1,13 +1,18 @@
 import csv
 import os
-from groq import Groq
+
+from services import tracing
+from services.instruments import LOOKUP_SECONDS, LOOKUPS
 
 class VerificationAgent:
     """Verification Agent - Handles KYC verification using Groq AI"""
     
     def __init__(self):
+        # Imported here so loading the module (and app.py) does not pull in groq
+        from groq import Groq
+
         self.kyc_data_file = 'data/kyc_data.csv'
-        self.client = Groq(api_key=os.getenv('GROQ_API_KEY'))
+        self.client = Groq(api_key=os.getenv('GROQ_API_KEY'), max_retries=0)
         self.model = 'mixtral-8x7b-32768'
     
     def verify_kyc(self, customer_data):
@@ -15,37 +20,43 @@ class VerificationAgent:
         name = customer_data.get('name', '').lower()
         phone = customer_data.get('phone', '')
         
-        try:
-            with open(self.kyc_data_file, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    if (row['name'].lower() == name and row['phone'] == phone):
-                        customer_data['customer_id'] = row['customer_id']
-                        customer_data['email'] = row['email']
-                        customer_data['verified'] = True
-                        return {
-                            'verified': True,
-                            'message': 'KYC verification successful',
-                            'customer_id': row['customer_id']
-                        }
-        except FileNotFoundError:
-            pass
+        with LOOKUP_SECONDS.time('kyc_data'), tracing.span('lookup', table='kyc_data'):
+            try:
+                with open(self.kyc_data_file, 'r', encoding='utf-8') as f:
+                    reader = csv.DictReader(f)
+                    for row in reader:
+                        if (row['name'].lower() == name and row['phone'] == phone):
+                            customer_data['customer_id'] = row['customer_id']
+                            customer_data['email'] = row['email']
+                            customer_data['verified'] = True
+                            LOOKUPS.inc('kyc_data', 'hit')
+                            return {
+                                'verified': True,
+                                'message': 'KYC verification successful',
+                                'customer_id': row['customer_id']
+                            }
+            except FileNotFoundError:
+                pass
         
+        LOOKUPS.inc('kyc_data', 'miss')
         return {'verified': False, 'message': 'KYC verification failed'}
     
     def get_customer_history(self, customer_id):
         """Get customer's loan history"""
-        try:
-            with open('data/customers.csv', 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    if row['customer_id'] == customer_id:
-                        return {
-                            'existing_loans': int(row['existing_loans']),
-                            'total_outstanding': float(row['total_outstanding']),
-                            'payment_history': row['payment_history']
-                        }
-        except FileNotFoundError:
-            pass
+        with LOOKUP_SECONDS.time('customers'), tracing.span('lookup', table='customers'):
+            try:
+                with open('data/customers.csv', 'r', encoding='utf-8') as f:
+                    reader = csv.DictReader(f)
+                    for row in reader:
+                        if row['customer_id'] == customer_id:
+                            LOOKUPS.inc('customers', 'hit')
+                            return {
+                                'existing_loans': int(row['existing_loans']),
+                                'total_outstanding': float(row['total_outstanding']),
+                                'payment_history': row['payment_history']
+                            }
+            except FileNotFoundError:
+                pass
         
+        LOOKUPS.inc('customers', 'miss')
         return None
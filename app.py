@@ -1,17 +1,134 @@
-from flask import Flask, render_template, request, jsonify, send_file
-import csv
+import time
+
+# Import timing for the startup report (see STARTUP and benchmarks.startup)
+IMPORT_STARTED = time.perf_counter()
+
+from flask import Flask, Request, render_template, request, jsonify, send_file, Response, stream_with_context
 from datetime import datetime
 import json
 import os
 import io
+import hmac
+import threading
+import itertools
+from functools import wraps
+
+from agents.mock_agent import MockAgent
+from agents.sanction_renderer import letter_cache_key
+from services.pdf_pool import PdfPool, PdfQueueFull, PdfJobTimeout
+from services.letter_cache import LetterCache
+from services import bulk_letters
+from services.uploads import ContentStore, UploadTooLarge, UnsupportedFileType
+from services.job_queue import JobQueue
+from services.salary_slips import SlipExtractor
+from services.rollups import Rollups, wall_seconds
+from services.search_index import SearchIndex, csv_summary, iter_csv_summaries
+from services.wire import FastJSONProvider, compress_response, to_columns
+from services.assets import AssetManifest
+from services.idempotency import IdempotencyCache
+from services.admission import AdaptiveLimiter, AdmissionRejected
+from services.ids import IdGenerator, id_bounds, in_bounds
+from services.archive import ApplicationArchive, start_archiver
+from services.application_store import ApplicationStore
+from agents.llm import add_latency_listener
+from services import metrics, tracing
+from services.profiling import Profiler, MemoryTracker, collapsed_text, pstats_bytes, pstats_text, deep_sizeof
+from services.instruments import (
+    HTTP_SECONDS, STORE_WRITE_SECONDS, STORE_WRITE_ERRORS, CHAT_REPLAYS, CHAT_ADMISSIONS, CHAT_CONCURRENCY
+)
+
+class UploadRequest(Request):
+    """Parses salary slip uploads straight into the content store
+
+    werkzeug would spool each file part to a temporary file and the view would
+    then copy it again; here the parser writes into a PendingUpload, so the
+    slip is hashed, sniffed and size-checked while the body is still arriving.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pending_uploads = []
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if self.endpoint != 'upload_salary_slip':
+            return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+        upload = upload_store.open()
+        # Parts that fail mid-parse never reach request.files; close() discards them too
+        self.pending_uploads.append(upload)
+        return upload
+
+    def close(self):
+        super().close()
+        for upload in self.pending_uploads:
+            upload.close()
 
 app = Flask(__name__)
+app.request_class = UploadRequest
+app.json = FastJSONProvider(app)
 
 # Production configuration
 app.config.update(
     SECRET_KEY=os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production'),
     MAX_CONTENT_LENGTH=16 * 1024 * 1024,
-    UPLOAD_FOLDER=os.environ.get('UPLOAD_FOLDER', 'uploads')
+    UPLOAD_FOLDER=os.environ.get('UPLOAD_FOLDER', 'uploads'),
+    SALARY_SLIP_MAX_BYTES=int(os.environ.get('SALARY_SLIP_MAX_BYTES', 10 * 1024 * 1024)),
+    # Document verification runs from a persistent job table; 0 workers verifies inline
+    JOBS_DB=os.environ.get('JOBS_DB', os.path.join(os.getcwd(), 'jobs.db')),
+    VERIFICATION_WORKERS=int(os.environ.get('VERIFICATION_WORKERS', 2)),
+    VERIFICATION_MAX_ATTEMPTS=int(os.environ.get('VERIFICATION_MAX_ATTEMPTS', 3)),
+    # Slip text is parsed in a process pool; 0 workers parses on the job thread
+    SLIP_PARSE_WORKERS=int(os.environ.get('SLIP_PARSE_WORKERS', 2)),
+    SLIP_PARSE_TIMEOUT=float(os.environ.get('SLIP_PARSE_TIMEOUT', 30)),
+    # Sanction letters render in a process pool; 0 workers renders inline
+    PDF_WORKERS=int(os.environ.get('PDF_WORKERS', 2)),
+    PDF_QUEUE_SIZE=int(os.environ.get('PDF_QUEUE_SIZE', 8)),
+    PDF_JOB_TIMEOUT=float(os.environ.get('PDF_JOB_TIMEOUT', 30)),
+    # Rendered letters are cached on disk by content hash
+    LETTER_CACHE_DIR=os.environ.get('LETTER_CACHE_DIR', 'letter_cache'),
+    LETTER_CACHE_MAX_BYTES=int(os.environ.get('LETTER_CACHE_MAX_BYTES', 256 * 1024 * 1024)),
+    # Bulk reissue gets its own processes so it never starves chat letters; it answers only when
+    # BULK_LETTERS_TOKEN is set and sent as X-Admin-Token, and runs BULK_MAX_EXPORTS at a time
+    BULK_PDF_WORKERS=int(os.environ.get('BULK_PDF_WORKERS', os.cpu_count() or 1)),
+    BULK_LETTERS_TOKEN=os.environ.get('BULK_LETTERS_TOKEN', ''),
+    BULK_MAX_EXPORTS=int(os.environ.get('BULK_MAX_EXPORTS', 1)),
+    # Traces slower than TRACE_SLOW_MS (or failing) are always kept; an empty TRACE_FILE disables tracing
+    TRACE_FILE=os.environ.get('TRACE_FILE', os.path.join(os.getcwd(), 'traces.ndjson')),
+    TRACE_SLOW_MS=float(os.environ.get('TRACE_SLOW_MS', 500)),
+    TRACE_SAMPLE_RATE=float(os.environ.get('TRACE_SAMPLE_RATE', 0.01)),
+    TRACE_MAX_BYTES=int(os.environ.get('TRACE_MAX_BYTES', 10 * 1024 * 1024)),
+    TRACE_BACKUPS=int(os.environ.get('TRACE_BACKUPS', 5)),
+    # /debug/* profiling and memory endpoints answer only when this token is set and sent as X-Debug-Token
+    DEBUG_TOKEN=os.environ.get('DEBUG_TOKEN', ''),
+    # Funnel analytics counters, updated on every save; minute buckets are pruned after the retention window
+    ROLLUPS_DB=os.environ.get('ROLLUPS_DB', os.path.join(os.getcwd(), 'rollups.db')),
+    ROLLUP_MINUTE_RETENTION_DAYS=int(os.environ.get('ROLLUP_MINUTE_RETENTION_DAYS', 14)),
+    # JSON and HTML responses at least this large are gzipped for clients that accept it
+    COMPRESS_MIN_BYTES=int(os.environ.get('COMPRESS_MIN_BYTES', 1024)),
+    COMPRESS_LEVEL=int(os.environ.get('COMPRESS_LEVEL', 6)),
+    # Static files get content-hashed URLs and year-long immutable caching; turn off while editing them
+    STATIC_FINGERPRINTS=os.environ.get('STATIC_FINGERPRINTS', '1') != '0',
+    # Chat retries carrying the same message_id replay the first reply; the last
+    # CHAT_DEDUPE_WINDOW ids per conversation are remembered for CHAT_DEDUPE_TTL seconds
+    CHAT_DEDUPE_WINDOW=int(os.environ.get('CHAT_DEDUPE_WINDOW', 32)),
+    CHAT_DEDUPE_TTL=float(os.environ.get('CHAT_DEDUPE_TTL', 900)),
+    CHAT_REPLAY_WAIT=float(os.environ.get('CHAT_REPLAY_WAIT', 110)),
+    # Concurrent chat turns adapt between the min and max from LLM latency; up to
+    # CHAT_QUEUE_SIZE more wait CHAT_QUEUE_TIMEOUT seconds, the rest get 429 + Retry-After.
+    # Keep the server's thread count above max + queue so the limiter, not the server, queues
+    CHAT_CONCURRENCY_INITIAL=int(os.environ.get('CHAT_CONCURRENCY_INITIAL', 4)),
+    CHAT_CONCURRENCY_MIN=int(os.environ.get('CHAT_CONCURRENCY_MIN', 2)),
+    CHAT_CONCURRENCY_MAX=int(os.environ.get('CHAT_CONCURRENCY_MAX', 16)),
+    CHAT_QUEUE_SIZE=int(os.environ.get('CHAT_QUEUE_SIZE', 8)),
+    CHAT_QUEUE_TIMEOUT=float(os.environ.get('CHAT_QUEUE_TIMEOUT', 10)),
+    # Completed and rejected applications untouched for ARCHIVE_AFTER_DAYS move from the CSV into
+    # monthly compressed segments every ARCHIVE_INTERVAL seconds; an interval of 0 leaves it to the CLI
+    ARCHIVE_DIR=os.environ.get('ARCHIVE_DIR', os.path.join(os.getcwd(), 'archive')),
+    ARCHIVE_AFTER_DAYS=int(os.environ.get('ARCHIVE_AFTER_DAYS', 30)),
+    ARCHIVE_INTERVAL=float(os.environ.get('ARCHIVE_INTERVAL', 3600)),
+    # More than one shard splits applications by conversation id hash across files in
+    # APPLICATION_SHARD_DIR instead of loan_applications.csv (see services.application_store)
+    APPLICATION_SHARDS=int(os.environ.get('APPLICATION_SHARDS', 1)),
+    APPLICATION_SHARD_DIR=os.environ.get('APPLICATION_SHARD_DIR', os.path.join(os.getcwd(), 'applications'))
 )
 
 # CSV file for persistent storage - use absolute path for production
@@ -56,8 +173,9 @@ def safe_import_agents():
     
     return agents
 
-# Get available agent classes
-AGENT_CLASSES = safe_import_agents()
+# Available agent classes, filled in by init_agents(); importing them pulls in
+# groq, so it only happens once a key is configured and the agents are needed
+AGENT_CLASSES = {}
 
 # Initialize agents after Flask app is created
 def init_agents():
@@ -79,6 +197,8 @@ def init_agents():
         under = create_mock_agent("UnderwritingAgent")
         return master, san, under
 
+    AGENT_CLASSES.update(safe_import_agents())
+    
     # Try different approaches to initialize agents
     master = init_agent_safely("MasterAgent", AGENT_CLASSES['MasterAgent'])
     san = init_agent_safely("SanctionAgent", AGENT_CLASSES['SanctionAgent'])
@@ -107,396 +227,209 @@ def init_agent_safely(agent_name, agent_class):
 
 def create_mock_agent(agent_name):
     """Create a mock agent for testing when real agents fail"""
-    class MockAgent:
-        def __init__(self, name):
-            self.name = name
-            
-        def process_message(self, message, conversation, conv_id):
-            customer_data = conversation.get('customer_data', {})
-            
-            # Extract info from current message
-            message_lower = message.lower()
-            
-            # Name collection
-            if not customer_data.get('name'):
-                if any(word in message_lower for word in ['hello', 'hi', 'hey', 'start']):
-                    return {
-                        'message': "Hello! Welcome to Tata Capital. I'm here to help you with your personal loan application. To get started, may I have your full name please?",
-                        'action': 'collect_name',
-                        'data': {}
-                    }
-                elif len(message.split()) >= 1 and not any(char.isdigit() for char in message):
-                    # Extract name (assume first 2 words are name)
-                    name_parts = message.split()[:2]
-                    name = ' '.join(name_parts).title()
-                    customer_data['name'] = name
-                    conversation['customer_data'] = customer_data
-                    
-                    return {
-                        'message': f"Thank you {name}! Now I need your age for the application. How old are you?",
-                        'action': 'collect_age',
-                        'data': {'name': name}
-                    }
-            
-            # Age collection
-            elif not customer_data.get('age'):
-                import re
-                ages = re.findall(r'\b([1-9][0-9]?)\b', message)
-                if ages:
-                    age = int(ages[0])
-                    if age < 18:
-                        return {
-                            'message': "You must be at least 18 years old to apply for a loan. Please enter your correct age.",
-                            'action': 'collect_age',
-                            'data': {}
-                        }
-                    elif age > 80:
-                        return {
-                            'message': "Please enter a valid age (18-80 years).",
-                            'action': 'collect_age',
-                            'data': {}
-                        }
-                    else:
-                        customer_data['age'] = age
-                        conversation['customer_data'] = customer_data
-                        
-                        return {
-                            'message': f"Great! You're {age} years old. What city do you live in?",
-                            'action': 'collect_city',
-                            'data': {'age': age}
-                        }
-                else:
-                    return {
-                        'message': "Please enter your age in numbers (e.g., 25).",
-                        'action': 'collect_age',
-                        'data': {}
-                    }
-            
-            # City collection
-            elif not customer_data.get('city'):
-                if len(message.split()) >= 1 and not any(char.isdigit() for char in message):
-                    city = message.title()
-                    customer_data['city'] = city
-                    conversation['customer_data'] = customer_data
-                    
-                    return {
-                        'message': f"Thank you! You're from {city}. Now please provide your mobile number for verification.",
-                        'action': 'collect_phone',
-                        'data': {'city': city}
-                    }
-                else:
-                    return {
-                        'message': "Please enter a valid city name.",
-                        'action': 'collect_city',
-                        'data': {}
-                    }
-            
-            # Phone collection
-            elif not customer_data.get('phone'):
-                import re
-                phones = re.findall(r'\b([6-9]\d{9})\b', message)
-                if phones:
-                    phone = phones[0]
-                    customer_data['phone'] = phone
-                    conversation['customer_data'] = customer_data
-                    
-                    return {
-                        'message': f"Perfect! Your mobile number {phone} has been recorded. Now please provide your email address.",
-                        'action': 'collect_email',
-                        'data': {'phone': phone}
-                    }
-                else:
-                    return {
-                        'message': "Please enter a valid 10-digit mobile number starting with 6, 7, 8, or 9.",
-                        'action': 'collect_phone',
-                        'data': {}
-                    }
-            
-            # Email collection
-            elif not customer_data.get('email'):
-                import re
-                emails = re.findall(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b', message)
-                if emails:
-                    email = emails[0].lower()
-                    customer_data['email'] = email
-                    conversation['customer_data'] = customer_data
-                    
-                    return {
-                        'message': f"Excellent! Your email {email} has been saved. Now, what type of loan are you interested in? We offer Personal, Home, Car, and Business loans.",
-                        'action': 'collect_loan_type',
-                        'data': {'email': email}
-                    }
-                else:
-                    return {
-                        'message': "Please enter a valid email address (e.g., example@gmail.com).",
-                        'action': 'collect_email',
-                        'data': {}
-                    }
-            
-            # Loan type collection
-            elif not customer_data.get('loan_type'):
-                if any(loan_type in message_lower for loan_type in ['personal', 'home', 'car', 'business']):
-                    loan_type = next(lt for lt in ['personal', 'home', 'car', 'business'] if lt in message_lower)
-                    customer_data['loan_type'] = loan_type
-                    conversation['customer_data'] = customer_data
-                    
-                    return {
-                        'message': f"Great choice! You're interested in a {loan_type} loan. What loan amount are you looking for? (Please enter amount in rupees)",
-                        'action': 'collect_amount',
-                        'data': {'loan_type': loan_type}
-                    }
-                else:
-                    return {
-                        'message': "Please choose from: Personal, Home, Car, or Business loan. Which type interests you?",
-                        'action': 'collect_loan_type',
-                        'data': {}
-                    }
-            
-            # Loan amount collection
-            elif not customer_data.get('loan_amount'):
-                import re
-                amounts = re.findall(r'\d+', message)
-                if amounts:
-                    amount = int(amounts[0])
-                    if amount < 10000:
-                        return {
-                            'message': "The minimum loan amount is ₹10,000. Please enter a valid amount.",
-                            'action': 'collect_amount',
-                            'data': {}
-                        }
-                    elif amount > 5000000:
-                        return {
-                            'message': "For amounts above ₹50 lakhs, please visit our branch. Please enter an amount up to ₹50,00,000.",
-                            'action': 'collect_amount',
-                            'data': {}
-                        }
-                    else:
-                        customer_data['loan_amount'] = amount
-                        conversation['customer_data'] = customer_data
-                        
-                        return {
-                            'message': f"Perfect! You're looking for ₹{amount:,}. Now, could you please tell me your monthly income?",
-                            'action': 'collect_income',
-                            'data': {'loan_amount': amount}
-                        }
-                else:
-                    return {
-                        'message': "Please enter a valid loan amount in numbers (e.g., 100000 for ₹1 lakh).",
-                        'action': 'collect_amount',
-                        'data': {}
-                    }
-            
-            # Monthly income collection
-            elif not customer_data.get('monthly_income'):
-                import re
-                amounts = re.findall(r'\d+', message)
-                if amounts:
-                    income = int(amounts[0])
-                    customer_data['monthly_income'] = income
-                    conversation['customer_data'] = customer_data
-                    
-                    # Calculate eligibility
-                    loan_amount = customer_data.get('loan_amount', 0)
-                    max_eligible = income * 60  # 60x income rule
-                    
-                    if loan_amount <= max_eligible:
-                        return {
-                            'message': f"Excellent! With a monthly income of ₹{income:,}, you're eligible for ₹{loan_amount:,}. Now I need to verify some documents. Please upload your latest salary slip.",
-                            'action': 'collect_documents',
-                            'data': {'monthly_income': income, 'eligible': True}
-                        }
-                    else:
-                        return {
-                            'message': f"Based on your monthly income of ₹{income:,}, you're eligible for up to ₹{max_eligible:,}. Would you like to proceed with this amount instead?",
-                            'action': 'adjust_amount',
-                            'data': {'monthly_income': income, 'max_eligible': max_eligible}
-                        }
-                else:
-                    return {
-                        'message': "Please enter your monthly income in numbers (e.g., 50000).",
-                        'action': 'collect_income',
-                        'data': {}
-                    }
-            
-            # Document upload completed
-            elif customer_data.get('documents_verified'):
-                return {
-                    'message': f"🎉 Great news {customer_data.get('name', 'Customer')}! Your loan application for ₹{customer_data.get('loan_amount', 0):,} has been approved! Your sanction letter is ready for download.",
-                    'action': 'generate_sanction',
-                    'data': {'approved': True}
-                }
-            
-            # Default responses
-            else:
-                if 'yes' in message_lower:
-                    return {
-                        'message': "Great! Please upload your salary slip to continue with the verification process.",
-                        'action': 'collect_documents',
-                        'data': {}
-                    }
-                elif 'no' in message_lower:
-                    return {
-                        'message': "No problem! Feel free to restart the application when you're ready. Thank you for considering Tata Capital!",
-                        'action': 'end_conversation',
-                        'data': {}
-                    }
-                else:
-                    return {
-                        'message': "I'm here to help you with your loan application. Is there anything specific you'd like to know about our loan process?",
-                        'action': 'clarification',
-                        'data': {}
-                    }
-        
-        def verify_salary_slip(self, customer_data, filepath):
-            # Mark documents as verified
-            return {
-                'success': True,
-                'message': "Salary slip verified successfully! All details match your application.",
-                'verification_data': {
-                    'monthly_salary': customer_data.get('monthly_income', 75000),
-                    'employer': 'TCS Limited',
-                    'employment_type': 'Permanent',
-                    'documents_verified': True
-                }
-            }
-            
-        def generate_pdf(self, customer_data):
-            # Generate a comprehensive PDF with all customer details
-            from reportlab.pdfgen import canvas
-            from reportlab.lib.pagesizes import letter
-            from reportlab.lib.styles import getSampleStyleSheet
-            from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-            from reportlab.lib import colors
-            import io
-            from datetime import datetime
-            
-            buffer = io.BytesIO()
-            doc = SimpleDocTemplate(buffer, pagesize=letter, topMargin=50, bottomMargin=50)
-            styles = getSampleStyleSheet()
-            story = []
-            
-            # Header
-            title = Paragraph("<b>TATA CAPITAL LIMITED</b>", styles['Title'])
-            story.append(title)
-            story.append(Spacer(1, 20))
-            
-            subtitle = Paragraph("<b>PERSONAL LOAN SANCTION LETTER</b>", styles['Heading2'])
-            story.append(subtitle)
-            story.append(Spacer(1, 30))
-            
-            # Date and reference
-            date_text = f"Date: {datetime.now().strftime('%B %d, %Y')}"
-            ref_text = f"Reference No: TC/{customer_data.get('phone', '0000000000')[-4:]}/{datetime.now().strftime('%Y%m%d')}"
-            
-            story.append(Paragraph(date_text, styles['Normal']))
-            story.append(Paragraph(ref_text, styles['Normal']))
-            story.append(Spacer(1, 20))
-            
-            # Customer Details Table
-            customer_details = [
-                ['CUSTOMER DETAILS', ''],
-                ['Name', customer_data.get('name', 'N/A')],
-                ['Customer ID', f"TC{customer_data.get('phone', '0000000000')[-6:]}"],
-                ['Age', str(customer_data.get('age', 'N/A'))],
-                ['City', customer_data.get('city', 'N/A')],
-                ['Phone', customer_data.get('phone', 'N/A')],
-                ['Email', customer_data.get('email', 'N/A')]
-            ]
-            
-            customer_table = Table(customer_details, colWidths=[150, 300])
-            customer_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 12),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black)
-            ]))
-            
-            story.append(customer_table)
-            story.append(Spacer(1, 30))
-            
-            # Loan Details
-            loan_details = [
-                ['LOAN DETAILS', ''],
-                ['Loan Type', customer_data.get('loan_type', 'Personal').title()],
-                ['Loan Amount', f"₹{customer_data.get('loan_amount', 0):,}"],
-                ['Monthly Income', f"₹{customer_data.get('monthly_income', 0):,}"],
-                ['Interest Rate', '10.99% per annum'],
-                ['Tenure', '60 months'],
-                ['EMI Amount', f"₹{int(customer_data.get('loan_amount', 0) * 0.022):,}"]
-            ]
-            
-            loan_table = Table(loan_details, colWidths=[150, 300])
-            loan_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 12),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black)
-            ]))
-            
-            story.append(loan_table)
-            story.append(Spacer(1, 30))
-            
-            # Approval message
-            approval_text = f"""
-            Dear {customer_data.get('name', 'Customer')},
-            
-            We are pleased to inform you that your loan application has been approved. 
-            The loan amount of ₹{customer_data.get('loan_amount', 0):,} has been sanctioned 
-            based on your profile and income verification.
-            
-            This sanction is valid for 30 days from the date of this letter. 
-            Please visit our nearest branch to complete the documentation process.
-            
-            Thank you for choosing Tata Capital.
-            
-            Yours sincerely,
-            Loan Processing Team
-            Tata Capital Limited
-            """
-            
-            for line in approval_text.strip().split('\n'):
-                if line.strip():
-                    story.append(Paragraph(line.strip(), styles['Normal']))
-                else:
-                    story.append(Spacer(1, 12))
-            
-            doc.build(story)
-            buffer.seek(0)
-            return buffer
-    
     return MockAgent(agent_name)
 
 # Store active conversations
 conversations = {}
 
-# Global agent variables
+# Time-sortable conversation ids, unique per worker (see services.ids)
+conversation_ids = IdGenerator()
+
+# Worker pool for CPU-bound PDF rendering
+pdf_pool = PdfPool(
+    max_workers=app.config['PDF_WORKERS'],
+    queue_size=app.config['PDF_QUEUE_SIZE'],
+    timeout=app.config['PDF_JOB_TIMEOUT']
+)
+
+# Content-addressed storage for uploaded salary slips; the multipart framing and the
+# conversation_id field fit in UPLOAD_FORM_OVERHEAD on top of the slip itself
+UPLOAD_FORM_OVERHEAD = 64 * 1024
+upload_store = ContentStore(
+    app.config['UPLOAD_FOLDER'],
+    max_bytes=app.config['SALARY_SLIP_MAX_BYTES']
+)
+
+# Salary slip text extraction, cached beside the stored uploads
+slip_extractor = SlipExtractor(
+    app.config['UPLOAD_FOLDER'],
+    max_workers=app.config['SLIP_PARSE_WORKERS'],
+    timeout=app.config['SLIP_PARSE_TIMEOUT']
+)
+
+# On-disk stores, opened by ensure_services() so importing the app writes nothing:
+# the verification job table, the letter cache, the analytics rollups, the
+# application rows and the archive of finished applications
+verification_queue = None
+letter_cache = None
+rollups = None
+application_store = None
+application_archive = None
+
+# Dashboard search over name, phone, email and city; rebuilt from the CSV and
+# the archive in the background by ensure_services() and kept current by
+# save_conversation_to_csv()
+search_index = SearchIndex()
+
+# Content-hashed, precompressed static files (see services.assets)
+assets = None
+if app.config['STATIC_FINGERPRINTS']:
+    assets = AssetManifest(app.static_folder)
+    assets.install(app)
+
+# Replies to recent chat turns, keyed by the client's message id
+chat_turns = IdempotencyCache(
+    window=app.config['CHAT_DEDUPE_WINDOW'],
+    ttl=app.config['CHAT_DEDUPE_TTL']
+)
+
+# Admission control in front of the chat pipeline, sized from LLM latency
+chat_limiter = AdaptiveLimiter(
+    initial_limit=app.config['CHAT_CONCURRENCY_INITIAL'],
+    min_limit=app.config['CHAT_CONCURRENCY_MIN'],
+    max_limit=app.config['CHAT_CONCURRENCY_MAX'],
+    queue_size=app.config['CHAT_QUEUE_SIZE'],
+    queue_timeout=app.config['CHAT_QUEUE_TIMEOUT']
+)
+add_latency_listener(chat_limiter.observe)
+CHAT_CONCURRENCY.set_function(lambda: {
+    (kind,): value for kind, value in chat_limiter.stats().items() if kind in ('limit', 'in_flight', 'queued')
+})
+
+# Per-request traces for chat, upload and letter requests (the trace file is
+# opened by ensure_services())
+TRACED_ENDPOINTS = {'chat', 'upload_salary_slip', 'generate_sanction_letter', 'sanction_letter_download'}
+
+# On-demand profiling and memory introspection (see /debug/* endpoints)
+profiler = Profiler()
+memory_tracker = MemoryTracker()
+
+# Global agent variables, built on first use by ensure_agents()
 master_agent = None
 sanction_agent = None
 underwriting_agent = None
+_agents_ready = False
+_agents_lock = threading.Lock()
+
+# Cold start timings, reported by /api/health
+STARTUP = {'import_ms': None, 'agents_ms': None}
+
+def ensure_agents():
+    """Build the agents once per process: on first use, or from gunicorn's post_worker_init hook"""
+    global master_agent, sanction_agent, underwriting_agent, _agents_ready
+    if _agents_ready:
+        return
+    with _agents_lock:
+        if _agents_ready:
+            return
+        started = time.perf_counter()
+        master_agent, sanction_agent, underwriting_agent = init_agents()
+        STARTUP['agents_ms'] = round((time.perf_counter() - started) * 1000, 1)
+        _agents_ready = True
+
+_services_ready = False
+_services_lock = threading.Lock()
+
+def ensure_services():
+    """Open the stores and start the background threads once per process: from
+    __main__, gunicorn's post_worker_init hook, or the first request"""
+    global verification_queue, letter_cache, rollups, application_store, application_archive, _services_ready
+    if _services_ready:
+        return
+    with _services_lock:
+        if _services_ready:
+            return
+        if app.config['TRACE_FILE']:
+            tracing.configure(
+                app.config['TRACE_FILE'],
+                slow_ms=app.config['TRACE_SLOW_MS'],
+                sample_rate=app.config['TRACE_SAMPLE_RATE'],
+                max_bytes=app.config['TRACE_MAX_BYTES'],
+                backups=app.config['TRACE_BACKUPS']
+            )
+
+        # Background document verification
+        verification_queue = JobQueue(
+            app.config['JOBS_DB'],
+            workers=app.config['VERIFICATION_WORKERS'],
+            max_attempts=app.config['VERIFICATION_MAX_ATTEMPTS']
+        )
+        verification_queue.register(
+            'salary_slip',
+            verify_salary_slip_job,
+            on_success=apply_salary_slip_result,
+            on_dead=mark_salary_slip_dead
+        )
+
+        # Content-addressed cache of rendered letters
+        letter_cache = LetterCache(
+            app.config['LETTER_CACHE_DIR'],
+            max_bytes=app.config['LETTER_CACHE_MAX_BYTES']
+        )
+
+        # Pre-aggregated funnel analytics (see /api/analytics/*)
+        rollups = Rollups(
+            app.config['ROLLUPS_DB'],
+            minute_retention_days=app.config['ROLLUP_MINUTE_RETENTION_DAYS']
+        )
 
-# Move init_csv_file here so it's defined before use
-def init_csv_file():
-	"""Initialize CSV file if it doesn't exist"""
-	if not os.path.exists(CSV_FILE):
-		with open(CSV_FILE, 'w', newline='', encoding='utf-8') as file:
-			writer = csv.writer(file)
-			writer.writerow(CSV_HEADERS)
+        # Application rows: loan_applications.csv, or hash shards each with its own
+        # lock; saves and the archiver hold a shard's lock while rewriting it, and the
+        # lock is also a file lock, so it holds across gunicorn workers. Rows left in
+        # loan_applications.csv move into the shards the first time they are opened
+        if app.config['APPLICATION_SHARDS'] > 1:
+            application_store = ApplicationStore.sharded(
+                app.config['APPLICATION_SHARD_DIR'], app.config['APPLICATION_SHARDS'], CSV_HEADERS,
+                legacy_csv=CSV_FILE
+            )
+        else:
+            application_store = ApplicationStore.single(CSV_FILE, CSV_HEADERS)
+
+        # Finished applications moved out of the CSV (see services.archive)
+        application_archive = ApplicationArchive(app.config['ARCHIVE_DIR'])
+        if app.config['ARCHIVE_INTERVAL'] > 0:
+            start_archiver(
+                application_archive,
+                [(shard.path, shard.lock) for shard in application_store.shards],
+                older_than_days=app.config['ARCHIVE_AFTER_DAYS'],
+                interval=app.config['ARCHIVE_INTERVAL']
+            )
 
-# Initialize CSV file and agents at module import so handlers have access when running under gunicorn/Render.
-# CSV must be initialized before agents in case agents or startup logic rely on persistent storage.
-init_csv_file()
-master_agent, sanction_agent, underwriting_agent = init_agents()
+        store, archive = application_store, application_archive
+        threading.Thread(
+            target=lambda: search_index.build(itertools.chain(
+                *(iter_csv_summaries(path) for path in store.paths),
+                ((row['conversation_id'], csv_summary(row)) for row in archive.iter_rows())
+            )),
+            name='search-index-build', daemon=True
+        ).start()
+
+        # Pick up jobs queued before the last restart without waiting for a new upload
+        verification_queue.start()
+        _services_ready = True
+
+# Agents are built lazily by ensure_agents() and the stores opened by
+# ensure_services(), so importing the app (and booting a gunicorn worker) stays fast.
 
 def save_conversation_to_csv(conversation_id, conversation_data):
-    """Save conversation to CSV file"""
+    """Save conversation to CSV file, re-index it for search and fold the change into the analytics rollups"""
+    with STORE_WRITE_SECONDS.time('applications_csv'), tracing.span('write', store='applications_csv'):
+        row_data = _save_conversation_to_csv(conversation_id, conversation_data)
+    if row_data is not None:
+        search_index.add(conversation_id, csv_summary(row_data))
+    with STORE_WRITE_SECONDS.time('rollups'), tracing.span('write', store='rollups'):
+        try:
+            rollups.record(
+                conversation_id,
+                conversation_data.get('status', 'active'),
+                conversation_data.get('customer_data', {}),
+                conversation_data.get('created_at') or datetime.now().isoformat()
+            )
+        except Exception as e:
+            STORE_WRITE_ERRORS.inc('rollups')
+            app.logger.error(f"Error updating rollups: {e}")
+
+def _save_conversation_to_csv(conversation_id, conversation_data):
     try:
         customer_data = conversation_data.get('customer_data', {})
         
@@ -517,64 +450,71 @@ def save_conversation_to_csv(conversation_id, conversation_data):
             'customer_data_json': json.dumps(customer_data)
         }
         
-        # Check if record exists
-        existing_rows = []
-        record_exists = False
-        
-        if os.path.exists(CSV_FILE):
-            with open(CSV_FILE, 'r', newline='', encoding='utf-8') as file:
-                reader = csv.DictReader(file)
-                for row in reader:
-                    if row['conversation_id'] == conversation_id:
-                        # Update existing record
-                        existing_rows.append(row_data)
-                        record_exists = True
-                    else:
-                        existing_rows.append(row)
-        
-        # Write all records back
-        with open(CSV_FILE, 'w', newline='', encoding='utf-8') as file:
-            writer = csv.DictWriter(file, fieldnames=CSV_HEADERS)
-            writer.writeheader()
-            writer.writerows(existing_rows)
-            
-            # Add new record if it doesn't exist
-            if not record_exists:
-                writer.writerow(row_data)
+        # Replaces the existing record or appends a new one, under the shard's lock
+        application_store.save(row_data)
+        return row_data
                 
     except Exception as e:
+        STORE_WRITE_ERRORS.inc('applications_csv')
         app.logger.error(f"Error saving to CSV: {e}")
 
-def load_conversations_from_csv():
-    """Load all conversations from CSV file"""
-    conversations_data = []
-    
-    if not os.path.exists(CSV_FILE):
+def load_conversations_from_csv(low=None, high=None):
+    """Load conversations from the CSV (every shard, in parallel), optionally only ids in [low, high) (see services.ids.id_bounds)"""
+    def load_shard(shard):
+        conversations_data = []
+        try:
+            for row in shard.rows():
+                if row['conversation_id'] and in_bounds(row['conversation_id'], low, high):  # Skip empty rows
+                    conversations_data.append(conversation_from_row(row))
+        except Exception as e:
+            app.logger.error(f"Error loading from {shard.path}: {e}")
         return conversations_data
     
-    try:
-        with open(CSV_FILE, 'r', newline='', encoding='utf-8') as file:
-            reader = csv.DictReader(file)
-            for row in reader:
-                if row['conversation_id']:  # Skip empty rows
-                    conversations_data.append({
-                        'id': row['conversation_id'],
-                        'customer_name': row['customer_name'],
-                        'age': row['age'],
-                        'city': row['city'],
-                        'phone': row['phone'],
-                        'email': row['email'],
-                        'loan_type': row['loan_type'],
-                        'loan_amount': int(row['loan_amount']) if row['loan_amount'] else 0,
-                        'monthly_income': int(row['monthly_income']) if row['monthly_income'] else 0,
-                        'status': row['status'],
-                        'timestamp': row['updated_at'],
-                        'customer_data': json.loads(row['customer_data_json']) if row['customer_data_json'] else {}
-                    })
-    except Exception as e:
-        app.logger.error(f"Error loading from CSV: {e}")
+    return [conv for shard_data in application_store.map_shards(load_shard) for conv in shard_data]
+
+def conversation_from_row(row):
+    """Dashboard record for an applications CSV row (or an archived one)"""
+    return {
+        'id': row['conversation_id'],
+        'customer_name': row['customer_name'],
+        'age': row['age'],
+        'city': row['city'],
+        'phone': row['phone'],
+        'email': row['email'],
+        'loan_type': row['loan_type'],
+        'loan_amount': int(row['loan_amount']) if row['loan_amount'] else 0,
+        'monthly_income': int(row['monthly_income']) if row['monthly_income'] else 0,
+        'status': row['status'],
+        'timestamp': row['updated_at'],
+        'customer_data': json.loads(row['customer_data_json']) if row['customer_data_json'] else {}
+    }
+
+def find_conversation_record(conversation_id):
+    """Dashboard record for an id from its shard of the CSV, falling back to the archive; None if unknown"""
+    row = application_store.get(conversation_id) or application_archive.find(conversation_id)
+    return conversation_from_row(row) if row else None
+
+def restore_conversation(conversation_id):
+    """Load a conversation from CSV (or the archive) back into memory; returns None if unknown"""
+    conv = find_conversation_record(conversation_id)
+    if conv is None:
+        return None
+    # Reconstruct conversation format
+    conversation_data = {
+        'customer_data': conv['customer_data'],
+        'status': conv['status'],
+        'messages': [
+            {
+                'role': 'bot',
+                'content': f"Restored conversation for {conv['customer_name']}. Current status: {conv['status']}",
+                'timestamp': conv['timestamp']
+            }
+        ]
+    }
     
-    return conversations_data
+    # Restore to memory for current session
+    conversations[conversation_id] = conversation_data
+    return conversation_data
 
 @app.route('/')
 def index():
@@ -586,7 +526,11 @@ def dashboard():
 
 @app.route('/api/chat', methods=['POST'])
 def chat():
-    """Handle chatbot messages"""
+    """Handle chatbot messages
+
+    A client-generated message_id (or Idempotency-Key header) makes the turn
+    safe to retry: a repeat waits for, or replays, the first attempt's reply.
+    """
     try:
         data = request.get_json()
         if not data:
@@ -594,78 +538,37 @@ def chat():
             
         user_message = data.get('message', '').strip()
         conversation_id = data.get('conversation_id', '')
+        message_id = str(data.get('message_id') or request.headers.get('Idempotency-Key') or '')[:128]
         
         if not user_message:
             return jsonify({'error': 'Message cannot be empty'}), 400
         
-        # Generate conversation ID if not provided
-        if not conversation_id:
-            conversation_id = datetime.now().strftime('%Y%m%d%H%M%S%f')
-            conversations[conversation_id] = {
-                'messages': [],
-                'customer_data': {},
-                'status': 'active',
-                'created_at': datetime.now().isoformat()
-            }
-        
-        # Ensure conversation exists
-        if conversation_id not in conversations:
-            conversations[conversation_id] = {
-                'messages': [],
-                'customer_data': {},
-                'status': 'active',
-                'created_at': datetime.now().isoformat()
-            }
-        
-        # Add user message
-        conversations[conversation_id]['messages'].append({
-            'role': 'user',
-            'content': user_message,
-            'timestamp': datetime.now().isoformat()
-        })
-        
-        # Check if master_agent is available
-        if master_agent is None:
-            return jsonify({
-                'error': 'Chat service is currently unavailable. Please try again later.',
-                'conversation_id': conversation_id
-            }), 503
-        
-        # Get master agent response
-        response = master_agent.process_message(
-            user_message,
-            conversations[conversation_id],
-            conversation_id
-        )
-        
-        # Ensure response has required fields
-        if not isinstance(response, dict):
-            response = {
-                'message': str(response),
-                'action': None,
-                'data': {}
-            }
-        
-        # Add bot response
-        conversations[conversation_id]['messages'].append({
-            'role': 'bot',
-            'content': response.get('message', 'I apologize, but I cannot process your request right now.'),
-            'timestamp': datetime.now().isoformat(),
-            'action': response.get('action'),
-            'data': response.get('data', {})
-        })
+        if not message_id:
+            return chat_response(*admitted_chat_turn(user_message, conversation_id))
         
-        # Save to CSV after each meaningful update
-        if response.get('data') or response.get('action'):
-            save_conversation_to_csv(conversation_id, conversations[conversation_id])
+        # A first message has no conversation yet; its id alone identifies the turn
+        scope = conversation_id or f"new:{message_id}"
+        turn, owner = chat_turns.claim(scope, message_id)
+        if not owner:
+            CHAT_REPLAYS.inc('completed' if turn.done.is_set() else 'in_flight')
+            result = turn.wait(app.config['CHAT_REPLAY_WAIT'])
+            if result is None:
+                return jsonify({
+                    'error': 'This message is still being processed. Please try again shortly.',
+                    'conversation_id': conversation_id
+                }), 409
+            tracing.set_attributes(replayed=True)
+            response = chat_response(*result)
+            response.headers['Idempotent-Replayed'] = 'true'
+            return response
         
-        return jsonify({
-            'conversation_id': conversation_id,
-            'response': response.get('message', 'Sorry, I cannot help with that right now.'),
-            'action': response.get('action'),
-            'data': response.get('data', {}),
-            'status': conversations[conversation_id]['status']
-        })
+        result = ({'error': 'An internal error occurred. Please try again.'}, 500)
+        try:
+            result = admitted_chat_turn(user_message, conversation_id)
+        finally:
+            # Failures and refusals are not cached: the client's retry runs the turn again
+            chat_turns.finish(scope, message_id, turn, result, keep=result[1] < 500 and result[1] != 429)
+        return chat_response(*result)
         
     except Exception as e:
         app.logger.exception("Error in chat endpoint: %s", e)
@@ -674,12 +577,179 @@ def chat():
             'details': str(e) if app.debug else None
         }), 500
 
+def chat_response(body, status):
+    response = jsonify(body)
+    response.status_code = status
+    if status == 429:
+        response.headers['Retry-After'] = str(body['retry_after'])
+    return response
+
+def admitted_chat_turn(user_message, conversation_id):
+    """chat_turn() behind the adaptive concurrency limit; a refused turn is a 429 with Retry-After"""
+    try:
+        queued = chat_limiter.acquire()
+    except AdmissionRejected as e:
+        CHAT_ADMISSIONS.inc(e.reason)
+        tracing.set_attributes(admission=e.reason)
+        return {
+            'error': 'We are handling a lot of conversations right now. Please try again in a moment.',
+            'retry_after': e.retry_after,
+            'conversation_id': conversation_id
+        }, 429
+    CHAT_ADMISSIONS.inc('queued' if queued else 'admitted')
+    try:
+        return chat_turn(user_message, conversation_id)
+    finally:
+        chat_limiter.release()
+
+def chat_turn(user_message, conversation_id):
+    """Run one message through the master agent; returns (response body, status)"""
+    # Generate conversation ID if not provided
+    if not conversation_id:
+        conversation_id = conversation_ids.next_id()
+        conversations[conversation_id] = {
+            'messages': [],
+            'customer_data': {},
+            'status': 'active',
+            'created_at': datetime.now().isoformat()
+        }
+    
+    tracing.set_attributes(conversation_id=conversation_id)
+    
+    # Ensure conversation exists
+    if conversation_id not in conversations:
+        conversations[conversation_id] = {
+            'messages': [],
+            'customer_data': {},
+            'status': 'active',
+            'created_at': datetime.now().isoformat()
+        }
+    
+    # Add user message
+    conversations[conversation_id]['messages'].append({
+        'role': 'user',
+        'content': user_message,
+        'timestamp': datetime.now().isoformat()
+    })
+    
+    # Check if master_agent is available
+    ensure_agents()
+    if master_agent is None:
+        return {
+            'error': 'Chat service is currently unavailable. Please try again later.',
+            'conversation_id': conversation_id
+        }, 503
+    
+    # Get master agent response
+    response = master_agent.process_message(
+        user_message,
+        conversations[conversation_id],
+        conversation_id
+    )
+    
+    # Ensure response has required fields
+    if not isinstance(response, dict):
+        response = {
+            'message': str(response),
+            'action': None,
+            'data': {}
+        }
+    
+    # Add bot response
+    conversations[conversation_id]['messages'].append({
+        'role': 'bot',
+        'content': response.get('message', 'I apologize, but I cannot process your request right now.'),
+        'timestamp': datetime.now().isoformat(),
+        'action': response.get('action'),
+        'data': response.get('data', {})
+    })
+    
+    # Save to CSV after each meaningful update
+    if response.get('data') or response.get('action'):
+        save_conversation_to_csv(conversation_id, conversations[conversation_id])
+    
+    return {
+        'conversation_id': conversation_id,
+        'response': response.get('message', 'Sorry, I cannot help with that right now.'),
+        'action': response.get('action'),
+        'data': response.get('data', {}),
+        'status': conversations[conversation_id]['status']
+    }, 200
+
+def verify_salary_slip_job(payload):
+    """Job handler: extract the slip's figures, then let the underwriting agent (or mock) decide"""
+    tracing.set_attributes(conversation_id=payload['conversation_id'])
+    conversation = conversations.get(payload['conversation_id']) or restore_conversation(payload['conversation_id'])
+    customer_data = conversation['customer_data'] if conversation else payload['customer_data']
+    
+    # Parsed in the extraction pool and cached by content hash
+    slip = slip_extractor.extract(payload['sha256'], payload['path'])
+    
+    ensure_agents()
+    if underwriting_agent is None:
+        return {
+            'success': True,
+            'message': 'File uploaded successfully! (Mock verification)',
+            'verification_data': {
+                'monthly_salary': slip.get('net_salary') or 75000,
+                'employer': slip.get('employer') or 'TCS Limited',
+                'employment_type': 'Permanent',
+                'documents_verified': True
+            }
+        }
+    return underwriting_agent.verify_salary_slip(customer_data, payload['path'], slip=slip)
+
+def apply_salary_slip_result(job_id, payload, result):
+    """Job callback: record the verification outcome on the conversation"""
+    conversation_id = payload['conversation_id']
+    conversation = conversations.get(conversation_id) or restore_conversation(conversation_id)
+    if conversation is None:
+        app.logger.error(f"Verification job {job_id}: conversation {conversation_id} not found")
+        return
+    
+    conversation['salary_slip'] = {'sha256': payload['sha256'], 'result': result}
+    conversation['customer_data']['salary_slip_sha256'] = payload['sha256']
+    
+    # Update conversation status
+    if result.get('success'):
+        conversation['status'] = 'documents_verified'
+        conversation['customer_data'].update(result.get('verification_data', {}))
+    elif result.get('status') == 'rejected':
+        conversation['status'] = 'rejected'
+    elif result.get('status') == 'manual_review':
+        # Unreadable figures (e.g. a photographed slip): a person verifies it
+        conversation['status'] = 'pending_verification'
+    
+    # Save to CSV
+    save_conversation_to_csv(conversation_id, conversation)
+
+def mark_salary_slip_dead(job_id, payload, error):
+    """Job callback: a slip that kept failing needs manual review"""
+    conversation_id = payload['conversation_id']
+    conversation = conversations.get(conversation_id) or restore_conversation(conversation_id)
+    if conversation is None:
+        app.logger.error(f"Verification job {job_id}: conversation {conversation_id} not found")
+        return
+    conversation['status'] = 'pending_verification'
+    save_conversation_to_csv(conversation_id, conversation)
+
 @app.route('/api/upload-salary-slip', methods=['POST'])
 def upload_salary_slip():
     """Handle salary slip upload"""
     try:
-        conversation_id = request.form.get('conversation_id')
-        file = request.files.get('file')
+        # Refuse an oversized body from its Content-Length before reading any of it
+        if (request.content_length or 0) > upload_store.max_bytes + UPLOAD_FORM_OVERHEAD:
+            return jsonify({'error': f"File exceeds the {upload_store.max_bytes / (1024 * 1024):g} MB limit"}), 413
+        
+        # Parsing the form writes the file into the upload store as it arrives
+        try:
+            conversation_id = request.form.get('conversation_id')
+            file = request.files.get('file')
+        except UnsupportedFileType:
+            return jsonify({'error': 'Invalid file type. Please upload PDF, JPG, or PNG files only.'}), 400
+        except UploadTooLarge as e:
+            return jsonify({'error': str(e)}), 413
+        tracing.set_attributes(conversation_id=conversation_id)
         
         if not conversation_id:
             return jsonify({'error': 'Conversation ID is required'}), 400
@@ -690,48 +760,40 @@ def upload_salary_slip():
         if conversation_id not in conversations:
             return jsonify({'error': 'Invalid conversation ID'}), 400
         
-        # Validate file type
-        allowed_extensions = {'.pdf', '.jpg', '.jpeg', '.png'}
-        file_extension = os.path.splitext(file.filename)[1].lower()
-        if file_extension not in allowed_extensions:
+        conversation = conversations[conversation_id]
+        
+        # Move the parsed file to its digest path; the type is sniffed from magic bytes
+        try:
+            stored = upload_store.commit(file.stream)
+        except UnsupportedFileType:
             return jsonify({'error': 'Invalid file type. Please upload PDF, JPG, or PNG files only.'}), 400
+        except UploadTooLarge as e:
+            return jsonify({'error': str(e)}), 413
         
-        # Save file temporarily - use app config for upload folder
-        upload_folder = app.config['UPLOAD_FOLDER']
-        filename = f"salary_slip_{conversation_id}{file_extension}"
-        filepath = os.path.join(upload_folder, filename)
-        os.makedirs(upload_folder, exist_ok=True)
-        file.save(filepath)
-        
-        # Process with underwriting agent (or mock)
-        if underwriting_agent is None:
-            result = {
-                'success': True,
-                'message': 'File uploaded successfully! (Mock verification)',
-                'verification_data': {
-                    'monthly_salary': 75000,
-                    'employer': 'TCS Limited',
-                    'employment_type': 'Permanent',
-                    'documents_verified': True
-                }
-            }
-        else:
-            result = underwriting_agent.verify_salary_slip(
-                conversations[conversation_id]['customer_data'],
-                filepath
-            )
+        # Re-upload of the slip already checked for this conversation: skip verification
+        previous = conversation.get('salary_slip')
+        if previous and previous['sha256'] == stored.digest:
+            return jsonify(dict(previous['result'], duplicate=True))
         
-        # Update conversation status
-        if result.get('success'):
-            conversations[conversation_id]['status'] = 'documents_verified'
-            conversations[conversation_id]['customer_data'].update(
-                result.get('verification_data', {})
-            )
-            
-            # Save to CSV
-            save_conversation_to_csv(conversation_id, conversations[conversation_id])
+        payload = {
+            'conversation_id': conversation_id,
+            'path': stored.path,
+            'sha256': stored.digest,
+            'customer_data': conversation['customer_data']
+        }
+        
+        if not app.config['VERIFICATION_WORKERS']:
+            result = verify_salary_slip_job(payload)
+            apply_salary_slip_result(None, payload, result)
+            return jsonify(result)
         
-        return jsonify(result)
+        # Verify in the background; the client polls the job status
+        job_id = verification_queue.enqueue('salary_slip', payload, dedupe_key=f"{conversation_id}:{stored.digest}")
+        return jsonify({
+            'job_id': job_id,
+            'status': 'queued',
+            'status_url': f"/api/verification-jobs/{job_id}"
+        }), 202
         
     except Exception as e:
         app.logger.exception("Error in upload endpoint: %s", e)
@@ -740,12 +802,58 @@ def upload_salary_slip():
             'details': str(e) if app.debug else None
         }), 500
 
+@app.route('/api/verification-jobs/<job_id>', methods=['GET'])
+def verification_job_status(job_id):
+    """Poll a salary slip verification job"""
+    job = verification_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job ID'}), 404
+    return jsonify(job), 202 if job['status'] in ('queued', 'running') else 200
+
+@app.route('/api/verification-jobs', methods=['GET'])
+def list_verification_jobs():
+    """List verification jobs, e.g. ?status=dead for the dead-letter queue"""
+    limit = min(int(request.args.get('limit', 100)), 1000)
+    return jsonify({'jobs': verification_queue.list(request.args.get('status'), limit)})
+
+@app.route('/api/verification-jobs/<job_id>/retry', methods=['POST'])
+def retry_verification_job(job_id):
+    """Requeue a dead-lettered verification job"""
+    if not verification_queue.requeue(job_id):
+        return jsonify({'error': 'Job is not in the dead-letter queue'}), 409
+    return jsonify(verification_queue.get(job_id)), 202
+
+def letter_download_name(customer_data):
+    return f"sanction_letter_{customer_data.get('name', 'customer').replace(' ', '_')}.pdf"
+
+def mark_letter_issued(conversation_id):
+    """Mark the conversation completed once its sanction letter is rendered"""
+    conversation = conversations.get(conversation_id)
+    if conversation and conversation['status'] != 'completed':
+        conversation['status'] = 'completed'
+        save_conversation_to_csv(conversation_id, conversation)
+
+def send_cached_letter(source, cache_key, download_name):
+    """Send a letter (a cache path, or a file object of its bytes); repeat downloads revalidate to 304 via ETag"""
+    response = send_file(
+        source,
+        mimetype='application/pdf',
+        as_attachment=True,
+        download_name=download_name,
+        conditional=True,
+        etag=cache_key,
+        max_age=0
+    )
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
 @app.route('/api/generate-sanction-letter', methods=['POST'])
 def generate_sanction_letter():
     """Generate sanction letter PDF"""
     try:
         data = request.get_json()
         conversation_id = data.get('conversation_id')
+        tracing.set_attributes(conversation_id=conversation_id)
         
         if not conversation_id:
             return jsonify({'error': 'Conversation ID is required'}), 400
@@ -763,26 +871,72 @@ def generate_sanction_letter():
                 'error': f'Missing required information: {", ".join(missing_fields)}'
             }), 400
         
-        # Generate PDF (or mock)
-        if sanction_agent is None:
-            # Return mock PDF
-            pdf_buffer = create_mock_agent("SanctionAgent").generate_pdf(customer_data)
-        else:
-            pdf_buffer = sanction_agent.generate_pdf(customer_data)
+        ensure_agents()
+        agent = sanction_agent if sanction_agent is not None else create_mock_agent("SanctionAgent")
+        layout = getattr(agent, 'letter_layout', None)
+        download_name = letter_download_name(customer_data)
         
-        # Update conversation status to completed
-        conversations[conversation_id]['status'] = 'completed'
+        if not layout:
+            # Unknown agent: no cache key available, render inline
+            pdf_buffer = agent.generate_pdf(customer_data)
+            mark_letter_issued(conversation_id)
+            return send_file(pdf_buffer, mimetype='application/pdf', as_attachment=True, download_name=download_name)
         
-        # Save final status to CSV
-        save_conversation_to_csv(conversation_id, conversations[conversation_id])
+        # Only regenerate when the rendered fields, issue date or template change
+        today = datetime.now()
+        cache_key = letter_cache_key(layout, customer_data, today)
+        cached_path = letter_cache.get(cache_key)
         
-        return send_file(
-            pdf_buffer,
-            mimetype='application/pdf',
-            as_attachment=True,
-            download_name=f"sanction_letter_{customer_data.get('name', 'customer').replace(' ', '_')}.pdf"
-        )
+        if cached_path:
+            mark_letter_issued(conversation_id)
+            if data.get('async'):
+                return jsonify({
+                    'job_id': cache_key,
+                    'status': 'done',
+                    'status_url': f"/api/sanction-letter/{cache_key}",
+                    'download_url': f"/api/sanction-letter/{cache_key}/download"
+                })
+            return send_cached_letter(cached_path, cache_key, download_name)
+        
+        def store(pdf_bytes):
+            letter_cache.put(cache_key, pdf_bytes)
+            mark_letter_issued(conversation_id)
         
+        if pdf_pool.enabled:
+            # Async mode: hand back a job id and let the client poll
+            if data.get('async'):
+                job_id = pdf_pool.submit(
+                    layout, customer_data, today,
+                    job_id=cache_key,
+                    on_success=store,
+                    meta={'download_name': download_name}
+                )
+                return jsonify({
+                    'job_id': job_id,
+                    'status': 'pending',
+                    'status_url': f"/api/sanction-letter/{job_id}",
+                    'download_url': f"/api/sanction-letter/{job_id}/download"
+                }), 202
+            
+            # Sync mode: this thread waits on the pool, not on PDF CPU work
+            pdf_bytes = pdf_pool.render(layout, customer_data, today, job_id=cache_key).getvalue()
+        else:
+            pdf_bytes = agent.generate_pdf(customer_data).getvalue()
+        
+        # Update conversation status to completed and save final status to CSV
+        store(pdf_bytes)
+        
+        # Sent from memory: the cache may have evicted (or failed to write) the file already
+        return send_cached_letter(io.BytesIO(pdf_bytes), cache_key, download_name)
+        
+    except PdfQueueFull as e:
+        app.logger.warning("Sanction letter rejected: %s", e)
+        response = jsonify({'error': 'Sanction letter service is busy. Please try again shortly.'})
+        response.headers['Retry-After'] = '2'
+        return response, 503
+    except PdfJobTimeout as e:
+        app.logger.error("Sanction letter timed out: %s", e)
+        return jsonify({'error': 'PDF generation timed out. Please try again.'}), 504
     except Exception as e:
         app.logger.exception("Error in generate PDF endpoint: %s", e)
         return jsonify({
@@ -790,12 +944,140 @@ def generate_sanction_letter():
             'details': str(e) if app.debug else None
         }), 500
 
+@app.route('/api/sanction-letter/<job_id>', methods=['GET'])
+def sanction_letter_status(job_id):
+    """Poll an async sanction letter job"""
+    status = 'done' if letter_cache.get(job_id) else pdf_pool.status(job_id)
+    if status is None:
+        return jsonify({'error': 'Unknown job ID'}), 404
+    
+    payload = {'job_id': job_id, 'status': status}
+    if status == 'done':
+        payload['download_url'] = f"/api/sanction-letter/{job_id}/download"
+    return jsonify(payload), 202 if status == 'pending' else 200
+
+@app.route('/api/sanction-letter/<job_id>/download', methods=['GET'])
+def sanction_letter_download(job_id):
+    """Download the PDF produced by an async sanction letter job"""
+    download_name = pdf_pool.meta(job_id).get('download_name', 'sanction_letter.pdf')
+    cached_path = letter_cache.get(job_id)
+    if cached_path:
+        return send_cached_letter(cached_path, job_id, download_name)
+    
+    status = pdf_pool.status(job_id)
+    if status is None:
+        return jsonify({'error': 'Unknown job ID'}), 404
+    if status == 'pending':
+        return jsonify({'job_id': job_id, 'status': status}), 202
+    if status == 'failed':
+        return jsonify({'error': 'PDF generation failed. Please try again.'}), 500
+    
+    return send_file(
+        pdf_pool.result(job_id),
+        mimetype='application/pdf',
+        as_attachment=True,
+        download_name=download_name
+    )
+
+def token_endpoint(config_key, header):
+    """Decorator hiding an endpoint (404) unless app.config[config_key] is set and presented in `header`"""
+    def decorator(view):
+        @wraps(view)
+        def guarded(*args, **kwargs):
+            token = app.config[config_key]
+            presented = request.headers.get(header, '')
+            if not token or not hmac.compare_digest(presented.encode(), token.encode()):
+                return jsonify({'error': 'Not found'}), 404
+            return view(*args, **kwargs)
+        return guarded
+    return decorator
+
+# Each export runs its own render processes, so only a few may run at once
+bulk_exports = threading.BoundedSemaphore(app.config['BULK_MAX_EXPORTS'])
+
+@app.route('/api/sanction-letters/bulk', methods=['GET'])
+@token_endpoint('BULK_LETTERS_TOKEN', 'X-Admin-Token')
+def bulk_sanction_letters():
+    """Stream a ZIP of sanction letters for applications in a date range"""
+    if not bulk_exports.acquire(blocking=False):
+        response = jsonify({'error': 'A bulk export is already running. Please try again later.'})
+        response.headers['Retry-After'] = '60'
+        return response, 429
+    try:
+        filters = {
+            'date_from': request.args.get('from'),
+            'date_to': request.args.get('to'),
+            'status': request.args.get('status', 'completed')
+        }
+        after = request.args.get('after')
+        ensure_agents()
+        layout = getattr(sanction_agent, 'letter_layout', None) or 'summary'
+        
+        filters['archive'] = application_archive
+        if not any(map(os.path.exists, application_store.paths)) and not application_archive.stats()['rows']:
+            bulk_exports.release()
+            return jsonify({'error': 'No applications found'}), 404
+        
+        total = bulk_letters.count_applications(application_store.paths, after=after, **filters)
+        
+        def progress(done, conversation_id, error):
+            if error:
+                app.logger.error(f"Bulk letter for {conversation_id} failed: {error}")
+            if done % 50 == 0 or done == total:
+                app.logger.info(f"Bulk sanction letters: {done}/{total}")
+        
+        applications = bulk_letters.select_applications(application_store.paths, after=after, **filters)
+        results = bulk_letters.render_many(applications, layout, workers=app.config['BULK_PDF_WORKERS'])
+        
+        response = Response(
+            stream_with_context(bulk_letters.stream_zip(results, on_progress=progress)),
+            mimetype='application/zip',
+            headers={
+                'Content-Disposition': 'attachment; filename=sanction_letters.zip',
+                # Entries are in archive then CSV (shard) order; resume an interrupted download with
+                # ?after=<last conversation_id received>
+                'X-Total-Letters': str(total)
+            }
+        )
+        # The slot is held until the stream (and its render processes) is closed
+        response.call_on_close(bulk_exports.release)
+        return response
+    except ValueError as e:
+        bulk_exports.release()
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        bulk_exports.release()
+        app.logger.exception("Error in bulk sanction letters: %s", e)
+        return jsonify({'error': 'Bulk letter generation failed'}), 500
+
+def listing(rows):
+    """Rows as sent to the client: a list of objects, or one array per field with ?format=columnar
+
+    ?fields=id,status,... keeps only those fields in either layout.
+    """
+    fields = [field for field in request.args.get('fields', '').split(',') if field] or None
+    if request.args.get('format') == 'columnar':
+        return to_columns(rows, fields)
+    if fields:
+        return [{field: row.get(field) for field in fields} for row in rows]
+    return rows
+
 @app.route('/api/dashboard-stats', methods=['GET'])
 def dashboard_stats():
-    """Get dashboard statistics from CSV and memory"""
+    """Get dashboard statistics from CSV and memory
+
+    ?from=&to= (ISO UTC datetimes) limit it to conversations created in that
+    range, compared directly against the time-sortable conversation ids.
+    Archived applications count towards the totals of an unbounded request
+    (from the segment indexes) but are not listed.
+    """
+    try:
+        low, high = id_bounds(request.args.get('from'), request.args.get('to'))
+    except ValueError:
+        return jsonify({'error': "'from' and 'to' must be ISO datetimes"}), 400
     try:
         # Load from CSV for persistent data
-        csv_conversations = load_conversations_from_csv()
+        csv_conversations = load_conversations_from_csv(low, high)
         
         # Combine with in-memory conversations
         all_conversations = {}
@@ -805,7 +1087,9 @@ def dashboard_stats():
             all_conversations[conv['id']] = conv
         
         # Add/update with in-memory data
-        for conv_id, conv_data in conversations.items():
+        for conv_id, conv_data in list(conversations.items()):
+            if not in_bounds(conv_id, low, high):
+                continue
             customer_data = conv_data.get('customer_data', {})
             all_conversations[conv_id] = {
                 'id': conv_id,
@@ -818,13 +1102,16 @@ def dashboard_stats():
         
         # Calculate stats
         conversation_list = list(all_conversations.values())
+        archived = application_archive.status_counts() if low is None and high is None else {}
         stats = {
-            'total_conversations': len(conversation_list),
+            'total_conversations': len(conversation_list) + sum(archived.values()),
+            'archived_conversations': sum(archived.values()),
             'active_conversations': sum(1 for c in conversation_list if c['status'] == 'active'),
-            'completed_loans': sum(1 for c in conversation_list if c['status'] == 'completed'),
-            'rejected_loans': sum(1 for c in conversation_list if c['status'] == 'rejected'),
+            'completed_loans': sum(1 for c in conversation_list if c['status'] == 'completed') + archived.get('completed', 0),
+            'rejected_loans': sum(1 for c in conversation_list if c['status'] == 'rejected') + archived.get('rejected', 0),
             'pending_verification': sum(1 for c in conversation_list if c['status'] in ['documents_verified', 'pending_verification']),
-            'conversations': sorted(conversation_list, key=lambda x: x['timestamp'], reverse=True)
+            # Ids sort by creation time, newest first
+            'conversations': listing(sorted(conversation_list, key=lambda x: x['id'], reverse=True))
         }
         
         return jsonify(stats)
@@ -832,64 +1119,277 @@ def dashboard_stats():
         app.logger.exception("Error in dashboard stats: %s", e)
         return jsonify({'error': 'Failed to fetch dashboard statistics'}), 500
 
+def analytics_range(default_days=30):
+    """(start, end, loan_type, city) from ?from=&to=&loan_type=&city=; to defaults to now, from to `default_days` earlier"""
+    end = request.args.get('to')
+    end = wall_seconds(end) if end else wall_seconds(datetime.now()) + 1
+    start = request.args.get('from')
+    # Default to whole days so the range reads day buckets, not minute ones that get pruned
+    start = wall_seconds(start) if start else (end // 86400 - default_days) * 86400
+    if start >= end:
+        raise ValueError("'from' must be before 'to'")
+    return start, end, request.args.get('loan_type'), request.args.get('city')
+
+@app.route('/api/analytics/series', methods=['GET'])
+def analytics_series():
+    """Applications and funnel counters per minute/hour/day bucket, optionally split by loan_type and city"""
+    try:
+        start, end, loan_type, city = analytics_range()
+        granularity = request.args.get('granularity', 'hour')
+        group_by = [dim for dim in request.args.get('group_by', '').split(',') if dim]
+        metrics = [m for m in request.args.get('metrics', 'applications').split(',') if m]
+        if granularity == 'minute' and end - start > 7 * 86400:
+            raise ValueError("minute granularity covers at most 7 days; use hour or day")
+        series = rollups.series(granularity, start, end, group_by, metrics, loan_type, city)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'granularity': granularity, 'group_by': group_by, 'series': series})
+
+@app.route('/api/analytics/funnel', methods=['GET'])
+def analytics_funnel():
+    """Conversion from greeting through KYC and eligibility to approval for applications created in a range"""
+    try:
+        start, end, loan_type, city = analytics_range()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(rollups.funnel(start, end, loan_type, city))
+
+@app.route('/api/analytics/histograms', methods=['GET'])
+def analytics_histograms():
+    """Loan amount and monthly income distributions for applications created in a range"""
+    try:
+        start, end, loan_type, city = analytics_range()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(rollups.histograms(start, end, loan_type, city))
+
+@app.route('/api/search', methods=['GET'])
+def search_applications():
+    """Ranked applications whose name, phone, email or city matches every word of ?q= (prefixes allowed)"""
+    query = request.args.get('q', '')
+    try:
+        limit = min(max(int(request.args.get('limit', 20)), 1), 100)
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    if not search_index.ready:
+        return jsonify({'error': 'Search index is still building', **search_index.stats()}), 503
+    started = time.perf_counter()
+    found = search_index.search(query, limit)
+    found['results'] = listing(found['results'])
+    found['took_ms'] = round((time.perf_counter() - started) * 1000, 3)
+    found['query'] = query
+    return jsonify(found)
+
 # Add endpoint to restore conversation from CSV
 @app.route('/api/conversation/<conversation_id>', methods=['GET'])
 def get_conversation(conversation_id):
-    """Get conversation details from memory or CSV"""
+    """Get conversation details from memory, CSV or the archive"""
     try:
         # First check in-memory conversations
-        if conversation_id in conversations:
-            return jsonify(conversations[conversation_id])
+        conversation_data = conversations.get(conversation_id)
         
         # If not in memory, try to load from CSV
-        csv_conversations = load_conversations_from_csv()
-        for conv in csv_conversations:
-            if conv['id'] == conversation_id:
-                # Reconstruct conversation format
-                conversation_data = {
-                    'customer_data': conv['customer_data'],
-                    'status': conv['status'],
-                    'messages': [
-                        {
-                            'role': 'bot',
-                            'content': f"Restored conversation for {conv['customer_name']}. Current status: {conv['status']}",
-                            'timestamp': conv['timestamp']
-                        }
-                    ]
-                }
-                
-                # Restore to memory for current session
-                conversations[conversation_id] = conversation_data
-                
-                return jsonify(conversation_data)
+        if conversation_data is None:
+            conversation_data = restore_conversation(conversation_id)
+        if conversation_data is not None:
+            return jsonify(dict(conversation_data, messages=listing(conversation_data.get('messages', []))))
         
         return jsonify({'error': 'Conversation not found'}), 404
     except Exception as e:
         app.logger.exception("Error fetching conversation: %s", e)
         return jsonify({'error': 'Failed to fetch conversation'}), 500
 
+@app.before_request
+def start_request_timer():
+    request.started_at = time.perf_counter()
+    ensure_services()
+    if request.endpoint in TRACED_ENDPOINTS:
+        request.trace = tracing.begin(request.endpoint, method=request.method)
+    if profiler.active and not (request.endpoint or '').startswith('debug_'):
+        request.profile = profiler.begin_request()
+
+@app.teardown_request
+def finish_request_trace(error=None):
+    profile = getattr(request, 'profile', None)
+    if profile is not None:
+        profiler.end_request(profile)
+    tracing.finish(getattr(request, 'trace', None), error)
+
 # Add CORS headers for frontend compatibility
 @app.after_request
 def after_request(response):
+    started_at = getattr(request, 'started_at', None)
+    if started_at is not None:
+        # Label by route rule, not path, so ids in URLs don't explode the series count
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        HTTP_SECONDS.observe(time.perf_counter() - started_at, endpoint, request.method, str(response.status_code))
+    trace_id = tracing.current_trace_id()
+    if trace_id:
+        tracing.set_attributes(status=response.status_code)
+        if response.status_code >= 500:
+            tracing.record_error(f"HTTP {response.status_code}")
+        response.headers['X-Trace-Id'] = trace_id
     response.headers.add('Access-Control-Allow-Origin', '*')
     response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization')
     response.headers.add('Access-Control-Allow-Methods', 'GET,PUT,POST,DELETE,OPTIONS')
     return response
 
+# Registered after after_request(), so it runs first and the compression
+# time is included in the request latency metric
+@app.after_request
+def compress(response):
+    return compress_response(
+        response, request.accept_encodings,
+        min_bytes=app.config['COMPRESS_MIN_BYTES'], level=app.config['COMPRESS_LEVEL']
+    )
+
 # Add health check endpoint
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
+    def agent_status(agent):
+        if not _agents_ready:
+            return 'not_loaded'
+        return 'ready' if agent and not hasattr(agent, 'name') else 'mock'
+    
     return jsonify({
         'status': 'healthy',
         'timestamp': datetime.now().isoformat(),
         'agents': {
-            'master_agent': 'ready' if master_agent and not hasattr(master_agent, 'name') else 'mock',
-            'sanction_agent': 'ready' if sanction_agent and not hasattr(sanction_agent, 'name') else 'mock',
-            'underwriting_agent': 'ready' if underwriting_agent and not hasattr(underwriting_agent, 'name') else 'mock'
-        }
+            'master_agent': agent_status(master_agent),
+            'sanction_agent': agent_status(sanction_agent),
+            'underwriting_agent': agent_status(underwriting_agent)
+        },
+        'chat_admission': chat_limiter.stats(),
+        'startup': STARTUP
     })
 
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Prometheus scrape endpoint (per-process when running several gunicorn workers)"""
+    return Response(metrics.REGISTRY.render(), content_type=metrics.CONTENT_TYPE)
+
+# Hide a debug endpoint unless DEBUG_TOKEN is configured and presented
+debug_endpoint = token_endpoint('DEBUG_TOKEN', 'X-Debug-Token')
+
+@app.route('/debug/profile', methods=['POST'])
+@debug_endpoint
+def debug_start_profile():
+    """Profile the next N requests (deterministic) or a time window (deterministic or sampling)"""
+    data = request.get_json(silent=True) or {}
+    try:
+        session = profiler.start(
+            mode=data.get('mode', 'deterministic'),
+            requests=data.get('requests'),
+            seconds=data.get('seconds'),
+            interval_ms=data.get('interval_ms', 5)
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 409
+    return jsonify(session.describe()), 201
+
+@app.route('/debug/profile', methods=['GET'])
+@debug_endpoint
+def debug_profile_status():
+    session = profiler.current()
+    if session is None:
+        return jsonify({'error': 'No profiling session'}), 404
+    return jsonify(session.describe())
+
+@app.route('/debug/profile/stop', methods=['POST'])
+@debug_endpoint
+def debug_stop_profile():
+    session = profiler.stop()
+    if session is None:
+        return jsonify({'error': 'No profiling session'}), 404
+    return jsonify(session.describe())
+
+@app.route('/debug/profile/result', methods=['GET'])
+@debug_endpoint
+def debug_profile_result():
+    """?format=text|pstats for deterministic sessions, text|collapsed for sampling ones"""
+    session = profiler.current()
+    if session is None:
+        return jsonify({'error': 'No profiling session'}), 404
+    if not session.done:
+        return jsonify(session.describe()), 202
+    
+    output = request.args.get('format', 'text')
+    if session.mode == 'sampling':
+        if output not in ('text', 'collapsed'):
+            return jsonify({'error': 'Sampling sessions support format=text or collapsed'}), 400
+        return Response(collapsed_text(session.stacks), mimetype='text/plain')
+    
+    if session.stats is None:
+        return jsonify({'error': 'No requests were profiled'}), 404
+    if output == 'pstats':
+        return Response(
+            pstats_bytes(session.stats),
+            mimetype='application/octet-stream',
+            headers={'Content-Disposition': f'attachment; filename=profile-{session.id}.pstats'}
+        )
+    if output != 'text':
+        return jsonify({'error': 'Deterministic sessions support format=text or pstats'}), 400
+    sort = request.args.get('sort', 'cumulative')
+    limit = request.args.get('limit', 50, type=int)
+    return Response(pstats_text(session.stats, sort, limit), mimetype='text/plain')
+
+@app.route('/debug/memory/start', methods=['POST'])
+@debug_endpoint
+def debug_memory_start():
+    frames = (request.get_json(silent=True) or {}).get('frames', 10)
+    memory_tracker.start(frames)
+    return jsonify({'tracing': True, 'frames': frames})
+
+@app.route('/debug/memory/stop', methods=['POST'])
+@debug_endpoint
+def debug_memory_stop():
+    memory_tracker.stop()
+    return jsonify({'tracing': False})
+
+@app.route('/debug/memory/snapshot', methods=['GET'])
+@debug_endpoint
+def debug_memory_snapshot():
+    """Top allocators, plus the diff against the previous snapshot"""
+    limit = request.args.get('limit', 25, type=int)
+    key = request.args.get('key', 'lineno')
+    if key not in ('lineno', 'filename', 'traceback'):
+        return jsonify({'error': 'key must be lineno, filename or traceback'}), 400
+    try:
+        return jsonify(memory_tracker.snapshot(limit, key))
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 409
+
+@app.route('/debug/sizes', methods=['GET'])
+@debug_endpoint
+def debug_sizes():
+    """Entry counts of in-memory state; ?deep=1 adds approximate retained bytes"""
+    conversation_stage = getattr(master_agent, 'conversation_stage', None)
+    sizes = {
+        'conversations': len(conversations),
+        'conversation_messages': sum(len(c.get('messages', ())) for c in list(conversations.values())),
+        'conversation_stage': len(conversation_stage) if conversation_stage is not None else None,
+        'letter_cache': letter_cache.stats(),
+        'pdf_pool': pdf_pool.stats(),
+        'slip_extractor': slip_extractor.stats(),
+        'verification_jobs': verification_queue.counts(),
+        'rollups': rollups.stats(),
+        'search_index': search_index.stats(),
+        'archive': application_archive.stats(),
+        'application_store': application_store.stats(),
+        'static_assets': assets.stats() if assets else None,
+        'chat_turns': chat_turns.stats(),
+        'chat_admission': chat_limiter.stats(),
+        'tracemalloc': memory_tracker.tracing,
+    }
+    if request.args.get('deep') == '1':
+        sizes['conversations_bytes'] = deep_sizeof(conversations)
+        if conversation_stage is not None:
+            sizes['conversation_stage_bytes'] = deep_sizeof(conversation_stage)
+    return jsonify(sizes)
+
 # Health check endpoint for Render
 @app.route('/health', methods=['GET'])
 def health():
@@ -900,6 +1400,8 @@ def health():
         'environment': os.environ.get('RENDER_SERVICE_NAME', 'local')
     })
 
+STARTUP['import_ms'] = round((time.perf_counter() - IMPORT_STARTED) * 1000, 1)
+
 if __name__ == '__main__':
     print("\n" + "="*60)
     print("🏦 TATA CAPITAL LOAN CHATBOT STARTING...")
@@ -934,10 +1436,10 @@ if __name__ == '__main__':
             f.write('GROQ_API_KEY=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\n')
         print("✅ Created .env file.")
     
-    # Check groq package version
+    # Check groq package version (metadata only; groq itself is imported with the agents)
     try:
-        import pkg_resources
-        groq_version = pkg_resources.get_distribution("groq").version
+        from importlib.metadata import version
+        groq_version = version("groq")
         print(f"📦 Groq package version: {groq_version}")
         
         # Check if version is problematic
@@ -947,9 +1449,11 @@ if __name__ == '__main__':
     except:
         print("📦 Could not detect Groq package version")
     
-    # Initialize agents
+    # Initialize agents now so the status summary below is accurate
     print("\n🤖 Initializing AI Agents...")
-    master_agent, sanction_agent, underwriting_agent = init_agents()
+    ensure_agents()
+    ensure_services()
+    print(f"   ⏱  App imported in {STARTUP['import_ms']} ms, agents built in {STARTUP['agents_ms']} ms")
     
     # Check import status and provide detailed feedback
     import_issues = []
@@ -1001,8 +1505,5 @@ if __name__ == '__main__':
     print(f"🔗 Host: {host}")
     print("="*60)
     
-    # Initialize CSV file
-    init_csv_file()
-    
     # Start the Flask application
     app.run(debug=False, port=port, host=host)
@@ -0,0 +1,54 @@
+"""
+Microbenchmark for the deterministic (mock) conversation flow.
+Run from the project root: python -m benchmarks.bench_mock_agent
+"""
+
+import argparse
+import time
+
+from agents.mock_agent import MockAgent
+
+# One full application, one slot per turn
+SCRIPT_SINGLE = [
+    'hi', 'Rahul Sharma', '32', 'Pune', '9876543210', 'rahul@example.com',
+    'personal', '200000', '50000', 'yes',
+]
+
+# Same application with several slots per message
+SCRIPT_MULTI = [
+    'hi', 'Rahul Sharma, 32, Pune', '9876543210, rahul@example.com',
+    'personal 200000', '50000', 'yes',
+]
+
+
+def run_script(agent, script):
+    conversation = {'customer_data': {}, 'messages': []}
+    for message in script:
+        agent.process_message(message, conversation, 'bench')
+    return conversation
+
+
+def bench(name, script, iterations):
+    agent = MockAgent('MasterAgent')
+    run_script(agent, script)  # warm-up
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        run_script(agent, script)
+    elapsed = time.perf_counter() - start
+
+    turns = iterations * len(script)
+    print(f"{name:<14} {turns:>9,} turns  {elapsed * 1e6 / turns:8.2f} µs/turn  {turns / elapsed:>12,.0f} turns/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the mock agent slot-filling engine")
+    parser.add_argument('-n', '--iterations', type=int, default=20000, help="conversations per script")
+    args = parser.parse_args()
+
+    bench('single-slot', SCRIPT_SINGLE, args.iterations)
+    bench('multi-slot', SCRIPT_MULTI, args.iterations)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""
+Stand-in for the Groq chat completions API, for load tests of the real agents.
+
+Answers POST /openai/v1/chat/completions after a configurable delay with
+replies the MasterAgent stages can act on: "yes" to the interest check, a
+loan amount JSON object for qualification, and a canned greeting otherwise.
+An error rate can be set to exercise the retry path.
+
+Start it, then point the app at it:
+
+    python -m benchmarks.fake_llm --port 8090 --latency-ms 400 --jitter-ms 150
+    GROQ_API_KEY=fake GROQ_BASE_URL=http://127.0.0.1:8090 python app.py
+"""
+
+import argparse
+import json
+import random
+import re
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+AMOUNT_RE = re.compile(r'(\d+(?:\.\d+)?)\s*(lakhs?|lacs?|l\b|k\b|crores?)?', re.IGNORECASE)
+UNITS = {'l': 100000, 'lakh': 100000, 'lakhs': 100000, 'lac': 100000, 'lacs': 100000,
+         'k': 1000, 'crore': 10000000, 'crores': 10000000}
+
+GREETING = ("Hello! Welcome to Tata Capital. I'd be happy to help you with a personal loan "
+            "tailored to your needs.")
+
+
+def parse_amount(text):
+    match = AMOUNT_RE.search(text.replace(',', ''))
+    if not match:
+        return None
+    return int(float(match.group(1)) * UNITS.get((match.group(2) or '').lower(), 1))
+
+
+def reply_for(messages):
+    system = next((m['content'] for m in messages if m.get('role') == 'system'), '')
+    user = next((m['content'] for m in reversed(messages) if m.get('role') == 'user'), '')
+    if '"yes" or "no"' in system:
+        return 'yes'
+    if 'loan_amount' in system:
+        amount = parse_amount(user)
+        return json.dumps({'loan_amount': amount, 'message': 'Noted.'} if amount else {'message': 'How much?'})
+    return GREETING
+
+
+class FakeLLMHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = 'FakeLLM/1.0'
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        options = self.server.options
+        delay = max(0.0, random.gauss(options.latency_ms, options.jitter_ms)) / 1000
+        time.sleep(delay)
+
+        if not self.path.endswith('/chat/completions'):
+            return self._send(404, {'error': {'message': f"Unknown path {self.path}"}})
+        if random.random() < options.error_rate:
+            return self._send(random.choice((429, 500, 503)), {'error': {'message': 'Injected failure'}})
+
+        request = json.loads(body or b'{}')
+        content = reply_for(request.get('messages', []))
+        prompt_tokens = sum(len(m.get('content', '')) for m in request.get('messages', [])) // 4
+        completion_tokens = max(1, len(content) // 4)
+        self._send(200, {
+            'id': f"chatcmpl-{random.getrandbits(64):016x}",
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': request.get('model', 'fake'),
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': content},
+                'finish_reason': 'stop',
+            }],
+            'usage': {
+                'prompt_tokens': prompt_tokens,
+                'completion_tokens': completion_tokens,
+                'total_tokens': prompt_tokens + completion_tokens,
+            },
+        })
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fake Groq chat completions server for load tests")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8090)
+    parser.add_argument('--latency-ms', type=float, default=400.0, help="mean response delay")
+    parser.add_argument('--jitter-ms', type=float, default=100.0, help="standard deviation of the delay")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="fraction of requests answered with 429/5xx")
+    args = parser.parse_args(argv)
+
+    server = ThreadingHTTPServer((args.host, args.port), FakeLLMHandler)
+    server.daemon_threads = True
+    server.options = args
+    print(f"🤖 Fake LLM listening on http://{args.host}:{args.port} "
+          f"({args.latency_ms:.0f}±{args.jitter_ms:.0f} ms, {args.error_rate:.0%} errors)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
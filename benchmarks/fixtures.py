@@ -0,0 +1,78 @@
+"""
+Synthetic data for the benchmark suite.
+
+Writes a loan_applications.csv in the app's format with a given number of
+rows. Output is seeded, so the same size always produces the same file, and
+rows are streamed to disk so memory stays flat at any size. The identity
+helpers are shared with benchmarks.reference_data, so application N belongs
+to customer N in the generated data/ CSVs.
+"""
+
+import csv
+import json
+import random
+from datetime import datetime, timedelta
+
+FIRST_NAMES = (
+    'Aarav', 'Aditi', 'Amit', 'Ananya', 'Arjun', 'Deepak', 'Divya', 'Ishaan', 'Kavya', 'Kiran',
+    'Meera', 'Neha', 'Priya', 'Rahul', 'Rajesh', 'Rohan', 'Sanjay', 'Sneha', 'Suresh', 'Vikram',
+)
+LAST_NAMES = (
+    'Agarwal', 'Bose', 'Chopra', 'Das', 'Gupta', 'Iyer', 'Joshi', 'Kumar', 'Mehta', 'Nair',
+    'Patel', 'Rao', 'Reddy', 'Shah', 'Sharma', 'Singh', 'Verma',
+)
+CITIES = ('Mumbai', 'Delhi', 'Bangalore', 'Chennai', 'Hyderabad', 'Pune', 'Kolkata', 'Ahmedabad', 'Jaipur', 'Lucknow')
+LOAN_TYPES = ('personal', 'home', 'car', 'business')
+STATUSES = ('active', 'active', 'pending_verification', 'documents_verified', 'completed', 'completed', 'rejected')
+
+APPLICATION_HEADERS = [
+    'conversation_id', 'customer_name', 'age', 'city', 'phone', 'email',
+    'loan_type', 'loan_amount', 'monthly_income', 'status', 'created_at',
+    'updated_at', 'customer_data_json'
+]
+
+
+def customer_id(index):
+    return f"CUST{index + 1:07d}"
+
+
+def customer_name(index):
+    # Deterministic and spread out, so lookups by name hit every part of the file
+    return f"{FIRST_NAMES[index % len(FIRST_NAMES)]} {LAST_NAMES[(index // len(FIRST_NAMES)) % len(LAST_NAMES)]} {index + 1}"
+
+
+def customer_phone(index):
+    return str(7000000000 + index)
+
+
+def conversation_id(index):
+    return f"2025{index:016d}"
+
+
+def write_applications(path, rows, seed=42):
+    """Write `rows` loan applications in the app's CSV format"""
+    rng = random.Random(seed)
+    start = datetime(2025, 1, 1)
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(APPLICATION_HEADERS)
+        for i in range(rows):
+            created = start + timedelta(seconds=rng.randrange(180 * 86400))
+            updated = created + timedelta(seconds=rng.randrange(3600))
+            customer_data = {
+                'name': customer_name(i),
+                'age': rng.randint(21, 65),
+                'city': rng.choice(CITIES),
+                'phone': customer_phone(i),
+                'email': f"customer{i + 1}@example.com",
+                'loan_type': rng.choice(LOAN_TYPES),
+                'loan_amount': rng.randrange(50000, 2000000, 5000),
+                'monthly_income': rng.randrange(20000, 300000, 1000),
+                'customer_id': customer_id(i),
+            }
+            writer.writerow([
+                conversation_id(i), customer_data['name'], customer_data['age'], customer_data['city'],
+                customer_data['phone'], customer_data['email'], customer_data['loan_type'],
+                customer_data['loan_amount'], customer_data['monthly_income'], rng.choice(STATUSES),
+                created.isoformat(), updated.isoformat(), json.dumps(customer_data)
+            ])
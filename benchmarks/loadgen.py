@@ -0,0 +1,452 @@
+"""
+End-to-end load generator for a running instance.
+
+Applicants arrive at a target rate (Poisson by default) and each one plays a
+full conversation the way chatbot.js does: chat turns from greeting through
+KYC and income, the salary slip upload (polling the verification job), then
+the sanction letter (async job, poll, download). The next step is chosen
+from the action the server returns, so the same run works against the mock
+agents and against the real agents backed by benchmarks.fake_llm.
+
+    python app.py                                     # mock agents
+    python -m benchmarks.loadgen --rate 20 --duration 60
+
+    python -m benchmarks.fake_llm --latency-ms 400 &  # real agents, fake LLM
+    GROQ_API_KEY=fake GROQ_BASE_URL=http://127.0.0.1:8090 python app.py
+    python -m benchmarks.loadgen --script llm --rate 5 --duration 60 -o load.json
+
+Reports throughput, p50/p95/p99 latency and error rate per endpoint, plus the
+end-to-end verification and letter flows and how applications ended.
+"""
+
+import argparse
+import csv
+import http.client
+import io
+import itertools
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from benchmarks.fixtures import CITIES, FIRST_NAMES, LAST_NAMES
+
+UPLOAD_ACTIONS = {'collect_documents', 'upload_salary_slip'}
+APPROVED_ACTIONS = {'generate_sanction', 'loan_approved'}
+REJECTED_ACTIONS = {'loan_rejected', 'verification_failed', 'end_conversation', 'adjust_amount'}
+
+# Order endpoints appear in the report
+ENDPOINTS = (
+    'chat', 'upload_salary_slip', 'verification_job', 'generate_sanction_letter',
+    'sanction_letter_status', 'sanction_letter_download',
+    'flow:verification', 'flow:sanction_letter',
+)
+
+
+class Client:
+    """One keep-alive connection per simulated applicant"""
+
+    def __init__(self, base_url, timeout):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or (443 if parts.scheme == 'https' else 80)
+        self.https = parts.scheme == 'https'
+        self.timeout = timeout
+        self.connection = None
+
+    def _connect(self):
+        cls = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+        return cls(self.host, self.port, timeout=self.timeout)
+
+    def request(self, method, path, body=None, headers=None):
+        """(status, content_type, body bytes); reconnects once if the server dropped the connection"""
+        for attempt in (0, 1):
+            if self.connection is None:
+                self.connection = self._connect()
+            try:
+                self.connection.request(method, path, body=body, headers=headers or {})
+                response = self.connection.getresponse()
+                data = response.read()
+                if response.getheader('Connection', '').lower() == 'close':
+                    self.close()
+                return response.status, response.getheader('Content-Type', ''), data
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                self.close()
+                if attempt:
+                    raise
+
+    def json(self, method, path, payload=None):
+        body = json.dumps(payload).encode('utf-8') if payload is not None else None
+        headers = {'Content-Type': 'application/json'} if body is not None else {}
+        status, content_type, data = self.request(method, path, body, headers)
+        return status, content_type, data
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+class Recorder:
+    """Latencies and failures per endpoint, shared by all applicant threads"""
+
+    def __init__(self):
+        self.latencies = {}
+        self.errors = {}
+        self.outcomes = {}
+        self.start_lags = []
+        self._lock = threading.Lock()
+
+    def observe(self, endpoint, seconds, status):
+        with self._lock:
+            self.latencies.setdefault(endpoint, []).append(seconds)
+            if not 200 <= status < 400:
+                codes = self.errors.setdefault(endpoint, {})
+                codes[str(status)] = codes.get(str(status), 0) + 1
+
+    def outcome(self, name):
+        with self._lock:
+            self.outcomes[name] = self.outcomes.get(name, 0) + 1
+
+    def lag(self, seconds):
+        with self._lock:
+            self.start_lags.append(seconds)
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return float('nan')
+    index = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+class RequestFailed(Exception):
+    def __init__(self, endpoint, status, detail=''):
+        super().__init__(f"{endpoint} returned {status} {detail}".rstrip())
+        self.endpoint = endpoint
+        self.status = status
+
+
+# Applicants
+
+def mock_persona(index, rng):
+    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+    income = rng.randrange(30000, 200000, 1000)
+    return {
+        'name': f"{first} {last}",
+        'net_salary': income,
+        'script': [
+            'hi', f"{first} {last}", str(rng.randint(21, 65)), rng.choice(CITIES),
+            str(7000000000 + index % 3000000000), f"{first.lower()}.{index}@example.com",
+            rng.choice(('personal', 'home', 'car', 'business')),
+            str(rng.randrange(50000, min(income * 60, 5000000), 5000)), str(income),
+        ],
+    }
+
+
+def load_customers(data_dir, limit):
+    """KYC rows joined with their pre-approved limit, for scripts that must pass KYC"""
+    limits = {}
+    with open(os.path.join(data_dir, 'offers.csv'), 'r', encoding='utf-8') as f:
+        for row in itertools.islice(csv.DictReader(f), limit):
+            limits[row['customer_id']] = float(row['pre_approved_limit'])
+    customers = []
+    with open(os.path.join(data_dir, 'kyc_data.csv'), 'r', encoding='utf-8') as f:
+        for row in itertools.islice(csv.DictReader(f), limit):
+            row['pre_approved_limit'] = limits.get(row['customer_id'], 500000)
+            customers.append(row)
+    if not customers:
+        raise SystemExit(f"No customers in {data_dir}/kyc_data.csv")
+    return customers
+
+
+def llm_persona(index, rng, customers, mix):
+    """Script for MasterAgent; the amount picks instant approval, slip upload or rejection by `mix`"""
+    customer = customers[index % len(customers)]
+    limit = customer['pre_approved_limit']
+    band = rng.choices(('instant', 'upload', 'reject'), weights=mix)[0]
+    amount = int({'instant': 0.8, 'upload': 1.5, 'reject': 2.5}[band] * limit) // 1000 * 1000
+    return {
+        'name': customer['name'],
+        # Comfortably above twice the EMI so slips for the upload band are affordable
+        'net_salary': 250000,
+        'script': [
+            'Hi, I am interested in a personal loan', str(amount), customer['name'],
+            str(rng.randint(25, 60)), customer['address'].split()[-1], customer['phone'],
+            customer['address'], 'Please check my eligibility',
+        ],
+    }
+
+
+def salary_slip_pdf(persona, index):
+    """A one-page slip the parser can read; unique per applicant so no upload hits the slip cache"""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer, pagesize=A4)
+    lines = [
+        'Loadgen Technologies Private Limited',
+        'Salary Slip',
+        'Pay Period: September 2025',
+        f"Employee Name: {persona['name']}",
+        f"Employee ID: LG{index:08d}",
+        f"Net Salary: Rs. {persona['net_salary']:,}",
+    ]
+    for i, line in enumerate(lines):
+        c.drawString(72, 770 - i * 20, line)
+    c.showPage()
+    c.save()
+    return buffer.getvalue()
+
+
+def multipart(fields, files):
+    boundary = uuid.uuid4().hex
+    out = io.BytesIO()
+    for name, value in fields.items():
+        out.write(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode('utf-8'))
+    for name, (filename, content_type, data) in files.items():
+        out.write(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+            f'Content-Type: {content_type}\r\n\r\n'.encode('utf-8')
+        )
+        out.write(data)
+        out.write(b'\r\n')
+    out.write(f'--{boundary}--\r\n'.encode('utf-8'))
+    return out.getvalue(), f'multipart/form-data; boundary={boundary}'
+
+
+# One applicant
+
+class Applicant:
+    def __init__(self, client, recorder, options):
+        self.client = client
+        self.recorder = recorder
+        self.options = options
+
+    def call(self, endpoint, method, path, payload=None, body=None, content_type=None):
+        start = time.perf_counter()
+        try:
+            if body is not None:
+                status, response_type, data = self.client.request(method, path, body, {'Content-Type': content_type})
+            else:
+                status, response_type, data = self.client.json(method, path, payload)
+        except (OSError, http.client.HTTPException) as e:
+            self.recorder.observe(endpoint, time.perf_counter() - start, 0)
+            raise RequestFailed(endpoint, 0, type(e).__name__)
+        self.recorder.observe(endpoint, time.perf_counter() - start, status)
+        if status >= 400:
+            raise RequestFailed(endpoint, status)
+        if 'application/json' in response_type:
+            return status, json.loads(data)
+        return status, data
+
+    def think(self):
+        if self.options.think_ms:
+            time.sleep(random.expovariate(1000 / self.options.think_ms))
+
+    def wait_for(self, endpoint, path, pending):
+        """Poll a job URL until its status leaves `pending` (or the poll deadline passes)"""
+        deadline = time.monotonic() + self.options.job_timeout
+        while True:
+            status, job = self.call(endpoint, 'GET', path)
+            if job.get('status') not in pending:
+                return job
+            if time.monotonic() > deadline:
+                raise RequestFailed(endpoint, 'timeout')
+            time.sleep(self.options.poll_interval)
+
+    def run(self, persona, index):
+        conversation_id = ''
+        action = None
+        for message in persona['script']:
+            self.think()
+            _, data = self.call('chat', 'POST', '/api/chat', {'message': message, 'conversation_id': conversation_id})
+            conversation_id = data['conversation_id']
+            action = data.get('action')
+            if action in UPLOAD_ACTIONS or action in APPROVED_ACTIONS or action in REJECTED_ACTIONS:
+                break
+
+        if action in REJECTED_ACTIONS:
+            return 'rejected'
+        if action in UPLOAD_ACTIONS:
+            self.think()
+            if not self.upload_slip(conversation_id, persona, index):
+                return 'slip_rejected'
+        elif action not in APPROVED_ACTIONS:
+            return f"stalled:{action}"
+
+        self.think()
+        self.fetch_letter(conversation_id)
+        return 'sanctioned'
+
+    def upload_slip(self, conversation_id, persona, index):
+        body, content_type = multipart(
+            {'conversation_id': conversation_id},
+            {'file': (f"slip-{index}.pdf", 'application/pdf', salary_slip_pdf(persona, index))}
+        )
+        start = time.perf_counter()
+        status, result = self.call('upload_salary_slip', 'POST', '/api/upload-salary-slip', body=body, content_type=content_type)
+        if status == 202:
+            job = self.wait_for('verification_job', result['status_url'], ('queued', 'running'))
+            if job['status'] != 'done':
+                self.recorder.observe('flow:verification', time.perf_counter() - start, 500)
+                raise RequestFailed('verification_job', job['status'])
+            result = job['result']
+        self.recorder.observe('flow:verification', time.perf_counter() - start, 200)
+        return result.get('success', False)
+
+    def fetch_letter(self, conversation_id):
+        start = time.perf_counter()
+        payload = {'conversation_id': conversation_id, 'async': not self.options.sync_letters}
+        status, job = self.call('generate_sanction_letter', 'POST', '/api/generate-sanction-letter', payload)
+        if isinstance(job, dict):
+            if job['status'] == 'pending':
+                job = self.wait_for('sanction_letter_status', job['status_url'], ('pending',))
+                if job['status'] != 'done':
+                    self.recorder.observe('flow:sanction_letter', time.perf_counter() - start, 500)
+                    raise RequestFailed('sanction_letter_status', job['status'])
+            status, pdf = self.call('sanction_letter_download', 'GET', job['download_url'])
+        else:
+            pdf = job
+        ok = isinstance(pdf, bytes) and pdf.startswith(b'%PDF')
+        self.recorder.observe('flow:sanction_letter', time.perf_counter() - start, 200 if ok else 500)
+        if not ok:
+            raise RequestFailed('sanction_letter_download', 'not a PDF')
+
+
+# Driver
+
+def run_applicant(options, recorder, persona, index, scheduled):
+    recorder.lag(time.monotonic() - scheduled)
+    client = Client(options.url, options.timeout)
+    try:
+        outcome = Applicant(client, recorder, options).run(persona, index)
+    except RequestFailed as e:
+        outcome = f"failed:{e.endpoint}"
+    except Exception as e:
+        outcome = f"failed:{type(e).__name__}"
+    finally:
+        client.close()
+    recorder.outcome(outcome)
+
+
+def run(options):
+    rng = random.Random(options.seed)
+    customers = load_customers(options.data_dir, options.max_customers) if options.script == 'llm' else None
+    mix = [float(w) for w in options.mix.split(':')]
+    recorder = Recorder()
+
+    print(f"🚀 {options.rate:g} applicants/s for {options.duration:g}s against {options.url} "
+          f"({options.script} script)", file=sys.stderr)
+    pool = ThreadPoolExecutor(max_workers=options.concurrency, thread_name_prefix='applicant')
+    started = time.monotonic()
+    next_at = started
+    end_at = started + options.duration
+    offered = 0
+    while next_at < end_at and (not options.sessions or offered < options.sessions):
+        delay = next_at - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        persona = (llm_persona(offered, rng, customers, mix) if customers is not None
+                   else mock_persona(offered, rng))
+        pool.submit(run_applicant, options, recorder, persona, offered, next_at)
+        offered += 1
+        next_at += rng.expovariate(options.rate) if options.arrivals == 'poisson' else 1 / options.rate
+    arrivals_done = time.monotonic()
+    pool.shutdown(wait=True)
+    elapsed = time.monotonic() - started
+    return summarize(recorder, offered, arrivals_done - started, elapsed, options)
+
+
+def summarize(recorder, offered, arrival_seconds, elapsed, options):
+    endpoints = {}
+    for name in sorted(recorder.latencies, key=lambda n: ENDPOINTS.index(n) if n in ENDPOINTS else len(ENDPOINTS)):
+        values = sorted(recorder.latencies[name])
+        errors = sum(recorder.errors.get(name, {}).values())
+        endpoints[name] = {
+            'requests': len(values),
+            'errors': errors,
+            'error_rate': errors / len(values),
+            'error_statuses': recorder.errors.get(name, {}),
+            'throughput_rps': len(values) / elapsed,
+            'p50_ms': percentile(values, 0.50) * 1000,
+            'p95_ms': percentile(values, 0.95) * 1000,
+            'p99_ms': percentile(values, 0.99) * 1000,
+            'max_ms': values[-1] * 1000,
+        }
+    lags = sorted(recorder.start_lags)
+    sanctioned = recorder.outcomes.get('sanctioned', 0)
+    return {
+        'config': {k: v for k, v in vars(options).items() if k != 'output'},
+        'applicants': {
+            'offered': offered,
+            'offered_rate': offered / arrival_seconds if arrival_seconds else 0.0,
+            'sanctioned_per_second': sanctioned / elapsed,
+            'outcomes': recorder.outcomes,
+            # Large start lag means the generator, not the server, was the bottleneck
+            'start_lag_p99_ms': percentile(lags, 0.99) * 1000,
+        },
+        'elapsed_seconds': elapsed,
+        'endpoints': endpoints,
+    }
+
+
+def print_report(report):
+    applicants = report['applicants']
+    print(f"\nApplicants: {applicants['offered']:,} offered at {applicants['offered_rate']:.2f}/s, "
+          f"{applicants['sanctioned_per_second']:.2f} sanctioned/s over {report['elapsed_seconds']:.1f}s")
+    for outcome, count in sorted(applicants['outcomes'].items(), key=lambda item: -item[1]):
+        print(f"   {outcome:<36} {count:>8,}")
+    if applicants['start_lag_p99_ms'] > 100:
+        print(f"   ⚠️  p99 start lag {applicants['start_lag_p99_ms']:.0f} ms: raise --concurrency "
+              f"or the generator is saturated")
+
+    print(f"\n{'endpoint':<28} {'requests':>9} {'errors':>7} {'err %':>7} {'req/s':>8} "
+          f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for name, stats in report['endpoints'].items():
+        print(f"{name:<28} {stats['requests']:>9,} {stats['errors']:>7,} {stats['error_rate']:>7.2%} "
+              f"{stats['throughput_rps']:>8.2f} {stats['p50_ms']:>9.1f} {stats['p95_ms']:>9.1f} "
+              f"{stats['p99_ms']:>9.1f} {stats['max_ms']:>9.1f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Drive full loan applications against a running instance")
+    parser.add_argument('--url', default='http://127.0.0.1:5000', help="base URL of the app")
+    parser.add_argument('--rate', type=float, default=10.0, help="new applicants per second")
+    parser.add_argument('--duration', type=float, default=60.0, help="seconds to keep admitting applicants")
+    parser.add_argument('--sessions', type=int, help="stop after this many applicants")
+    parser.add_argument('--arrivals', choices=('poisson', 'uniform'), default='poisson')
+    parser.add_argument('--script', choices=('mock', 'llm'), default='mock',
+                        help="conversation script: slot-filling mock agents, or MasterAgent via a fake LLM")
+    parser.add_argument('--data-dir', default='data', help="KYC and offer CSVs the llm script draws customers from")
+    parser.add_argument('--max-customers', type=int, default=100000, help="customers loaded from --data-dir")
+    parser.add_argument('--mix', default='6:3:1', help="instant:upload:reject weights for the llm script")
+    parser.add_argument('--think-ms', type=float, default=0.0, help="mean pause before each applicant action")
+    parser.add_argument('--poll-interval', type=float, default=0.25, help="seconds between job status polls")
+    parser.add_argument('--job-timeout', type=float, default=120.0, help="give up polling a job after this long")
+    parser.add_argument('--sync-letters', action='store_true', help="request letters synchronously instead of as jobs")
+    parser.add_argument('--concurrency', type=int, default=256, help="most applicants in flight at once")
+    parser.add_argument('--timeout', type=float, default=60.0, help="per-request socket timeout")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('-o', '--output', help="write the report as JSON here")
+    options = parser.parse_args(argv)
+
+    report = run(options)
+    print_report(report)
+    if options.output:
+        with open(options.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n📄 Report written to {options.output}")
+    failed = sum(count for outcome, count in report['applicants']['outcomes'].items() if outcome.startswith('failed'))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,215 @@
+"""
+Synthetic reference data for the agents' data/ CSVs at production scale.
+
+Writes customers.csv, kyc_data.csv, credit_scores.csv and offers.csv with the
+same customers in every file: KYC name, phone and email match the customer
+record, the offer carries the customer's pre-approved limit, and payment
+history follows the credit score. Distributions are shaped on retail lending
+data rather than uniform:
+
+- credit score: skewed towards 700-800 (about a quarter below the 700 floor)
+- payment history: Excellent / Good / Fair / Poor, driven by the score
+- city: weighted towards the large metros
+- monthly income: log-normal, higher in metros
+- pre-approved limit: income multiple by score band, reduced by outstanding debt
+- existing loans and outstanding balance: mostly none or one, long tail
+
+Rows are generated in fixed-size chunks, each from its own seed, so the
+output depends only on --seed and --rows (not on --workers) and the first N
+rows of a large file equal an N-row file. Chunks are rendered in worker
+processes and written in order with a bounded window, so memory stays flat at
+tens of millions of rows.
+
+    python -m benchmarks.reference_data --rows 10000000 --out /tmp/big/data --workers 8
+
+The agents read data/ relative to the working directory, so run the app from
+/tmp/big (or copy the files over data/) to use them.
+"""
+
+import argparse
+import csv
+import io
+import math
+import os
+import random
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks.fixtures import CITIES, customer_id, customer_name, customer_phone
+
+CHUNK_ROWS = 50000
+
+HEADERS = {
+    'customers': [
+        'customer_id', 'name', 'age', 'city', 'phone', 'email',
+        'existing_loans', 'total_outstanding', 'payment_history', 'pre_approved_limit'
+    ],
+    'kyc_data': ['customer_id', 'name', 'phone', 'address', 'email', 'verified'],
+    'credit_scores': ['customer_id', 'credit_score', 'credit_bureau'],
+    'offers': ['customer_id', 'pre_approved_limit', 'interest_rate', 'max_tenure', 'offer_validity'],
+}
+
+# Rough share of retail borrowers per city; the tier scales income
+CITY_WEIGHTS = {
+    'Mumbai': 18, 'Delhi': 18, 'Bangalore': 14, 'Hyderabad': 10, 'Chennai': 9,
+    'Pune': 8, 'Kolkata': 8, 'Ahmedabad': 6, 'Jaipur': 5, 'Lucknow': 4,
+}
+METROS = {'Mumbai', 'Delhi', 'Bangalore', 'Hyderabad', 'Chennai', 'Pune'}
+CITY_CHOICES = tuple(CITIES)
+CITY_CUMULATIVE = tuple(
+    sum(CITY_WEIGHTS.get(city, 1) for city in CITY_CHOICES[:i + 1]) for i in range(len(CITY_CHOICES))
+)
+
+STREETS = ('MG Road', 'Station Road', 'Park Street', 'Ring Road', 'Main Road', 'Nehru Nagar', 'Gandhi Marg', 'Civil Lines')
+BUREAUS = ('CIBIL', 'CIBIL', 'CIBIL', 'Experian', 'Equifax', 'CRIF High Mark')
+LOAN_COUNT_CUMULATIVE = (40, 73, 90, 97, 100)  # 0, 1, 2, 3, 4 existing loans
+
+
+def credit_score(rng):
+    # Beta(6, 2) over the 300-900 bureau range: mean ~750, ~26% below 700
+    return int(300 + 600 * rng.betavariate(6, 2))
+
+
+def payment_history(score, rng):
+    noisy = score + rng.gauss(0, 25)
+    if noisy >= 780:
+        return 'Excellent'
+    if noisy >= 710:
+        return 'Good'
+    if noisy >= 640:
+        return 'Fair'
+    return 'Poor'
+
+
+def interest_rate(score):
+    if score >= 800:
+        return 10.5
+    if score >= 750:
+        return 11.5
+    if score >= 700:
+        return 12.5
+    return 14.0
+
+
+def pre_approved_limit(income, score, outstanding):
+    """Monthly income times a score-band multiple, less a share of existing debt"""
+    if score >= 800:
+        multiple = 12
+    elif score >= 750:
+        multiple = 10
+    elif score >= 700:
+        multiple = 8
+    else:
+        multiple = 4
+    limit = income * multiple - 0.25 * outstanding
+    return int(min(max(limit, 50000), 4000000) // 10000 * 10000)
+
+
+def _pick(rng, cumulative, choices):
+    point = rng.random() * cumulative[-1]
+    for choice, bound in zip(choices, cumulative):
+        if point < bound:
+            return choice
+    return choices[-1]
+
+
+def render_chunk(seed, start, stop):
+    """CSV text of rows [start, stop) for each of the four files"""
+    rng = random.Random(f"{seed}:{start}")
+    buffers = {name: io.StringIO() for name in HEADERS}
+    writers = {name: csv.writer(buffer, lineterminator='\n') for name, buffer in buffers.items()}
+
+    for i in range(start, stop):
+        cid = customer_id(i)
+        name = customer_name(i)
+        phone = customer_phone(i)
+        email = f"customer{i + 1}@example.com"
+        city = _pick(rng, CITY_CUMULATIVE, CITY_CHOICES)
+        age = int(rng.triangular(21, 65, 32))
+
+        # Median ~45k a month in metros, ~32k elsewhere; rises with age
+        income = rng.lognormvariate(math.log(45000 if city in METROS else 32000), 0.55) * (1 + (age - 21) * 0.01)
+        loans = _pick(rng, LOAN_COUNT_CUMULATIVE, range(5))
+        outstanding = sum(int(rng.lognormvariate(math.log(200000), 0.8)) // 1000 * 1000 for _ in range(loans))
+
+        score = credit_score(rng)
+        limit = pre_approved_limit(income, score, outstanding)
+
+        writers['customers'].writerow([
+            cid, name, age, city, phone, email, loans, outstanding, payment_history(score, rng), limit
+        ])
+        writers['kyc_data'].writerow([
+            cid, name, phone, f"{rng.randint(1, 999)} {rng.choice(STREETS)} {city}", email,
+            'Yes' if rng.random() < 0.98 else 'No'
+        ])
+        writers['credit_scores'].writerow([cid, score, rng.choice(BUREAUS)])
+        writers['offers'].writerow([cid, limit, interest_rate(score), 60, 30])
+
+    return {name: buffer.getvalue() for name, buffer in buffers.items()}
+
+
+def iter_chunks(rows, seed, workers=1, chunk_rows=CHUNK_ROWS):
+    """Yield (stop_row, texts) in row order; at most a few chunks per worker are held at once"""
+    bounds = [(start, min(start + chunk_rows, rows)) for start in range(0, rows, chunk_rows)]
+    if workers <= 1:
+        for start, stop in bounds:
+            yield stop, render_chunk(seed, start, stop)
+        return
+
+    pending = deque()
+    window = workers * 2
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for start, stop in bounds:
+            pending.append((stop, executor.submit(render_chunk, seed, start, stop)))
+            if len(pending) >= window:
+                stop_row, future = pending.popleft()
+                yield stop_row, future.result()
+        while pending:
+            stop_row, future = pending.popleft()
+            yield stop_row, future.result()
+
+
+def write_reference_data(directory, rows, seed=42, workers=1, on_progress=None):
+    """Write the four reference CSVs with `rows` consistent customers into directory"""
+    os.makedirs(directory, exist_ok=True)
+    files = {
+        name: open(os.path.join(directory, f"{name}.csv"), 'w', newline='', encoding='utf-8')
+        for name in HEADERS
+    }
+    try:
+        for name, f in files.items():
+            csv.writer(f, lineterminator='\n').writerow(HEADERS[name])
+        for stop, texts in iter_chunks(rows, seed, workers):
+            for name, text in texts.items():
+                files[name].write(text)
+            if on_progress:
+                on_progress(stop)
+    finally:
+        for f in files.values():
+            f.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate consistent customers, KYC, credit score and offer CSVs")
+    parser.add_argument('--rows', type=int, required=True, help="number of customers")
+    parser.add_argument('--out', required=True,
+                        help="directory to write the four CSVs into; not data/, which holds the tracked fixtures")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="processes rendering chunks")
+    args = parser.parse_args(argv)
+
+    started = time.monotonic()
+
+    def progress(done):
+        elapsed = time.monotonic() - started
+        print(f"\r   {done:>12,} / {args.rows:,} rows  ({done / elapsed:,.0f} rows/s)", end='', file=sys.stderr)
+
+    write_reference_data(args.out, args.rows, args.seed, args.workers, on_progress=progress)
+    print(f"\n✅ Wrote {args.rows:,} customers to {args.out} in {time.monotonic() - started:.1f}s", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
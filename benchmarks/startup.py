@@ -0,0 +1,112 @@
+"""
+Cold start report: how long importing app.py takes and what it pulls in.
+
+Each run imports the app in a fresh interpreter under `python -X importtime`
+(in a scratch working directory, so no state is shared between runs), then
+times the work that is deferred to first use: building the agents and
+rendering the first letter. Prints the slowest imports and whether heavy
+dependencies (groq, reportlab, pypdf) were loaded at import time.
+
+Run from the project root: python -m benchmarks.startup [--runs 5] [--top 15]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that should only be loaded on first use
+DEFERRED = ('groq', 'reportlab', 'pypdf', 'httpx', 'pkg_resources', 'agents.letter_layouts')
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+loaded = {name: name in sys.modules for name in %(deferred)r}
+app.ensure_agents()
+agents = time.perf_counter()
+from agents.sanction_renderer import render_letter
+render_letter('summary', {'name': 'Cold Start', 'phone': '9876543210', 'loan_amount': 100000})
+letter = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - started) * 1000,
+    'agents_ms': (agents - imported) * 1000,
+    'first_letter_ms': (letter - agents) * 1000,
+    'loaded_at_import': loaded,
+}))
+""" % {'deferred': DEFERRED}
+
+
+def run_once(extra_env=None):
+    """(probe result, {module imported by app: cumulative µs}) from one fresh interpreter"""
+    env = dict(os.environ, PYTHONPATH=ROOT, VERIFICATION_WORKERS='0', SLIP_PARSE_WORKERS='0', PDF_WORKERS='0')
+    env.update(extra_env or {})
+    with tempfile.TemporaryDirectory() as workdir:
+        completed = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', PROBE],
+            cwd=workdir, env=env, capture_output=True, text=True
+        )
+    if completed.returncode != 0:
+        raise SystemExit(f"Probe failed:\n{completed.stderr[-2000:]}")
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    cumulative = {}
+    for line in completed.stderr.splitlines():
+        # "import time:       self [us] |  cumulative | imported package"
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        # Children are printed before their parent, indented two spaces per
+        # level: app's direct imports are the depth-1 lines before "app" itself
+        if name == ' app':
+            break
+        if name.startswith('   ') and not name.startswith('     '):
+            cumulative[name.strip()] = int(cumulative_us)
+    return result, cumulative
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Report app.py cold start time and import costs")
+    parser.add_argument('--runs', type=int, default=5, help="fresh interpreters to average over")
+    parser.add_argument('--top', type=int, default=15, help="slowest imports to list")
+    parser.add_argument('--groq-key', action='store_true', help="set a dummy GROQ_API_KEY so the real agents are built")
+    parser.add_argument('-o', '--output', help="write the report as JSON here")
+    args = parser.parse_args(argv)
+
+    extra_env = {'GROQ_API_KEY': 'startup-report'} if args.groq_key else {'GROQ_API_KEY': ''}
+    runs = [run_once(extra_env) for _ in range(args.runs)]
+    results = [result for result, _ in runs]
+    imports = runs[-1][1]
+
+    report = {
+        metric: statistics.median(r[metric] for r in results)
+        for metric in ('import_ms', 'agents_ms', 'first_letter_ms')
+    }
+    report['loaded_at_import'] = results[-1]['loaded_at_import']
+    report['slowest_imports'] = sorted(
+        ((name, us / 1000) for name, us in imports.items()), key=lambda item: -item[1]
+    )[:args.top]
+
+    print(f"import app          {report['import_ms']:9.1f} ms  (median of {args.runs} cold runs)")
+    print(f"first ensure_agents {report['agents_ms']:9.1f} ms")
+    print(f"first letter        {report['first_letter_ms']:9.1f} ms")
+    print("\nLoaded while importing app:")
+    for name, loaded in report['loaded_at_import'].items():
+        print(f"   {'⚠️ ' if loaded else '✅'} {name:<24} {'yes' if loaded else 'no (deferred)'}")
+    print("\nSlowest imports made by app.py (cumulative):")
+    for name, ms in report['slowest_imports']:
+        print(f"   {name:<40} {ms:9.1f} ms")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    return 1 if any(report['loaded_at_import'].values()) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,293 @@
+"""
+Benchmark suite for the persistence, dashboard and underwriting hot paths.
+
+Generates seeded synthetic data at each size (cached under --workdir), runs
+every benchmark against it and writes the timings as JSON. Pass a previous
+result as --baseline, or use --compare, to flag regressions.
+
+Run from the project root:
+
+    python -m benchmarks.suite --sizes 1k,100k,1m -o bench.json
+    python -m benchmarks.suite --sizes 1k,100k -o new.json --baseline bench.json
+    python -m benchmarks.suite --compare bench.json new.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+from benchmarks import fixtures, reference_data
+from services.application_store import ApplicationStore, reshard
+
+SIZE_SUFFIXES = {'k': 1000, 'm': 1000000}
+# Shard count for the sharded-storage variants
+BENCH_SHARDS = 8
+
+
+def parse_size(text):
+    text = text.strip().lower()
+    if text[-1] in SIZE_SUFFIXES:
+        return int(float(text[:-1]) * SIZE_SUFFIXES[text[-1]])
+    return int(text)
+
+
+def measure(func, setup=None, min_runs=3, max_runs=50, min_seconds=1.0):
+    """Time func() repeatedly (setup() runs untimed before each call)"""
+    times = []
+    started = time.perf_counter()
+    while len(times) < max_runs and (len(times) < min_runs or time.perf_counter() - started < min_seconds):
+        if setup:
+            setup()
+        t = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - t)
+    return {
+        'runs': len(times),
+        'min_ms': min(times) * 1000,
+        'median_ms': statistics.median(times) * 1000,
+        'mean_ms': statistics.fmean(times) * 1000,
+        'max_ms': max(times) * 1000,
+    }
+
+
+def prepare_workspace(workdir, rows, seed):
+    """Directory holding loan_applications.csv and data/ for one size, generated once"""
+    path = os.path.join(workdir, f"{rows}-s{seed}")
+    marker = os.path.join(path, '.complete')
+    if not os.path.exists(marker):
+        print(f"   generating {rows:,} rows in {path} ...", file=sys.stderr)
+        os.makedirs(path, exist_ok=True)
+        fixtures.write_applications(os.path.join(path, 'loan_applications.csv'), rows, seed)
+        reference_data.write_reference_data(os.path.join(path, 'data'), rows, seed, workers=os.cpu_count() or 1)
+        open(marker, 'w').close()
+    shard_dir = os.path.join(path, f"applications-{BENCH_SHARDS}")
+    if not os.path.isdir(shard_dir):
+        reshard([os.path.join(path, 'loan_applications.csv')], shard_dir, BENCH_SHARDS)
+    return path
+
+
+def _without_llm(cls, **attributes):
+    # Reference lookups never touch the Groq client, so skip building one
+    agent = object.__new__(cls)
+    agent.__dict__.update(attributes)
+    return agent
+
+
+def load_app(workdir):
+    """Import the Flask app with background workers and tracing off, rooted in workdir"""
+    os.environ.update(VERIFICATION_WORKERS='0', PDF_WORKERS='0', TRACE_FILE='', ARCHIVE_INTERVAL='0')
+    os.environ.pop('GROQ_API_KEY', None)
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        import app as app_module
+        app_module.ensure_services()
+    finally:
+        os.chdir(cwd)
+    return app_module
+
+
+def size_benchmarks(app_module, workspace, rows):
+    """Yield (name, thunk, setup) for benchmarks that depend on the data size"""
+    client = app_module.app.test_client()
+    # Targets near the end of the files are the worst case for linear scans
+    last = rows - 1
+    target_conversation = fixtures.conversation_id(last)
+    conversation = {
+        'customer_data': {
+            'name': fixtures.customer_name(last), 'phone': fixtures.customer_phone(last),
+            'loan_amount': 300000, 'monthly_income': 80000,
+        },
+        'status': 'active',
+        'created_at': '2025-01-01T00:00:00',
+        'messages': [],
+    }
+
+    yield 'save_conversation_to_csv', lambda: app_module.save_conversation_to_csv(target_conversation, conversation), None
+    yield 'load_conversations_from_csv', app_module.load_conversations_from_csv, None
+
+    sharded = ApplicationStore.sharded(
+        os.path.join(workspace, f"applications-{BENCH_SHARDS}"), BENCH_SHARDS, app_module.CSV_HEADERS
+    )
+
+    def with_sharded_store(func):
+        def call():
+            single, app_module.application_store = app_module.application_store, sharded
+            try:
+                return func()
+            finally:
+                app_module.application_store = single
+        return call
+
+    yield (
+        f'save_conversation_sharded_{BENCH_SHARDS}',
+        with_sharded_store(lambda: app_module.save_conversation_to_csv(target_conversation, conversation)),
+        None
+    )
+    yield f'load_conversations_sharded_{BENCH_SHARDS}', with_sharded_store(app_module.load_conversations_from_csv), None
+    yield 'dashboard_stats', lambda: client.get('/api/dashboard-stats'), app_module.conversations.clear
+    yield (
+        'get_conversation_csv_fallback',
+        lambda: client.get(f'/api/conversation/{target_conversation}'),
+        app_module.conversations.clear
+    )
+
+    from services.search_index import SearchIndex, iter_csv_summaries
+    index = SearchIndex()
+    index.build(iter_csv_summaries(app_module.CSV_FILE))
+    yield 'search_phone_prefix', lambda: index.search(fixtures.customer_phone(last)[:8]), None
+    yield 'search_full_name', lambda: index.search(fixtures.customer_name(last)), None
+    yield 'search_first_name_prefix', lambda: index.search(fixtures.customer_name(last)[:3]), None
+
+    from agents.underwriting_agent import UnderwritingAgent
+    underwriting = _without_llm(
+        UnderwritingAgent, credit_scores_file='data/credit_scores.csv', offers_file='data/offers.csv'
+    )
+    customer = {'customer_id': fixtures.customer_id(last), 'loan_amount': 300000}
+    yield 'evaluate_eligibility', lambda: underwriting.evaluate_eligibility(dict(customer)), None
+
+    try:
+        from agents.verification_agent import VerificationAgent
+    except ImportError as e:
+        yield 'verify_kyc', None, f"skipped: {e}"
+    else:
+        verification = _without_llm(VerificationAgent, kyc_data_file='data/kyc_data.csv')
+        kyc_customer = {'name': fixtures.customer_name(last), 'phone': fixtures.customer_phone(last)}
+        yield 'verify_kyc', lambda: verification.verify_kyc(dict(kyc_customer)), None
+
+
+def pdf_benchmarks():
+    from agents.mock_agent import MockAgent
+    from agents.sanction_agent import SanctionAgent
+    customer = {
+        'name': 'Rahul Sharma', 'customer_id': 'CUST0000001', 'age': 32, 'city': 'Pune',
+        'phone': '9876543210', 'email': 'rahul@example.com', 'loan_type': 'personal',
+        'loan_amount': 500000, 'monthly_income': 85000, 'credit_score': 780,
+    }
+    yield 'generate_pdf_sanction_agent', lambda: SanctionAgent().generate_pdf(customer)
+    yield 'generate_pdf_mock_agent', lambda: MockAgent('SanctionAgent').generate_pdf(customer)
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    sizes = [parse_size(s) for s in args.sizes.split(',')]
+    only = set(args.only.split(',')) if args.only else None
+    workdir = os.path.abspath(args.workdir)
+    os.makedirs(workdir, exist_ok=True)
+    app_module = load_app(workdir)
+    results = {}
+
+    def record(key, stats):
+        results[key] = stats
+        if 'skipped' in stats:
+            print(f"{key:<48} {stats['skipped']}", file=sys.stderr)
+        else:
+            print(f"{key:<48} {stats['median_ms']:>12.3f} ms median  ({stats['runs']} runs)", file=sys.stderr)
+
+    cwd = os.getcwd()
+    try:
+        for rows in sizes:
+            workspace = prepare_workspace(workdir, rows, args.seed)
+            # Agents open data/*.csv relative to the working directory
+            os.chdir(workspace)
+            app_module.CSV_FILE = os.path.join(workspace, 'loan_applications.csv')
+            app_module.application_store = ApplicationStore.single(app_module.CSV_FILE, app_module.CSV_HEADERS)
+            for name, func, setup in size_benchmarks(app_module, workspace, rows):
+                if only and name not in only:
+                    continue
+                key = f"{name}[{rows}]"
+                if func is None:
+                    record(key, {'skipped': setup})
+                else:
+                    record(key, measure(func, setup, min_runs=args.min_runs, min_seconds=args.min_seconds))
+
+        for name, func in pdf_benchmarks():
+            if not only or name in only:
+                func()  # build the per-process static layout first
+                record(name, measure(func, min_runs=args.min_runs, min_seconds=args.min_seconds))
+    finally:
+        os.chdir(cwd)
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(),
+            'git_revision': git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'seed': args.seed,
+            'sizes': sizes,
+        },
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"📄 Results written to {args.output}", file=sys.stderr)
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            return compare(json.load(f), report, args.threshold)
+    return 0
+
+
+def compare(baseline, current, threshold=0.15):
+    """Print median deltas per benchmark; returns 1 if any got slower by more than threshold"""
+    regressions = 0
+    print(f"{'benchmark':<48} {'baseline ms':>12} {'current ms':>12} {'delta':>8}")
+    for key, stats in current['results'].items():
+        base = baseline['results'].get(key)
+        if 'skipped' in stats or not base or 'skipped' in base:
+            print(f"{key:<48} {'-':>12} {stats.get('median_ms', float('nan')):>12.3f} {'n/a':>8}")
+            continue
+        delta = stats['median_ms'] / base['median_ms'] - 1 if base['median_ms'] else 0.0
+        flag = ''
+        if delta > threshold:
+            regressions += 1
+            flag = '  ✗ regression'
+        elif delta < -threshold:
+            flag = '  ✓ faster'
+        print(f"{key:<48} {base['median_ms']:>12.3f} {stats['median_ms']:>12.3f} {delta:>+7.1%}{flag}")
+    if regressions:
+        print(f"\n{regressions} benchmark(s) regressed by more than {threshold:.0%}")
+    return 1 if regressions else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark persistence, dashboard, underwriting and PDF paths")
+    parser.add_argument('--sizes', default='1k,100k,1m', help="comma-separated row counts, e.g. 1k,100k,1m")
+    parser.add_argument('--only', help="comma-separated benchmark names to run")
+    parser.add_argument('-o', '--output', help="write results JSON here")
+    parser.add_argument('--baseline', help="compare this run against a saved results JSON")
+    parser.add_argument('--compare', nargs=2, metavar=('BASELINE', 'CURRENT'), help="compare two saved results and exit")
+    parser.add_argument('--threshold', type=float, default=0.15, help="relative slowdown reported as a regression")
+    parser.add_argument('--workdir', default='.bench', help="where generated data sets are cached")
+    parser.add_argument('--seed', type=int, default=42, help="seed for the synthetic data")
+    parser.add_argument('--min-runs', type=int, default=3, help="minimum timed runs per benchmark")
+    parser.add_argument('--min-seconds', type=float, default=1.0, help="keep repeating a benchmark for at least this long")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        with open(args.compare[0], 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        with open(args.compare[1], 'r', encoding='utf-8') as f:
+            current = json.load(f)
+        return compare(baseline, current, args.threshold)
+    return run(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
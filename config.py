@@ -6,5 +6,9 @@ load_dotenv()
 GROQ_API_KEY = os.getenv('GROQ_API_KEY')
 GROQ_MODEL = 'mixtral-8x7b-32768'
 
-if not GROQ_API_KEY:
-    raise ValueError("GROQ_API_KEY environment variable is not set. Please add it to .env file")
+
+def require_groq_api_key():
+    """The Groq API key; raises only when a caller actually needs it, not at import"""
+    if not GROQ_API_KEY:
+        raise ValueError("GROQ_API_KEY environment variable is not set. Please add it to .env file")
+    return GROQ_API_KEY
@@ -0,0 +1,29 @@
+# Read automatically by gunicorn from the working directory; command-line
+# options (Procfile, render.yaml) still take precedence.
+
+import os
+
+
+def post_fork(server, worker):
+    """Give each worker its own conversation id worker number (services.ids)
+
+    worker.age is unique among a master's workers; set ID_WORKER_BASE per
+    host when several hosts generate ids.
+    """
+    base = int(os.environ.get('ID_WORKER_BASE', 0))
+    os.environ['ID_WORKER'] = str((base + worker.age) % 1000)
+
+
+def post_worker_init(worker):
+    """Open the stores, start the background threads (verification queue,
+    archiver, search build) and build the agents in the background once the
+    worker has loaded the app.
+
+    The worker starts accepting connections immediately; a request that
+    arrives before the agents are ready waits for them in ensure_agents().
+    """
+    import threading
+    from app import ensure_agents, ensure_services
+
+    ensure_services()
+    threading.Thread(target=ensure_agents, name='agent-warmup', daemon=True).start()
@@ -0,0 +1,120 @@
+"""
+Adaptive admission control for chat turns.
+
+An AdaptiveLimiter caps how many turns run at once. The cap follows the
+gradient between the LLM's long-run latency and its recent latency, the
+scheme behind Netflix's concurrency-limits "Gradient2". While the provider
+answers as fast as usual, the limit grows by about sqrt(limit) per sample.
+When recent latency climbs above the long-run level by more than
+`tolerance`, the limit shrinks in proportion. Requests over the limit wait
+in a bounded FIFO queue. When the queue is full, or a wait passes
+`queue_timeout`, the request is refused with an estimated retry delay
+instead of piling up until the worker times out.
+
+Latency samples come from agents.llm (see add_latency_listener), so the
+limiter tracks the provider rather than the rest of the turn.
+"""
+
+import math
+import threading
+from collections import deque
+
+
+class AdmissionRejected(Exception):
+    """The turn was not admitted; retry_after is a suggested delay in whole seconds"""
+
+    def __init__(self, reason, retry_after):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdaptiveLimiter:
+    def __init__(self, initial_limit=8, min_limit=2, max_limit=64, queue_size=16, queue_timeout=10.0,
+                 smoothing=0.2, tolerance=1.5, long_window=500, short_window=10):
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.smoothing = smoothing
+        self.tolerance = tolerance
+        self._long_alpha = 2.0 / (long_window + 1)
+        self._short_alpha = 2.0 / (short_window + 1)
+        self.long_latency = None
+        self.short_latency = None
+        self.in_flight = 0
+        self._waiters = deque()  # threading.Event per queued turn, oldest first
+        self._lock = threading.Lock()
+
+    # Admission
+
+    def acquire(self):
+        """Take a slot, waiting in the queue if needed; raises AdmissionRejected. Returns True if it queued."""
+        with self._lock:
+            if self.in_flight < int(self.limit) and not self._waiters:
+                self.in_flight += 1
+                return False
+            if len(self._waiters) >= self.queue_size:
+                raise AdmissionRejected('queue_full', self._retry_after(len(self._waiters)))
+            waiter = threading.Event()
+            self._waiters.append(waiter)
+        if waiter.wait(self.queue_timeout):
+            return True
+        with self._lock:
+            if waiter.is_set():
+                # Handed a slot just as the wait ran out
+                return True
+            self._waiters.remove(waiter)
+            raise AdmissionRejected('timed_out', self._retry_after(len(self._waiters)))
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+            self._admit_waiters()
+
+    def _admit_waiters(self):
+        # A queued turn inherits the slot directly, so nothing can overtake the queue
+        while self._waiters and self.in_flight < int(self.limit):
+            self.in_flight += 1
+            self._waiters.popleft().set()
+
+    def _retry_after(self, queued):
+        """Seconds until roughly `queued` turns ahead of a retry would have drained"""
+        latency = self.short_latency or 1.0
+        return max(1, min(60, math.ceil(latency * (queued + 1) / max(self.limit, 1))))
+
+    # Adaptation
+
+    def observe(self, seconds):
+        """Feed one LLM call latency and move the limit"""
+        with self._lock:
+            if self.long_latency is None:
+                self.long_latency = self.short_latency = max(seconds, 1e-6)
+                return
+            seconds = max(seconds, 1e-6)
+            self.short_latency += self._short_alpha * (seconds - self.short_latency)
+            self.long_latency += self._long_alpha * (seconds - self.long_latency)
+            # A long slowdown drags the long average up with it; once calls are
+            # fast again, pull it back down quickly so the limit can regrow
+            if self.long_latency / self.short_latency > 2:
+                self.long_latency *= 0.95
+
+            gradient = max(0.5, min(1.0, self.tolerance * self.long_latency / self.short_latency))
+            # Only probe upwards when the current limit is actually being used
+            headroom = math.sqrt(self.limit) if self.in_flight >= self.limit / 2 else 0.0
+            target = self.limit * gradient + headroom
+            limit = self.limit * (1 - self.smoothing) + target * self.smoothing
+            self.limit = max(self.min_limit, min(self.max_limit, limit))
+            self._admit_waiters()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'limit': round(self.limit, 2),
+                'in_flight': self.in_flight,
+                'queued': len(self._waiters),
+                'queue_size': self.queue_size,
+                'llm_latency_short': round(self.short_latency, 3) if self.short_latency is not None else None,
+                'llm_latency_long': round(self.long_latency, 3) if self.long_latency is not None else None,
+            }
@@ -0,0 +1,291 @@
+"""
+Application rows on disk, as one CSV or as hash-sharded CSVs.
+
+Every save rewrites the file holding the application, so with a single
+loan_applications.csv each save costs time proportional to every
+application ever stored, and all saves queue behind one another. In sharded
+mode (APPLICATION_SHARDS > 1), applications are split by a hash of the
+conversation id (services.ids.shard_of) across N files:
+
+    applications/shard-00-of-08.csv ... applications/shard-07-of-08.csv
+
+Each shard has its own lock, so saves to different shards run at the same
+time and each rewrites about 1/N of the data. The lock is a thread lock plus
+an exclusive flock on <shard>.lock, so gunicorn workers in other processes
+wait for each other too rather than overwriting each other's saves. A lookup by id reads a single
+shard. Listings fan out across the shards on a thread pool and concatenate
+the results. Shards use the same columns as loan_applications.csv, so every
+tool that takes a CSV path works on a shard too.
+
+Every rewrite goes to a uniquely named temporary file that then replaces the
+shard, so a reader never sees a half-written file. The shard count is part of
+the file names. Changing it needs a reshard first:
+
+    python -m services.application_store --from loan_applications.csv --dir applications --shards 8
+
+Switching an existing single-file install to sharded mode does that step on
+startup: rows in loan_applications.csv are moved into empty shards and the
+CSV is renamed to loan_applications.csv.migrated. If the shards already hold
+applications as well, startup fails instead of guessing how to merge them.
+"""
+
+import argparse
+import csv
+import logging
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import fcntl
+except ImportError:  # not on Windows: locks only order this process's threads
+    fcntl = None
+
+from services.ids import shard_of
+
+logger = logging.getLogger(__name__)
+
+_SHARD_NAME = re.compile(r'^shard-(\d+)-of-(\d+)\.csv$')
+
+
+class FileLock:
+    """A thread lock plus an exclusive flock on <path>.lock
+
+    The lock file is opened on every acquire rather than kept open, so a
+    worker forked while holding a descriptor can never share the lock.
+    """
+
+    def __init__(self, path):
+        self.path = f"{path}.lock"
+        self._thread_lock = threading.Lock()
+        self._file = None
+
+    def __enter__(self):
+        self._thread_lock.acquire()
+        if fcntl is not None:
+            try:
+                self._file = open(self.path, 'a')
+                fcntl.flock(self._file, fcntl.LOCK_EX)
+            except BaseException:
+                if self._file is not None:
+                    self._file.close()
+                    self._file = None
+                self._thread_lock.release()
+                raise
+        return self
+
+    def __exit__(self, *exc_info):
+        try:
+            if self._file is not None:
+                # Closing the descriptor releases the flock
+                self._file.close()
+                self._file = None
+        finally:
+            self._thread_lock.release()
+
+
+class CsvShard:
+    """One CSV of applications and the lock its writers hold"""
+
+    def __init__(self, path, headers):
+        self.path = path
+        self.headers = headers
+        self.lock = FileLock(path)
+        if not os.path.exists(path):
+            with open(path, 'w', newline='', encoding='utf-8') as f:
+                csv.writer(f).writerow(headers)
+
+    def save(self, row):
+        """Replace the row with the same conversation_id, or append it"""
+        with self.lock:
+            rows = []
+            replaced = False
+            for existing in self.rows():
+                if existing['conversation_id'] == row['conversation_id']:
+                    rows.append(row)
+                    replaced = True
+                else:
+                    rows.append(existing)
+            if not replaced:
+                rows.append(row)
+            self._write(rows)
+
+    def _write(self, rows):
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(self.path) or '.',
+                                         prefix=f"{os.path.basename(self.path)}.", suffix='.tmp')
+        try:
+            with open(fd, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.DictWriter(f, fieldnames=self.headers, extrasaction='ignore')
+                writer.writeheader()
+                writer.writerows(rows)
+            os.replace(temp_path, self.path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def rows(self):
+        """Rows (dicts of CSV columns) in file order"""
+        try:
+            with open(self.path, 'r', newline='', encoding='utf-8') as f:
+                yield from csv.DictReader(f)
+        except FileNotFoundError:
+            return
+
+    def get(self, conversation_id):
+        for row in self.rows():
+            if row['conversation_id'] == conversation_id:
+                return row
+        return None
+
+
+class ApplicationStore:
+    """Applications spread over one or more CsvShards by conversation id"""
+
+    def __init__(self, shards):
+        self.shards = shards
+        self._pool = ThreadPoolExecutor(max_workers=len(shards), thread_name_prefix='store') if len(shards) > 1 else None
+
+    @classmethod
+    def single(cls, csv_file, headers):
+        return cls([CsvShard(csv_file, headers)])
+
+    @classmethod
+    def sharded(cls, directory, shards, headers, legacy_csv=None):
+        """N shards under directory; refuses to open a directory written with a different count
+
+        Rows still in legacy_csv (the single-file store) are moved into the
+        shards first, provided the shards hold no applications yet.
+        """
+        os.makedirs(directory, exist_ok=True)
+        # Every worker runs this at startup; only the first one migrates
+        with FileLock(os.path.join(directory, 'migrate')):
+            existing = {int(m.group(2)) for m in map(_SHARD_NAME.match, os.listdir(directory)) if m}
+            if existing - {shards}:
+                raise ValueError(
+                    f"{directory} holds shards for a count of {sorted(existing)}, not {shards}; "
+                    f"reshard it with python -m services.application_store"
+                )
+            paths = [shard_path(directory, i, shards) for i in range(shards)]
+            if legacy_csv and _has_rows(legacy_csv):
+                if any(map(_has_rows, paths)):
+                    raise ValueError(
+                        f"both {legacy_csv} and the shards in {directory} hold applications; merge them with "
+                        f"python -m services.application_store --from {legacy_csv} <shard files> "
+                        f"--dir {directory} --shards {shards}, then move {legacy_csv} aside"
+                    )
+                count = reshard([legacy_csv], directory, shards)
+                os.replace(legacy_csv, f"{legacy_csv}.migrated")
+                logger.info(f"Moved {count:,} applications from {legacy_csv} into {shards} shards")
+            return cls([CsvShard(path, headers) for path in paths])
+
+    @property
+    def paths(self):
+        return [shard.path for shard in self.shards]
+
+    def shard_for(self, conversation_id):
+        if len(self.shards) == 1:
+            return self.shards[0]
+        return self.shards[shard_of(conversation_id, len(self.shards))]
+
+    def save(self, row):
+        self.shard_for(row['conversation_id']).save(row)
+
+    def get(self, conversation_id):
+        """The stored row for an id, or None"""
+        return self.shard_for(conversation_id).get(conversation_id)
+
+    def map_shards(self, func):
+        """[func(shard) for each shard], run concurrently when there is more than one"""
+        if self._pool is None:
+            return [func(shard) for shard in self.shards]
+        return list(self._pool.map(func, self.shards))
+
+    def iter_rows(self):
+        """Every row, shard by shard in shard order"""
+        for shard in self.shards:
+            yield from shard.rows()
+
+    def stats(self):
+        sizes = [os.path.getsize(path) if os.path.exists(path) else 0 for path in self.paths]
+        return {'shards': len(self.shards), 'bytes': sum(sizes), 'largest_shard_bytes': max(sizes)}
+
+
+def _has_rows(csv_file):
+    """True if the CSV exists and has a row after its header"""
+    try:
+        with open(csv_file, 'r', newline='', encoding='utf-8') as f:
+            reader = csv.reader(f)
+            next(reader, None)
+            return next(reader, None) is not None
+    except FileNotFoundError:
+        return False
+
+
+def shard_path(directory, index, shards):
+    return os.path.join(directory, f"shard-{index:02d}-of-{shards:02d}.csv")
+
+
+def reshard(sources, directory, shards):
+    """Write the rows of the source CSVs into a fresh set of shards; returns the row count
+
+    The new shards are written beside the old ones and swapped in at the
+    end, then shard files for any other count in the directory are removed.
+    Stop the app first.
+    """
+    os.makedirs(directory, exist_ok=True)
+    headers = None
+    writers, files = [], []
+    count = 0
+    try:
+        for source in sources:
+            with open(source, 'r', newline='', encoding='utf-8') as f:
+                reader = csv.DictReader(f)
+                if headers is None:
+                    headers = reader.fieldnames
+                    files = [open(shard_path(directory, i, shards) + '.new', 'w', newline='', encoding='utf-8')
+                             for i in range(shards)]
+                    writers = [csv.DictWriter(out, fieldnames=headers) for out in files]
+                    for writer in writers:
+                        writer.writeheader()
+                for row in reader:
+                    if row.get('conversation_id'):
+                        writers[shard_of(row['conversation_id'], shards)].writerow(row)
+                        count += 1
+    finally:
+        for out in files:
+            out.close()
+    if headers is None:
+        raise ValueError("no source CSV to reshard")
+    for i in range(shards):
+        os.replace(shard_path(directory, i, shards) + '.new', shard_path(directory, i, shards))
+    # Shards for the old count (often the sources themselves) are superseded now
+    for name in os.listdir(directory):
+        match = _SHARD_NAME.match(name)
+        if match and int(match.group(2)) != shards:
+            os.remove(os.path.join(directory, name))
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Split applications into N hash shards (or change the shard count)")
+    parser.add_argument('--from', dest='sources', nargs='+', required=True,
+                        help="source CSVs: loan_applications.csv, or the current shard files")
+    parser.add_argument('--dir', default='applications', help="shard directory (the app's APPLICATION_SHARD_DIR)")
+    parser.add_argument('--shards', type=int, required=True, help="number of shards (the app's APPLICATION_SHARDS)")
+    args = parser.parse_args(argv)
+
+    sources = [os.path.abspath(path) for path in args.sources]
+    started = time.monotonic()
+    count = reshard(sources, os.path.abspath(args.dir), args.shards)
+    print(f"✅ Wrote {count:,} applications into {args.shards} shards in {time.monotonic() - started:.1f}s",
+          file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,298 @@
+"""
+Cold storage for finished applications.
+
+Applications in a terminal status (completed, rejected) whose updated_at is
+older than a cut-off move out of loan_applications.csv into monthly
+segments under the archive directory, keyed by the month of updated_at:
+
+    archive/2025-06.csv.gz      concatenated gzip members, one per block
+    archive/2025-06.index.json  columns, per-block offset/length/id range,
+                                status counts
+
+Each archiving run appends its rows for a month as new blocks of up to
+BLOCK_ROWS rows, sorted by conversation id. A lookup by id decompresses
+only the blocks whose id range covers it, and the whole segment is still
+a valid .csv.gz without its header (zcat works). The index is written
+after the data, so bytes past the last indexed block (from an interrupted
+run) are ignored and overwritten by the next one. An application that was
+reopened from the archive, saved and archived again has its older copy's
+position listed under `superseded` in that block's index entry (row
+numbers within the block), and readers skip that copy only.
+
+    python -m services.archive --csv loan_applications.csv --dir archive --days 30
+"""
+
+import argparse
+import bisect
+import csv
+import gzip
+import io
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = ('completed', 'rejected')
+BLOCK_ROWS = 1000
+
+
+class ApplicationArchive:
+    """Monthly compressed segments of archived application rows"""
+
+    def __init__(self, directory):
+        self.directory = os.path.abspath(directory)
+        self._lock = threading.Lock()
+        self._indexes = {}  # month -> index dict
+        os.makedirs(self.directory, exist_ok=True)
+        for name in sorted(os.listdir(self.directory)):
+            if name.endswith('.index.json'):
+                with open(os.path.join(self.directory, name), 'r', encoding='utf-8') as f:
+                    self._indexes[name[:-len('.index.json')]] = json.load(f)
+
+    def _segment_path(self, month):
+        return os.path.join(self.directory, f"{month}.csv.gz")
+
+    def _index_path(self, month):
+        return os.path.join(self.directory, f"{month}.index.json")
+
+    # Writes
+
+    def archive(self, csv_file, older_than_days, lock=None, statuses=TERMINAL_STATUSES, now=None):
+        """Move terminal rows last updated more than `older_than_days` ago out of csv_file; returns the count
+
+        `lock` is held while the CSV is read and rewritten, so it must be the
+        lock the application's own writers take.
+        """
+        cutoff = ((now or datetime.now()) - timedelta(days=older_than_days)).isoformat()
+        with lock or threading.Lock():
+            if not os.path.exists(csv_file):
+                return 0
+            with open(csv_file, 'r', newline='', encoding='utf-8') as f:
+                reader = csv.DictReader(f)
+                columns = reader.fieldnames
+                keep, cold = [], {}
+                for row in reader:
+                    if row.get('status') in statuses and (row.get('updated_at') or '') < cutoff:
+                        cold.setdefault(segment_month(row), []).append(row)
+                    else:
+                        keep.append(row)
+            if not cold:
+                return 0
+
+            # Archive first: a crash before the CSV is rewritten leaves rows in
+            # both places, which readers resolve in favour of the hot copy
+            self._supersede({row['conversation_id'] for rows in cold.values() for row in rows})
+            for month, rows in sorted(cold.items()):
+                self._append(month, columns, rows)
+            temp_path = f"{csv_file}.tmp"
+            with open(temp_path, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.DictWriter(f, fieldnames=columns)
+                writer.writeheader()
+                writer.writerows(keep)
+            os.replace(temp_path, csv_file)
+        return sum(len(rows) for rows in cold.values())
+
+    def _supersede(self, conversation_ids):
+        """Mark earlier archived copies of these ids (applications reopened and saved again) as replaced
+
+        Runs before the new copies are appended, so only the old rows'
+        positions are marked and the new copies stay visible.
+        """
+        ordered = sorted(conversation_ids)
+        with self._lock:
+            indexes = dict(self._indexes)
+        for month, index in sorted(indexes.items()):
+            replaced = Counter()
+            blocks = []
+            for block in index['blocks']:
+                # Only blocks whose id range holds one of the ids need decompressing
+                start = bisect.bisect_left(ordered, block['min_id'])
+                if start == len(ordered) or ordered[start] > block['max_id']:
+                    blocks.append(block)
+                    continue
+                superseded = set(block.get('superseded', ()))
+                for position, row in enumerate(self._read_block(month, index['columns'], block)):
+                    if row['conversation_id'] in conversation_ids and position not in superseded:
+                        superseded.add(position)
+                        replaced[row.get('status', '')] += 1
+                blocks.append(dict(block, superseded=sorted(superseded)) if superseded else block)
+            if replaced:
+                statuses = Counter(index['statuses'])
+                statuses.subtract(replaced)
+                with self._lock:
+                    self._write_index(month, dict(index, blocks=blocks, statuses=dict(+statuses)))
+
+    def _write_index(self, month, index):
+        temp_path = f"{self._index_path(month)}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f)
+        os.replace(temp_path, self._index_path(month))
+        self._indexes[month] = index
+
+    def _append(self, month, columns, rows):
+        rows.sort(key=lambda row: row['conversation_id'])
+        with self._lock:
+            index = self._indexes.get(month) or {'month': month, 'columns': columns, 'blocks': [], 'statuses': {}}
+            columns = index['columns']
+            end = sum(block['length'] for block in index['blocks'])
+            blocks = []
+            with open(self._segment_path(month), 'ab') as f:
+                f.truncate(end)
+                f.seek(end)
+                for start in range(0, len(rows), BLOCK_ROWS):
+                    chunk = rows[start:start + BLOCK_ROWS]
+                    text = io.StringIO()
+                    csv.writer(text).writerows([[row.get(column, '') for column in columns] for row in chunk])
+                    data = gzip.compress(text.getvalue().encode('utf-8'), mtime=0)
+                    f.write(data)
+                    blocks.append({
+                        'offset': end, 'length': len(data), 'rows': len(chunk),
+                        'min_id': chunk[0]['conversation_id'], 'max_id': chunk[-1]['conversation_id'],
+                    })
+                    end += len(data)
+                f.flush()
+                os.fsync(f.fileno())
+            statuses = Counter(index['statuses'])
+            statuses.update(row.get('status', '') for row in rows)
+            self._write_index(month, dict(index, blocks=index['blocks'] + blocks, statuses=dict(statuses)))
+
+    # Reads
+
+    def find(self, conversation_id):
+        """The archived row for an id (a dict of CSV columns), or None"""
+        with self._lock:
+            candidates = [
+                (month, index['columns'], block)
+                for month, index in sorted(self._indexes.items(), reverse=True)
+                for block in reversed(index['blocks'])
+                if block['min_id'] <= conversation_id <= block['max_id']
+            ]
+        for month, columns, block in candidates:
+            for row in self._live_rows(month, columns, block):
+                if row['conversation_id'] == conversation_id:
+                    return row
+        return None
+
+    def iter_rows(self, month_from=None, month_to=None):
+        """Archived rows (dicts) from the oldest segment to the newest, optionally limited to months (YYYY-MM, inclusive)"""
+        with self._lock:
+            segments = [
+                (month, index['columns'], list(index['blocks']))
+                for month, index in sorted(self._indexes.items())
+                if (not month_from or month >= month_from) and (not month_to or month <= month_to)
+            ]
+        for month, columns, blocks in segments:
+            for block in blocks:
+                yield from self._live_rows(month, columns, block)
+
+    def _live_rows(self, month, columns, block):
+        """A block's rows, without the copies replaced by a later archiving run"""
+        superseded = set(block.get('superseded', ()))
+        for position, row in enumerate(self._read_block(month, columns, block)):
+            if position not in superseded:
+                yield row
+
+    def _read_block(self, month, columns, block):
+        with open(self._segment_path(month), 'rb') as f:
+            f.seek(block['offset'])
+            data = gzip.decompress(f.read(block['length']))
+        for values in csv.reader(io.StringIO(data.decode('utf-8'))):
+            yield dict(zip(columns, values))
+
+    def status_counts(self):
+        totals = Counter()
+        with self._lock:
+            for index in self._indexes.values():
+                totals.update(index['statuses'])
+        return dict(totals)
+
+    def stats(self):
+        with self._lock:
+            months = sorted(self._indexes)
+            return {
+                'segments': len(months),
+                'oldest': months[0] if months else None,
+                'newest': months[-1] if months else None,
+                'rows': sum(
+                    b['rows'] - len(b.get('superseded', ()))
+                    for index in self._indexes.values() for b in index['blocks']
+                ),
+                'bytes': sum(sum(b['length'] for b in index['blocks']) for index in self._indexes.values()),
+            }
+
+
+def iter_application_rows(csv_file, archive=None, month_from=None, month_to=None):
+    """Every application row: archived ones (oldest month first, optionally limited to months), then the CSV's
+
+    `csv_file` may be a list of paths, e.g. the shards of a
+    services.application_store. An application in both places is taken
+    from the CSV, which is the newer copy.
+    """
+    paths = [csv_file] if isinstance(csv_file, str) else list(csv_file)
+    if archive is not None:
+        paths = [path for path in paths if os.path.exists(path)]
+        hot_ids = set()
+        for path in paths:
+            with open(path, 'r', newline='', encoding='utf-8') as f:
+                hot_ids.update(row['conversation_id'] for row in csv.DictReader(f))
+        for row in archive.iter_rows(month_from, month_to):
+            if row['conversation_id'] not in hot_ids:
+                yield row
+    for path in paths:
+        with open(path, 'r', newline='', encoding='utf-8') as f:
+            yield from csv.DictReader(f)
+
+
+def segment_month(row):
+    """YYYY-MM segment a row belongs in: the month it was last updated"""
+    stamp = row.get('updated_at') or row.get('created_at') or ''
+    return stamp[:7] if len(stamp) >= 7 else 'undated'
+
+
+def start_archiver(archive, targets, older_than_days, interval):
+    """Archive in a daemon thread every `interval` seconds; targets are (csv_file, lock) pairs, e.g. one per shard"""
+    def run():
+        while True:
+            try:
+                started = time.monotonic()
+                moved = sum(archive.archive(csv_file, older_than_days, lock=lock) for csv_file, lock in targets)
+                if moved:
+                    logger.info("Archived %d applications in %.1fs", moved, time.monotonic() - started)
+            except Exception:
+                logger.exception("Archiving failed")
+            time.sleep(interval)
+
+    thread = threading.Thread(target=run, name='application-archiver', daemon=True)
+    thread.start()
+    return thread
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Move finished applications into monthly compressed segments")
+    parser.add_argument('--csv', nargs='+', default=['loan_applications.csv'], help="hot applications CSV, or every shard file")
+    parser.add_argument('--dir', default='archive', help="archive directory (the app's ARCHIVE_DIR)")
+    parser.add_argument('--days', type=int, default=30, help="archive terminal applications not updated for this many days")
+    parser.add_argument('--find', metavar='CONVERSATION_ID', help="print one archived application instead")
+    args = parser.parse_args(argv)
+
+    archive = ApplicationArchive(args.dir)
+    if args.find:
+        row = archive.find(args.find)
+        print(json.dumps(row, indent=2) if row else f"{args.find} is not archived")
+        return 0 if row else 1
+    started = time.monotonic()
+    # Stop the app (or run this on its schedule) so saves don't race the CSV rewrite
+    moved = sum(archive.archive(csv_file, args.days) for csv_file in args.csv)
+    print(f"✅ Archived {moved:,} applications in {time.monotonic() - started:.1f}s", file=sys.stderr)
+    print(json.dumps(archive.stats(), indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,136 @@
+"""
+Fingerprinted static assets, without a build step.
+
+At startup every file under the static folder is hashed and given a
+content-addressed name (js/chatbot.js -> js/chatbot.3f2a9c01d4e5.js). A
+url_defaults hook makes url_for('static', filename='js/chatbot.js') produce
+the fingerprinted URL, so templates don't change, and the static view
+serves those names from memory with gzip/brotli variants precompressed once
+and `Cache-Control: immutable`. A repeat visit then needs no static
+requests at all until a file's content (and so its URL) changes.
+
+Unfingerprinted paths, and fingerprints from an earlier deploy, still work:
+they are served from disk through Flask's own handler with revalidation.
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import time
+
+from flask import current_app, request
+
+from services.wire import COMPRESSIBLE_TYPES
+
+try:
+    import brotli
+except ImportError:  # optional: gzip variants only
+    brotli = None
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+_FINGERPRINTED = re.compile(r'^(?P<stem>.+)\.(?P<digest>[0-9a-f]{12})(?P<ext>\.[^./]+)$')
+
+
+class Asset:
+    __slots__ = ('path', 'mimetype', 'digest', 'variants')
+
+    def __init__(self, path, mimetype, digest, variants):
+        self.path = path
+        self.mimetype = mimetype
+        self.digest = digest
+        self.variants = variants  # encoding ('identity', 'gzip', 'br') -> bytes
+
+
+class AssetManifest:
+    """Logical static path -> fingerprinted asset, built by scanning the folder once"""
+
+    def __init__(self, static_folder):
+        self.static_folder = static_folder
+        self.assets = {}  # logical path -> Asset
+        self.by_url = {}  # fingerprinted path -> Asset
+        self.build_ms = None
+        self.scan()
+
+    def scan(self):
+        started = time.perf_counter()
+        assets = {}
+        if self.static_folder and os.path.isdir(self.static_folder):
+            for directory, _, files in os.walk(self.static_folder):
+                for name in sorted(files):
+                    full_path = os.path.join(directory, name)
+                    logical = os.path.relpath(full_path, self.static_folder).replace(os.sep, '/')
+                    assets[logical] = self._load(full_path)
+        self.assets = assets
+        self.by_url = {fingerprinted_name(path, asset.digest): asset for path, asset in assets.items()}
+        self.build_ms = round((time.perf_counter() - started) * 1000, 1)
+
+    @staticmethod
+    def _load(full_path):
+        with open(full_path, 'rb') as f:
+            data = f.read()
+        mimetype = mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+        variants = {'identity': data}
+        if mimetype in COMPRESSIBLE_TYPES:
+            compressed = gzip.compress(data, compresslevel=9, mtime=0)
+            if len(compressed) < len(data):
+                variants['gzip'] = compressed
+            if brotli is not None:
+                compressed = brotli.compress(data, quality=11)
+                if len(compressed) < len(data):
+                    variants['br'] = compressed
+        return Asset(full_path, mimetype, hashlib.sha256(data).hexdigest()[:12], variants)
+
+    def url_for(self, filename):
+        """Fingerprinted path for a logical static path, or the path unchanged if it isn't in the manifest"""
+        asset = self.assets.get(filename)
+        return fingerprinted_name(filename, asset.digest) if asset else filename
+
+    def install(self, app):
+        """Rewrite url_for('static') to fingerprinted names and serve them from memory"""
+        fallback = app.view_functions['static']
+
+        @app.url_defaults
+        def fingerprint_static_urls(endpoint, values):
+            if endpoint == 'static' and 'filename' in values:
+                values['filename'] = self.url_for(values['filename'])
+
+        def static(filename):
+            asset = self.by_url.get(filename)
+            if asset is None:
+                # An old fingerprint (e.g. a page cached across a deploy): serve
+                # the current file, but let it be revalidated
+                match = _FINGERPRINTED.match(filename)
+                if match and f"{match['stem']}{match['ext']}" in self.assets:
+                    filename = f"{match['stem']}{match['ext']}"
+                return fallback(filename=filename)
+            return self.respond(asset)
+
+        app.view_functions['static'] = static
+
+    def respond(self, asset):
+        offered = [encoding for encoding in ('br', 'gzip') if encoding in asset.variants]
+        encoding = request.accept_encodings.best_match(offered) if offered else None
+        body = asset.variants[encoding or 'identity']
+        response = current_app.response_class(body, mimetype=asset.mimetype)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        if offered:
+            response.vary.add('Accept-Encoding')
+        response.headers['Cache-Control'] = IMMUTABLE
+        response.set_etag(f"{asset.digest}-{encoding}" if encoding else asset.digest)
+        return response.make_conditional(request)
+
+    def stats(self):
+        return {
+            'files': len(self.assets),
+            'bytes': sum(len(a.variants['identity']) for a in self.assets.values()),
+            'compressed_bytes': sum(min(len(v) for v in a.variants.values()) for a in self.assets.values()),
+            'build_ms': self.build_ms,
+        }
+
+
+def fingerprinted_name(path, digest):
+    stem, ext = os.path.splitext(path)
+    return f"{stem}.{digest}{ext}"
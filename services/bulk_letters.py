@@ -0,0 +1,241 @@
+"""
+Bulk sanction letter reissue.
+
+Streams matching applications out of loan_applications.csv (and, when
+given one, the archive of finished applications; see services.archive),
+renders their
+letters in parallel across processes and writes them into a ZIP that is
+emitted entry by entry, so neither the rows nor the PDFs are ever all held
+in memory. Used by the /api/sanction-letters/bulk endpoint and as a CLI:
+
+    python -m services.bulk_letters --from 2025-10-01 --to 2025-10-31 -o letters.zip
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import re
+import sys
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from services.archive import ApplicationArchive, iter_application_rows
+from services.pdf_pool import _render_bytes
+from services.process_pools import mp_context
+
+UNSAFE_FILENAME_RE = re.compile(r'[^A-Za-z0-9_-]+')
+
+
+def select_applications(csv_file, date_from=None, date_to=None, status='completed', after=None, skip_ids=(),
+                        archive=None):
+    """Yield (conversation_id, customer_data) for matching rows in file order.
+
+    Dates are inclusive ISO dates compared against updated_at, which is when
+    a completed application's letter was issued. `after` resumes from the
+    row following that conversation id. `csv_file` may also be a list of
+    paths (the shards of a services.application_store), read in turn. With an
+    ApplicationArchive, archived rows come first, reading only the monthly
+    segments the dates cover. Raises ValueError at the end if `after` was
+    never seen.
+    """
+    waiting_for_cursor = bool(after)
+    # Segments are months of updated_at, the same field the dates filter on
+    months = (date_from and date_from[:7], date_to and date_to[:7])
+    for row in iter_application_rows(csv_file, archive, *months):
+        conversation_id = row['conversation_id']
+        if waiting_for_cursor:
+            waiting_for_cursor = conversation_id != after
+            continue
+        if not conversation_id or row['status'] != status or conversation_id in skip_ids:
+            continue
+        day = row['updated_at'][:10]
+        if (date_from and day < date_from) or (date_to and day > date_to):
+            continue
+        customer_data = json.loads(row['customer_data_json']) if row['customer_data_json'] else {}
+        yield conversation_id, customer_data
+    if waiting_for_cursor:
+        raise ValueError(f"Unknown cursor: {after} is not among the selected applications")
+
+
+def render_many(applications, layout, workers=None, window=None):
+    """Render letters across processes, yielding (conversation_id, customer_data, pdf_bytes, error) in input order.
+
+    At most `window` renders are in flight at once, which bounds memory no
+    matter how many applications are selected.
+    """
+    workers = workers or os.cpu_count() or 1
+    window = window or workers * 4
+    pending = deque()
+
+    # Not forked: the endpoint runs this inside the threaded app process
+    with ProcessPoolExecutor(max_workers=workers, mp_context=mp_context()) as executor:
+        def drain_one():
+            conversation_id, customer_data, future = pending.popleft()
+            try:
+                return conversation_id, customer_data, future.result(), None
+            except Exception as e:
+                return conversation_id, customer_data, None, str(e)
+
+        for conversation_id, customer_data in applications:
+            pending.append((conversation_id, customer_data, executor.submit(_render_bytes, layout, customer_data)))
+            if len(pending) >= window:
+                yield drain_one()
+        while pending:
+            yield drain_one()
+
+
+def letter_filename(conversation_id, customer_data):
+    name = UNSAFE_FILENAME_RE.sub('_', customer_data.get('name', 'customer')).strip('_') or 'customer'
+    return f"{conversation_id}_{name}.pdf"
+
+
+class _ZipSink:
+    """Write-only, unseekable file object that collects bytes until drained"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def stream_zip(results, on_progress=None):
+    """Yield a ZIP archive chunk by chunk from render_many() results.
+
+    A manifest.csv listing every letter (and any render errors) is written
+    last, so a client can tell exactly which conversation ids it received.
+    """
+    sink = _ZipSink()
+    manifest = [['conversation_id', 'customer_name', 'file', 'status', 'error']]
+    done = 0
+
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for conversation_id, customer_data, pdf_bytes, error in results:
+            filename = letter_filename(conversation_id, customer_data)
+            if error is None:
+                archive.writestr(filename, pdf_bytes)
+                manifest.append([conversation_id, customer_data.get('name', ''), filename, 'ok', ''])
+            else:
+                manifest.append([conversation_id, customer_data.get('name', ''), '', 'error', error])
+            done += 1
+            if on_progress:
+                on_progress(done, conversation_id, error)
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+
+        manifest_file = io.StringIO()
+        csv.writer(manifest_file).writerows(manifest)
+        archive.writestr('manifest.csv', manifest_file.getvalue())
+
+    yield sink.drain()
+
+
+def count_applications(csv_file, **filters):
+    return sum(1 for _ in select_applications(csv_file, **filters))
+
+
+def _read_checkpoint(path):
+    if not os.path.exists(path):
+        return set()
+    with open(path, 'r', encoding='utf-8') as f:
+        return {line.strip() for line in f if line.strip()}
+
+
+def run_cli(args):
+    filters = {'date_from': args.date_from, 'date_to': args.date_to, 'status': args.status}
+    if args.archive:
+        filters['archive'] = ApplicationArchive(args.archive)
+    checkpoint = f"{args.output}.progress"
+    stem = args.output[:-4] if args.output.endswith('.zip') else args.output
+
+    if args.resume:
+        done_ids = _read_checkpoint(checkpoint)
+    else:
+        done_ids = set()
+        if os.path.exists(checkpoint):
+            os.remove(checkpoint)
+
+    total = count_applications(args.csv, skip_ids=done_ids, **filters)
+    print(f"📄 {total} letters to render ({len(done_ids)} already done)", file=sys.stderr)
+    if not total:
+        return 0
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    part = 1
+    while os.path.exists(f"{stem}-{part:03d}.zip"):
+        part += 1
+
+    applications = select_applications(args.csv, skip_ids=done_ids, **filters)
+    results = render_many(applications, args.layout, workers=args.workers)
+    rendered = failed = 0
+
+    # Letters go into rolling parts; ids are checkpointed only once their part
+    # is closed, so an interrupted run loses at most one part's worth of work
+    while True:
+        batch = []
+
+        def take(limit=args.part_size):
+            for result in results:
+                batch.append(result)
+                yield result
+                if len(batch) >= limit:
+                    return
+
+        path = f"{stem}-{part:03d}.zip"
+
+        def progress(done, conversation_id, error):
+            nonlocal rendered, failed
+            rendered += 1
+            failed += error is not None
+            print(f"\r   [{rendered}/{total}] {conversation_id}{' ✗' if error else ''}   ", end='', file=sys.stderr)
+
+        with open(path + '.tmp', 'wb') as out:
+            for chunk in stream_zip(take(), on_progress=progress):
+                out.write(chunk)
+        if not batch:
+            os.remove(path + '.tmp')
+            break
+        os.replace(path + '.tmp', path)
+
+        with open(checkpoint, 'a', encoding='utf-8') as f:
+            f.writelines(f"{conversation_id}\n" for conversation_id, _, _, error in batch if error is None)
+        print(f"\n✅ Wrote {path} ({len(batch)} letters)", file=sys.stderr)
+
+        if len(batch) < args.part_size:
+            break
+        part += 1
+
+    print(f"🎉 Done: {rendered} letters, {failed} failed", file=sys.stderr)
+    return 1 if failed else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Reissue sanction letters in bulk as ZIP archives")
+    parser.add_argument('--csv', nargs='+', default=['loan_applications.csv'], help="applications CSV, or every shard file")
+    parser.add_argument('--from', dest='date_from', help="first updated_at date (YYYY-MM-DD), inclusive")
+    parser.add_argument('--to', dest='date_to', help="last updated_at date (YYYY-MM-DD), inclusive")
+    parser.add_argument('--archive', metavar='DIR', help="also select archived applications (the app's ARCHIVE_DIR)")
+    parser.add_argument('--status', default='completed', help="application status to select")
+    parser.add_argument('--layout', default='sanction', choices=['sanction', 'summary'], help="letter layout")
+    parser.add_argument('-o', '--output', default='sanction_letters.zip', help="output name; parts are written as NAME-001.zip, ...")
+    parser.add_argument('--part-size', type=int, default=200, help="letters per ZIP part")
+    parser.add_argument('--workers', type=int, default=None, help="render processes (default: CPU count)")
+    parser.add_argument('--resume', action='store_true', help="skip letters recorded in the progress file of a previous run")
+    return run_cli(parser.parse_args(argv))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,80 @@
+"""
+Replay cache for client-retried requests (idempotency keys).
+
+A chat turn carries a client-generated message id. The first request with
+a given (conversation, message id) claims it and runs; a repeat that
+arrives while it is running waits for that result, and one that arrives
+later gets the stored result, so a retry never reaches the LLM or the stage
+machine twice. Each conversation keeps its last `window` ids, and a
+conversation idle for `ttl` seconds is forgotten.
+
+The cache lives in process memory: with several gunicorn workers, a retry
+that lands on a different worker than the original is not deduplicated.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class Turn:
+    """One claimed request; `result` is set (and `done` signalled) when it finishes"""
+
+    __slots__ = ('done', 'result')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+
+    def wait(self, timeout=None):
+        """The finished request's result, or None if it is still running after `timeout`"""
+        return self.result if self.done.wait(timeout) else None
+
+
+class IdempotencyCache:
+    def __init__(self, window=32, ttl=900, max_scopes=100000):
+        self.window = window
+        self.ttl = ttl
+        self.max_scopes = max_scopes
+        self._lock = threading.Lock()
+        self._scopes = OrderedDict()  # scope -> (last used, OrderedDict key -> Turn), least recent first
+
+    def claim(self, scope, key):
+        """(turn, True) if the caller should run the request, or (existing turn, False) for a repeat"""
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            entry = self._scopes.pop(scope, None)
+            turns = entry[1] if entry else OrderedDict()
+            self._scopes[scope] = (now, turns)
+            turn = turns.get(key)
+            if turn is not None:
+                return turn, False
+            turn = turns[key] = Turn()
+            while len(turns) > self.window:
+                turns.popitem(last=False)
+            return turn, True
+
+    def finish(self, scope, key, turn, result, keep=True):
+        """Publish the result to waiters; keep=False forgets the key so a later retry runs again"""
+        turn.result = result
+        if not keep:
+            with self._lock:
+                entry = self._scopes.get(scope)
+                if entry and entry[1].get(key) is turn:
+                    del entry[1][key]
+        turn.done.set()
+
+    def _expire(self, now):
+        while self._scopes:
+            scope, (last_used, _) = next(iter(self._scopes.items()))
+            if now - last_used < self.ttl and len(self._scopes) < self.max_scopes:
+                break
+            del self._scopes[scope]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'conversations': len(self._scopes),
+                'turns': sum(len(turns) for _, turns in self._scopes.values()),
+            }
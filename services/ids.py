@@ -0,0 +1,117 @@
+"""
+Conversation ids: unique across threads and workers, and sortable by creation time.
+
+An id is 24 decimal digits. The first 17 are the creation time in UTC to
+the millisecond (YYYYMMDDHHMMSSmmm). The next 3 are the generating
+worker's id, and the last 4 are a sequence within that millisecond:
+
+    20251017150302319 042 0007
+    timestamp         wkr seq
+
+Comparing new ids as strings orders them by creation time, to the
+millisecond, and a time range is a plain string range (see id_bounds()).
+
+Older ids are 20 digits of the host's local time to the microsecond
+(strftime('%Y%m%d%H%M%S%f')). They share the timestamp layout but not the
+time zone: on a host that is not on UTC, a legacy id reads as if it were
+created at UTC plus the host's offset (5h30m later in IST), so it sorts
+after new ids from up to that long after it and id_bounds() ranges and
+id_time() are off by the offset for it. On a UTC host the two formats sort
+together.
+A worker id must be unique among the processes generating ids at the same
+time. It comes from ID_WORKER (gunicorn.conf.py sets one per worker),
+otherwise it is derived from the host name and pid.
+"""
+
+import os
+import socket
+import threading
+import time
+import zlib
+from datetime import datetime, timezone
+
+ID_LENGTH = 24
+LEGACY_LENGTH = 20
+MAX_SEQUENCE = 9999
+
+
+def default_worker_id():
+    configured = os.environ.get('ID_WORKER')
+    if configured:
+        return int(configured) % 1000
+    return zlib.crc32(f"{socket.gethostname()}:{os.getpid()}".encode()) % 1000
+
+
+class IdGenerator:
+    """Thread-safe source of conversation ids for one worker"""
+
+    def __init__(self, worker_id=None, clock=time.time):
+        self.worker_id = default_worker_id() if worker_id is None else worker_id % 1000
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._last_ms = 0
+        self._sequence = 0
+
+    def next_id(self):
+        with self._lock:
+            now_ms = int(self._clock() * 1000)
+            if now_ms > self._last_ms:
+                self._last_ms = now_ms
+                self._sequence = 0
+            else:
+                # Same millisecond, or the clock stepped back: keep counting from
+                # the last timestamp handed out, borrowing the next ms on overflow
+                self._sequence += 1
+                if self._sequence > MAX_SEQUENCE:
+                    self._last_ms += 1
+                    self._sequence = 0
+            ms = self._last_ms
+            sequence = self._sequence
+        return f"{format_timestamp(ms / 1000)}{self.worker_id:03d}{sequence:04d}"
+
+
+def format_timestamp(seconds):
+    """17-digit UTC id prefix (YYYYMMDDHHMMSSmmm) for a Unix time"""
+    moment = datetime.fromtimestamp(seconds, timezone.utc)
+    return f"{moment:%Y%m%d%H%M%S}{moment.microsecond // 1000:03d}"
+
+
+def id_time(conversation_id):
+    """Creation time encoded in an id, as a naive datetime, or None for ids in neither format"""
+    if not conversation_id.isdigit():
+        return None
+    try:
+        if len(conversation_id) == ID_LENGTH:
+            return datetime.strptime(conversation_id[:17] + '000', '%Y%m%d%H%M%S%f')
+        if len(conversation_id) == LEGACY_LENGTH:
+            return datetime.strptime(conversation_id, '%Y%m%d%H%M%S%f')
+    except ValueError:
+        pass
+    return None
+
+
+def id_bounds(start=None, end=None):
+    """(low, high) such that ids created in [start, end) satisfy low <= id < high
+
+    start and end are datetimes (or ISO strings); naive ones are taken as
+    UTC and aware ones are converted to it. Either may be None for an open
+    end. Legacy ids are matched on their local-time digits (see above).
+    """
+    def prefix(value):
+        if value is None:
+            return None
+        if isinstance(value, str):
+            value = datetime.fromisoformat(value)
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc)
+        return f"{value:%Y%m%d%H%M%S}{value.microsecond // 1000:03d}"
+    return prefix(start), prefix(end)
+
+
+def in_bounds(conversation_id, low, high):
+    return (low is None or conversation_id >= low) and (high is None or conversation_id < high)
+
+
+def shard_of(conversation_id, shards):
+    """Stable shard number in [0, shards) for an id"""
+    return zlib.crc32(conversation_id.encode()) % shards
@@ -0,0 +1,48 @@
+"""
+Catalogue of the application's metrics, exposed at /metrics.
+
+Defined in one place so the series names, labels and buckets are easy to
+find; see services.metrics for the recording model.
+"""
+
+from services import metrics
+
+HTTP_SECONDS = metrics.histogram('loan_http_request_seconds', 'HTTP request latency', ['endpoint', 'method', 'status'])
+
+STAGE_SECONDS = metrics.histogram(
+    'loan_stage_handler_seconds', 'Time spent in a conversation stage handler', ['stage']
+)
+STAGE_ERRORS = metrics.counter('loan_stage_handler_errors_total', 'Stage handlers that raised', ['stage'])
+CHAT_REPLAYS = metrics.counter(
+    'loan_chat_replays_total', 'Retried chat turns answered from the first attempt', ['state']
+)
+CHAT_ADMISSIONS = metrics.counter(
+    'loan_chat_admissions_total', 'Chat turns by admission outcome (admitted, queued, rejected, timed_out)', ['outcome']
+)
+CHAT_CONCURRENCY = metrics.gauge(
+    'loan_chat_concurrency', 'Adaptive chat concurrency limit, turns in flight and turns queued', ['kind']
+)
+
+LLM_SECONDS = metrics.histogram(
+    'loan_llm_request_seconds', 'LLM chat completion latency per attempt', ['model', 'purpose', 'outcome']
+)
+LLM_TOKENS = metrics.counter('loan_llm_tokens_total', 'LLM tokens consumed', ['model', 'purpose', 'kind'])
+LLM_ERRORS = metrics.counter('loan_llm_errors_total', 'Failed LLM attempts', ['model', 'purpose', 'error'])
+LLM_RETRIES = metrics.counter('loan_llm_retries_total', 'LLM attempts retried after a transient error', ['model', 'purpose'])
+
+LOOKUP_SECONDS = metrics.histogram(
+    'loan_reference_lookup_seconds', 'Reference data (CRM, bureau, offers) lookup latency', ['table']
+)
+LOOKUPS = metrics.counter('loan_reference_lookups_total', 'Reference data lookups by outcome', ['table', 'result'])
+
+STORE_WRITE_SECONDS = metrics.histogram(
+    'loan_store_write_seconds', 'Persistence write latency (CSV, letter cache, uploads)', ['store']
+)
+STORE_WRITE_ERRORS = metrics.counter('loan_store_write_errors_total', 'Persistence writes that failed', ['store'])
+
+PDF_RENDER_SECONDS = metrics.histogram(
+    'loan_pdf_render_seconds', 'Sanction letter render time in this process', ['layout']
+)
+PDF_JOB_SECONDS = metrics.histogram(
+    'loan_pdf_job_seconds', 'Pooled sanction letter jobs, queue wait plus render', ['layout', 'outcome']
+)
@@ -0,0 +1,262 @@
+"""
+Local persistent job queue.
+
+Jobs live in a SQLite table so they survive restarts; a small pool of worker
+threads claims them, runs the registered handler and records the result.
+A handler that raises is retried with exponential backoff and, after
+max_attempts, parked in the 'dead' state (the dead-letter queue) until it is
+requeued by hand. Business outcomes such as a rejected document are results,
+not failures: only exceptions count as failed attempts.
+
+Several processes (gunicorn workers, restarts) may share the table. A claimed
+job carries its queue's owner token and a lease that a heartbeat thread keeps
+extending while the job runs; a running job whose lease has lapsed belonged
+to a process that died and is claimed again by whichever worker sees it first.
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+
+from services import tracing
+
+logger = logging.getLogger(__name__)
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+DEAD = 'dead'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    dedupe_key TEXT,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    run_after REAL NOT NULL,
+    owner TEXT,
+    lease_until REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, run_after);
+CREATE INDEX IF NOT EXISTS jobs_dedupe ON jobs (kind, dedupe_key, status);
+"""
+
+
+class JobQueue:
+    """SQLite-backed job table with a thread worker pool"""
+
+    def __init__(self, db_path, workers=2, max_attempts=3, backoff=2.0, poll_interval=1.0, lease=60.0):
+        self.db_path = db_path
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.poll_interval = poll_interval
+        self.lease = lease
+        self._owner = None
+        self._handlers = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition()
+        self._threads = []
+        self._stopping = False
+        self._db = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.executescript(SCHEMA)
+        # jobs.db files from before leases
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(jobs)")}
+        for column, kind in (('owner', 'TEXT'), ('lease_until', 'REAL')):
+            if column not in columns:
+                self._db.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+
+    def register(self, kind, handler, on_success=None, on_dead=None):
+        """handler(payload) -> result dict; callbacks get (job_id, payload, result_or_error)"""
+        self._handlers[kind] = (handler, on_success, on_dead)
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            return self._db.execute(sql, params)
+
+    def start(self):
+        """Start worker threads (once per process, e.g. after a gunicorn fork)"""
+        with self._lock:
+            if self._threads or not self.workers:
+                return
+            self._owner = uuid.uuid4().hex
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._worker, name=f"job-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            thread = threading.Thread(target=self._heartbeat, name='job-heartbeat', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        self._stopping = True
+        with self._wakeup:
+            self._wakeup.notify_all()
+
+    def enqueue(self, kind, payload, dedupe_key=None):
+        """Add a job and return its id; an active job with the same dedupe key is reused"""
+        if dedupe_key:
+            row = self._execute(
+                "SELECT id FROM jobs WHERE kind = ? AND dedupe_key = ? AND status IN (?, ?)",
+                (kind, dedupe_key, QUEUED, RUNNING)
+            ).fetchone()
+            if row:
+                return row[0]
+
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        self._execute(
+            "INSERT INTO jobs (id, kind, payload, dedupe_key, status, max_attempts, created_at, updated_at, run_after) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (job_id, kind, json.dumps(payload), dedupe_key, QUEUED, self.max_attempts, now, now, now)
+        )
+        self.start()
+        with self._wakeup:
+            self._wakeup.notify()
+        return job_id
+
+    def get(self, job_id):
+        row = self._execute(
+            "SELECT id, kind, status, attempts, max_attempts, result, error, created_at, updated_at FROM jobs WHERE id = ?",
+            (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {
+            'job_id': row[0],
+            'kind': row[1],
+            'status': row[2],
+            'attempts': row[3],
+            'max_attempts': row[4],
+            'result': json.loads(row[5]) if row[5] else None,
+            'error': row[6],
+            'created_at': row[7],
+            'updated_at': row[8],
+        }
+
+    def list(self, status=None, limit=100):
+        sql = "SELECT id FROM jobs"
+        params = ()
+        if status:
+            sql += " WHERE status = ?"
+            params = (status,)
+        sql += " ORDER BY created_at DESC LIMIT ?"
+        rows = self._execute(sql, params + (limit,)).fetchall()
+        return [self.get(row[0]) for row in rows]
+
+    def counts(self):
+        """Number of jobs in each status"""
+        rows = self._execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return dict(rows)
+
+    def requeue(self, job_id):
+        """Move a dead job back onto the queue with a fresh attempt budget"""
+        cursor = self._execute(
+            "UPDATE jobs SET status = ?, attempts = 0, error = NULL, run_after = ?, updated_at = ? WHERE id = ? AND status = ?",
+            (QUEUED, time.time(), time.time(), job_id, DEAD)
+        )
+        if cursor.rowcount:
+            self.start()
+            with self._wakeup:
+                self._wakeup.notify()
+        return cursor.rowcount > 0
+
+    def _claim(self):
+        now = time.time()
+        with self._lock:
+            # Queued jobs that are due, or running ones whose owner stopped renewing the lease
+            row = self._db.execute(
+                "SELECT id, kind, payload, attempts, status, owner FROM jobs "
+                "WHERE (status = ? AND run_after <= ?) OR (status = ? AND COALESCE(lease_until, 0) < ?) "
+                "ORDER BY run_after LIMIT 1",
+                (QUEUED, now, RUNNING, now)
+            ).fetchone()
+            if row is None:
+                return None
+            # Guard on status and owner so another process cannot claim the same job
+            cursor = self._db.execute(
+                "UPDATE jobs SET status = ?, attempts = attempts + 1, owner = ?, lease_until = ?, updated_at = ? "
+                "WHERE id = ? AND status = ? AND owner IS ?",
+                (RUNNING, self._owner, now + self.lease, now, row[0], row[4], row[5])
+            )
+            if not cursor.rowcount:
+                return None
+        if row[4] == RUNNING:
+            logger.warning(f"Job {row[0]} ({row[1]}) lease expired; running it again")
+        return row[0], row[1], json.loads(row[2]), row[3] + 1
+
+    def _heartbeat(self):
+        """Extend the lease on this queue's running jobs while the process is alive"""
+        while not self._stopping:
+            time.sleep(self.lease / 3)
+            try:
+                self._execute(
+                    "UPDATE jobs SET lease_until = ? WHERE status = ? AND owner = ?",
+                    (time.time() + self.lease, RUNNING, self._owner)
+                )
+            except sqlite3.Error as e:
+                logger.error(f"Job lease renewal failed: {e}")
+
+    def _worker(self):
+        while not self._stopping:
+            job = self._claim()
+            if job is None:
+                with self._wakeup:
+                    self._wakeup.wait(self.poll_interval)
+                continue
+            self._run(*job)
+
+    def _run(self, job_id, kind, payload, attempt):
+        with tracing.trace(f"job:{kind}", job_id=job_id, attempt=attempt) as root:
+            self._attempt(job_id, kind, payload, attempt, root)
+
+    def _attempt(self, job_id, kind, payload, attempt, root):
+        handler, on_success, on_dead = self._handlers.get(kind, (None, None, None))
+        try:
+            if handler is None:
+                raise LookupError(f"No handler registered for job kind '{kind}'")
+            result = handler(payload)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            root.record_error(error)
+            now = time.time()
+            if attempt >= self.max_attempts:
+                self._execute(
+                    "UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE id = ?",
+                    (DEAD, error, now, job_id)
+                )
+                logger.error(f"Job {job_id} ({kind}) moved to dead-letter after {attempt} attempts: {error}")
+                self._callback(on_dead, job_id, payload, error)
+            else:
+                delay = self.backoff * 2 ** (attempt - 1)
+                self._execute(
+                    "UPDATE jobs SET status = ?, error = ?, run_after = ?, updated_at = ? WHERE id = ?",
+                    (QUEUED, error, now + delay, now, job_id)
+                )
+                logger.warning(f"Job {job_id} ({kind}) attempt {attempt} failed, retrying in {delay:g}s: {error}")
+            return
+
+        self._execute(
+            "UPDATE jobs SET status = ?, result = ?, error = NULL, updated_at = ? WHERE id = ?",
+            (DONE, json.dumps(result), time.time(), job_id)
+        )
+        self._callback(on_success, job_id, payload, result)
+
+    def _callback(self, callback, job_id, payload, value):
+        if callback is None:
+            return
+        try:
+            callback(job_id, payload, value)
+        except Exception as e:
+            logger.error(f"Job {job_id} callback failed: {e}")
@@ -0,0 +1,85 @@
+"""
+Content-addressed disk cache for generated sanction letters.
+
+Letters are stored as <key>.pdf where the key is the hash produced by
+agents.sanction_renderer.letter_cache_key. The file's mtime is its creation
+time and doubles as Last-Modified; recency for LRU eviction is tracked in
+memory (seeded from mtimes on startup) so hits never rewrite the file.
+"""
+
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+from services import tracing
+from services.instruments import STORE_WRITE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+class LetterCache:
+    """Size-capped LRU of rendered PDFs on disk"""
+
+    def __init__(self, directory, max_bytes=256 * 1024 * 1024):
+        self.directory = os.path.abspath(directory)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> size, least recently used first
+        self._total = 0
+        self._load()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.pdf")
+
+    def _load(self):
+        os.makedirs(self.directory, exist_ok=True)
+        found = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and entry.name.endswith('.pdf'):
+                stat = entry.stat()
+                found.append((stat.st_mtime, entry.name[:-4], stat.st_size))
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+            self._total += size
+
+    def get(self, key):
+        """Path of the cached letter, or None on a miss"""
+        with self._lock:
+            if key not in self._entries:
+                return None
+            path = self._path(key)
+            if not os.path.exists(path):
+                self._total -= self._entries.pop(key)
+                return None
+            self._entries.move_to_end(key)
+            return path
+
+    def put(self, key, data):
+        """Store a letter atomically and return its path"""
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with STORE_WRITE_SECONDS.time('letter_cache'), tracing.span('write', store='letter_cache'):
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+
+        with self._lock:
+            if key in self._entries:
+                self._total -= self._entries.pop(key)
+            self._entries[key] = len(data)
+            self._total += len(data)
+            self._evict()
+        return path
+
+    def _evict(self):
+        while self._total > self.max_bytes and len(self._entries) > 1:
+            key, size = self._entries.popitem(last=False)
+            self._total -= size
+            try:
+                os.remove(self._path(key))
+            except OSError as e:
+                logger.warning(f"Could not evict cached letter {key}: {e}")
+
+    def stats(self):
+        return {'entries': len(self._entries), 'bytes': self._total, 'max_bytes': self.max_bytes}
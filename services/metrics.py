@@ -0,0 +1,241 @@
+"""
+In-process metrics in Prometheus text format.
+
+Every thread records into its own cells (a plain dict per metric held in a
+threading.local), so the hot path never takes a lock: only the owning thread
+writes a cell, and the scrape sums copies of all cells. When a thread exits
+its cells are folded into a shared 'retired' cell, which keeps counters
+monotonic without leaking memory under servers that spawn a thread per
+request. Values recorded inside worker processes (PDF renders, slip parsing)
+stay in those processes; the parent records job-level timings instead.
+
+    REQUESTS = counter('loan_requests_total', 'Requests served', ['endpoint'])
+    REQUESTS.inc('chat')
+    with LATENCY.time('chat'):
+        ...
+"""
+
+import functools
+import threading
+import time
+import weakref
+
+# Seconds; spans sub-millisecond lookups up to slow LLM calls and PDF jobs
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class _ThreadCells:
+    """Per-thread dicts of label values -> value, merged on scrape"""
+
+    def __init__(self, merge):
+        self._merge = merge
+        self._local = threading.local()
+        self._live = {}  # id(cell) -> cell
+        self._retired = {}
+        self._lock = threading.Lock()  # scrape and thread start/exit only
+
+    def cell(self):
+        try:
+            return self._local.cell
+        except AttributeError:
+            pass
+        cell = {}
+        # The holder dies with the thread's locals; its finaliser retires the cell
+        holder = _Holder()
+        weakref.finalize(holder, self._retire, cell)
+        with self._lock:
+            self._live[id(cell)] = cell
+        self._local.cell = cell
+        self._local.holder = holder
+        return cell
+
+    def _retire(self, cell):
+        with self._lock:
+            self._live.pop(id(cell), None)
+            for labels, value in cell.items():
+                self._retired[labels] = self._merge(self._retired.get(labels), value)
+
+    def snapshot(self):
+        with self._lock:
+            total = dict(self._retired)
+            for cell in list(self._live.values()):
+                # dict.copy() is atomic under the GIL, so a concurrent write cannot tear it
+                for labels, value in cell.copy().items():
+                    total[labels] = self._merge(total.get(labels), value)
+        return total
+
+
+class _Holder:
+    __slots__ = ('__weakref__',)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs.extend(f'{name}="{value}"' for name, value in extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._cells = _ThreadCells(lambda a, b: (a or 0) + b)
+
+    def inc(self, *labelvalues, amount=1):
+        cell = self._cells.cell()
+        cell[labelvalues] = cell.get(labelvalues, 0) + amount
+
+    def values(self):
+        return self._cells.snapshot()
+
+    def render(self):
+        for labels, value in sorted(self.values().items()):
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {value:g}"
+
+
+class Gauge:
+    """Current values read from a callback at scrape time (e.g. a pool's size)"""
+
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._collect = None
+
+    def set_function(self, collect):
+        """collect() returns {label values tuple: value}"""
+        self._collect = collect
+
+    def values(self):
+        return self._collect() if self._collect else {}
+
+    def render(self):
+        for labels, value in sorted(self.values().items()):
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {value:g}"
+
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._cells = _ThreadCells(self._merge)
+
+    @staticmethod
+    def _merge(total, value):
+        # value is [count per bucket..., +Inf count, sum]
+        if total is None:
+            return list(value)
+        return [a + b for a, b in zip(total, value)]
+
+    def observe(self, seconds, *labelvalues):
+        cell = self._cells.cell()
+        state = cell.get(labelvalues)
+        if state is None:
+            state = cell[labelvalues] = [0] * (len(self.buckets) + 2)
+        for i, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                state[i] += 1
+                break
+        else:
+            state[-2] += 1
+        state[-1] += seconds
+
+    def time(self, *labelvalues):
+        return _Timer(self, labelvalues)
+
+    def values(self):
+        return self._cells.snapshot()
+
+    def render(self):
+        for labels, state in sorted(self.values().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, labels, [('le', f'{bound:g}')])} {cumulative}"
+            cumulative += state[-2]
+            yield f"{self.name}_bucket{_format_labels(self.labelnames, labels, [('le', '+Inf')])} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, labels)} {state[-1]:g}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}"
+
+
+class _Timer:
+    """Context manager observing elapsed seconds, also when the block raises"""
+
+    __slots__ = ('histogram', 'labelvalues', 'start')
+
+    def __init__(self, histogram, labelvalues):
+        self.histogram = histogram
+        self.labelvalues = labelvalues
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, *self.labelvalues)
+        return False
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                # Modules re-imported under another name share the original metric
+                return existing
+            self._metrics[metric.name] = metric
+        return metric
+
+    def render(self):
+        """Exposition text for every registered metric"""
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def counter(name, documentation, labelnames=(), registry=REGISTRY):
+    return registry.register(Counter(name, documentation, labelnames))
+
+
+def gauge(name, documentation, labelnames=(), registry=REGISTRY):
+    return registry.register(Gauge(name, documentation, labelnames))
+
+
+def histogram(name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS, registry=REGISTRY):
+    return registry.register(Histogram(name, documentation, labelnames, buckets))
+
+
+def timed(histogram, *labelvalues):
+    """Decorator observing a function's duration under fixed label values"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with histogram.time(*labelvalues):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,182 @@
+"""
+Process pool for sanction letter rendering.
+
+Reportlab layout is CPU-bound and holds the GIL, so rendering on the request
+thread stalls every other request in the worker. Letters are rendered in a
+ProcessPoolExecutor instead; submissions are bounded so a burst of approvals
+fails fast rather than queueing without limit, and every job has a timeout:
+a job past it is reported failed from then on, and the processes are
+restarted to stop a render that is still running.
+"""
+
+import io
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+
+from agents.sanction_renderer import render_letter
+from services import tracing
+from services.instruments import PDF_JOB_SECONDS
+from services.process_pools import mp_context, terminate
+
+logger = logging.getLogger(__name__)
+
+# Finished jobs kept around for status/download polling
+MAX_FINISHED_JOBS = 256
+
+
+class PdfQueueFull(Exception):
+    """Raised when the pool already has its maximum number of jobs in flight"""
+
+
+class PdfJobTimeout(Exception):
+    """Raised when a job does not finish within the per-job timeout"""
+
+
+def _render_bytes(layout, customer_data, today=None):
+    """Worker-side entry point; returns raw PDF bytes so the result pickles cheaply"""
+    return render_letter(layout, customer_data, today).getvalue()
+
+
+class PdfPool:
+    """Bounded process pool with a small job table for async polling"""
+
+    def __init__(self, max_workers=2, queue_size=8, timeout=30):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.enabled = max_workers > 0
+        self._slots = threading.BoundedSemaphore(max_workers + queue_size)
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._jobs = OrderedDict()
+
+    def _get_executor(self):
+        # Created on first use, and again after a timed-out render took the old one down
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=mp_context())
+            return self._executor
+
+    def submit(self, layout, customer_data, today=None, job_id=None, on_success=None, meta=None):
+        """Queue a render and return its job id; raises PdfQueueFull when saturated.
+
+        Passing a job_id (e.g. the letter's cache key) makes submission
+        idempotent: a job with that id still in flight is reused.
+        on_success(pdf_bytes) runs on the pool's callback thread once the
+        render succeeds, unless the job has already timed out.
+        """
+        self._expire_overdue()
+        executor = self._get_executor()
+        job_id = job_id or uuid.uuid4().hex
+        # Checked and recorded under one lock so a double-clicked submit renders once
+        with self._lock:
+            existing = self._jobs.get(job_id)
+            if existing is not None and not existing['finished']:
+                return job_id
+            if not self._slots.acquire(blocking=False):
+                raise PdfQueueFull(f"PDF queue is full ({self.max_workers} workers busy)")
+            try:
+                future = executor.submit(_render_bytes, layout, dict(customer_data), today)
+            except Exception:
+                self._slots.release()
+                raise
+            job = {'future': future, 'executor': executor, 'created': time.time(), 'finished': None,
+                   'timed_out': False, 'meta': meta or {}}
+            self._jobs[job_id] = job
+            self._jobs.move_to_end(job_id)
+            self._prune()
+
+        def done(fut):
+            self._slots.release()
+            failed = job['timed_out'] or fut.cancelled() or fut.exception() is not None
+            job['finished'] = job['finished'] or time.time()
+            PDF_JOB_SECONDS.observe(job['finished'] - job['created'], layout, 'failed' if failed else 'ok')
+            if on_success and not failed:
+                try:
+                    on_success(fut.result())
+                except Exception as e:
+                    logger.exception(f"PDF job {job_id} callback failed: {e}")
+
+        future.add_done_callback(done)
+        return job_id
+
+    def _expire(self, job_id, job):
+        """Fail a job that ran past the timeout for good, and stop the worker rendering it
+
+        A running render cannot be cancelled, so the executor it runs on is
+        terminated and replaced; other renders on that executor fail too.
+        """
+        with self._lock:
+            if job['finished']:
+                return
+            job['timed_out'] = True
+            job['finished'] = time.time()
+        if job['future'].cancel():
+            return
+        logger.error(f"PDF job {job_id} exceeded {self.timeout}s; restarting the render processes")
+        with self._executor_lock:
+            if self._executor is job['executor']:
+                self._executor = None
+        terminate(job['executor'])
+
+    def _expire_overdue(self):
+        now = time.time()
+        with self._lock:
+            overdue = [(job_id, job) for job_id, job in self._jobs.items()
+                       if not job['finished'] and now - job['created'] > self.timeout]
+        for job_id, job in overdue:
+            self._expire(job_id, job)
+
+    def _prune(self):
+        finished = [jid for jid, job in self._jobs.items() if job['finished']]
+        for jid in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self._jobs[jid]
+
+    def meta(self, job_id):
+        """Caller-supplied metadata stored with the job"""
+        job = self._jobs.get(job_id)
+        return job['meta'] if job else {}
+
+    def status(self, job_id):
+        """Return 'pending', 'done', 'failed' or None for an unknown job"""
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        if not job['timed_out'] and not job['future'].done() and time.time() - job['created'] > self.timeout:
+            self._expire(job_id, job)
+        future = job['future']
+        if job['timed_out'] or future.cancelled() or (future.done() and future.exception() is not None):
+            return 'failed'
+        return 'done' if future.done() else 'pending'
+
+    def result(self, job_id, timeout=None):
+        """Wait for a job and return its PDF as a BytesIO"""
+        job = self._jobs[job_id]
+        if job['timed_out']:
+            raise PdfJobTimeout(f"PDF job {job_id} exceeded {self.timeout}s")
+        remaining = max(0.0, job['created'] + self.timeout - time.time())
+        try:
+            with tracing.span('pdf_job_wait', job_id=job_id):
+                data = job['future'].result(timeout=remaining if timeout is None else min(timeout, remaining))
+        except FutureTimeoutError:
+            if time.time() - job['created'] >= self.timeout:
+                self._expire(job_id, job)
+            raise PdfJobTimeout(f"PDF job {job_id} exceeded {self.timeout}s")
+        return io.BytesIO(data)
+
+    def render(self, layout, customer_data, today=None, job_id=None, on_success=None):
+        """Submit and wait; the calling thread blocks on I/O, not on PDF CPU work"""
+        return self.result(self.submit(layout, customer_data, today, job_id, on_success))
+
+    def stats(self):
+        jobs = list(self._jobs.values())
+        return {'jobs': len(jobs), 'in_flight': sum(1 for job in jobs if not job['finished'])}
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
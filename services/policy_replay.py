@@ -0,0 +1,369 @@
+"""
+Offline replay of stored applications through two underwriting policies.
+
+Every application in loan_applications.csv (or its shards, and optionally
+the archive) is decided under a baseline and a candidate
+agents.underwriting_policy.UnderwritingPolicy. The report counts outcomes
+under each policy, the approved count and volume (sum of loan amounts) and
+their deltas, and the decision flips between them, with a few example
+conversation ids per flip.
+
+The inputs come from what the application recorded: the credit score and
+pre-approved limit stored at underwriting, and the slip-verified monthly
+salary, falling back to the declared monthly income. Applications that never
+reached underwriting have no score or limit stored. With --reference-data,
+those are looked up in the credit_scores.csv / offers.csv the agent reads;
+without it, they are skipped. A rule whose input is missing decides
+`insufficient_data` rather than guessing.
+
+Rows are streamed in batches to a process pool with a bounded number of
+batches in flight, and workers return only aggregates, so memory stays flat
+at any history size. The reference tables are read once, before the workers
+are forked, and shared with them copy-on-write; only where fork is not
+available does each worker read its own copy.
+
+    python -m services.policy_replay --candidate min_credit_score=680,max_emi_ratio=0.55 --archive archive
+    python -m services.policy_replay --baseline current.json --candidate proposed.json -o replay.json
+"""
+
+import argparse
+import csv
+import gc
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+
+from agents.underwriting_policy import UnderwritingPolicy
+from services.archive import ApplicationArchive, iter_application_rows
+
+# Outcome -> decision; flips are counted between decisions
+DECISIONS = {
+    'approved': 'approved',
+    'approved_after_slip': 'approved',
+    'rejected_credit_score': 'rejected',
+    'rejected_over_limit': 'rejected',
+    'rejected_emi': 'rejected',
+    'insufficient_data': 'undecided',
+}
+POLICIES = ('baseline', 'candidate')
+# Example conversation ids kept per flip
+SAMPLES_PER_FLIP = 20
+
+
+def _number(value):
+    try:
+        return float(value) if value not in (None, '') else None
+    except (TypeError, ValueError):
+        return None
+
+
+def application_inputs(customer_data, reference=None):
+    """((loan_amount, credit_score, pre_approved_limit, salary, salary_declared), None), or (None, reason) to skip it"""
+    loan_amount = _number(customer_data.get('loan_amount'))
+    if not loan_amount:
+        return None, 'no_loan_amount'
+    credit_score = _number(customer_data.get('credit_score'))
+    limit = _number(customer_data.get('pre_approved_limit'))
+    if reference is not None:
+        customer_id = customer_data.get('customer_id')
+        if credit_score is None:
+            credit_score = reference['credit_scores'].get(customer_id)
+        if limit is None:
+            limit = reference['limits'].get(customer_id)
+    if credit_score is None:
+        return None, 'not_underwritten'
+    salary = _number(customer_data.get('monthly_salary'))
+    declared = salary is None
+    if declared:
+        salary = _number(customer_data.get('monthly_income'))
+    return (loan_amount, credit_score, limit, salary, declared), None
+
+
+def decide(policy, loan_amount, credit_score, pre_approved_limit, salary):
+    """The outcome (a DECISIONS key) of one application under a policy"""
+    if pre_approved_limit is None:
+        # Rejected on credit score before the limit was ever looked up
+        if credit_score < policy.min_credit_score:
+            return 'rejected_credit_score'
+        return 'insufficient_data'
+    status, reason = policy.eligibility(credit_score, loan_amount, pre_approved_limit)
+    if status == 'rejected':
+        return f'rejected_{reason}'
+    if status == 'approved':
+        return 'approved'
+    if not salary:
+        return 'insufficient_data'
+    _, affordable = policy.affordability(loan_amount, salary)
+    return 'approved_after_slip' if affordable else 'rejected_emi'
+
+
+class ReplayReport:
+    """Aggregates for a set of replayed applications; reports from separate batches merge()"""
+
+    def __init__(self):
+        self.applications = 0
+        self.skipped = Counter()
+        self.declared_salary = 0
+        self.outcomes = {name: Counter() for name in POLICIES}
+        self.approved = {name: [0, 0.0] for name in POLICIES}  # [count, volume]
+        self.approved_by_loan_type = {name: Counter() for name in POLICIES}
+        self.flips = {}  # (from decision, to decision) -> [count, volume]
+        self.transitions = Counter()  # (baseline outcome, candidate outcome) that differ
+        self.samples = {}  # (from, to) -> [conversation_id, ...]
+
+    def add(self, conversation_id, loan_type, inputs, outcomes):
+        loan_amount, _, _, _, declared = inputs
+        self.applications += 1
+        self.declared_salary += declared
+        decisions = []
+        for name, outcome in zip(POLICIES, outcomes):
+            self.outcomes[name][outcome] += 1
+            decision = DECISIONS[outcome]
+            decisions.append(decision)
+            if decision == 'approved':
+                self.approved[name][0] += 1
+                self.approved[name][1] += loan_amount
+                self.approved_by_loan_type[name][loan_type or 'unknown'] += loan_amount
+        if outcomes[0] != outcomes[1]:
+            self.transitions[outcomes] += 1
+        flip = tuple(decisions)
+        if flip[0] != flip[1]:
+            totals = self.flips.setdefault(flip, [0, 0.0])
+            totals[0] += 1
+            totals[1] += loan_amount
+            samples = self.samples.setdefault(flip, [])
+            if len(samples) < SAMPLES_PER_FLIP:
+                samples.append(conversation_id)
+
+    def merge(self, other):
+        self.applications += other.applications
+        self.skipped.update(other.skipped)
+        self.declared_salary += other.declared_salary
+        for name in POLICIES:
+            self.outcomes[name].update(other.outcomes[name])
+            self.approved[name][0] += other.approved[name][0]
+            self.approved[name][1] += other.approved[name][1]
+            self.approved_by_loan_type[name].update(other.approved_by_loan_type[name])
+        for flip, (count, volume) in other.flips.items():
+            totals = self.flips.setdefault(flip, [0, 0.0])
+            totals[0] += count
+            totals[1] += volume
+        self.transitions.update(other.transitions)
+        for flip, ids in other.samples.items():
+            samples = self.samples.setdefault(flip, [])
+            samples.extend(ids[:SAMPLES_PER_FLIP - len(samples)])
+
+    def to_dict(self, baseline, candidate):
+        (base_count, base_volume), (cand_count, cand_volume) = self.approved['baseline'], self.approved['candidate']
+        loan_types = sorted(set(self.approved_by_loan_type['baseline']) | set(self.approved_by_loan_type['candidate']))
+        return {
+            'policies': {'baseline': baseline.to_dict(), 'candidate': candidate.to_dict()},
+            'applications': self.applications,
+            'skipped': dict(self.skipped),
+            'salary_from_declared_income': self.declared_salary,
+            'outcomes': {name: dict(self.outcomes[name]) for name in POLICIES},
+            'approved': {
+                'baseline': {'count': base_count, 'volume': base_volume},
+                'candidate': {'count': cand_count, 'volume': cand_volume},
+                'delta': {'count': cand_count - base_count, 'volume': cand_volume - base_volume},
+            },
+            'approved_volume_by_loan_type': {
+                loan_type: {
+                    'baseline': self.approved_by_loan_type['baseline'][loan_type],
+                    'candidate': self.approved_by_loan_type['candidate'][loan_type],
+                    'delta': (self.approved_by_loan_type['candidate'][loan_type]
+                              - self.approved_by_loan_type['baseline'][loan_type]),
+                }
+                for loan_type in loan_types
+            },
+            'flips': [
+                {'from': old, 'to': new, 'count': count, 'volume': volume, 'examples': self.samples.get((old, new), [])}
+                for (old, new), (count, volume) in sorted(self.flips.items(), key=lambda item: -item[1][0])
+            ],
+            'outcome_changes': [
+                {'from': old, 'to': new, 'count': count}
+                for (old, new), count in self.transitions.most_common()
+            ],
+        }
+
+
+# Per-worker state: policies set by _init_worker, reference tables inherited
+# from replay() through fork (or loaded by _init_worker without it)
+_POLICIES = None
+_REFERENCE = None
+
+
+def load_reference(data_dir):
+    """customer_id -> credit score / pre-approved limit from the bureau and offer CSVs the agent reads"""
+    reference = {'credit_scores': {}, 'limits': {}}
+    for name, key, column in (('credit_scores.csv', 'credit_scores', 'credit_score'),
+                              ('offers.csv', 'limits', 'pre_approved_limit')):
+        with open(os.path.join(data_dir, name), 'r', newline='', encoding='utf-8') as f:
+            table = reference[key]
+            for row in csv.DictReader(f):
+                table[row['customer_id']] = float(row[column])
+    return reference
+
+
+def _init_worker(baseline, candidate, data_dir=None):
+    global _POLICIES, _REFERENCE
+    _POLICIES = (UnderwritingPolicy.from_dict(baseline), UnderwritingPolicy.from_dict(candidate))
+    if data_dir:
+        _REFERENCE = load_reference(data_dir)
+
+
+def _replay_batch(batch):
+    """ReplayReport for [(conversation_id, loan_type, customer_data_json), ...]"""
+    report = ReplayReport()
+    for conversation_id, loan_type, customer_data_json in batch:
+        try:
+            customer_data = json.loads(customer_data_json) if customer_data_json else {}
+        except ValueError:
+            report.skipped['bad_json'] += 1
+            continue
+        inputs, skipped = application_inputs(customer_data, _REFERENCE)
+        if inputs is None:
+            report.skipped[skipped] += 1
+            continue
+        outcomes = tuple(decide(policy, *inputs[:4]) for policy in _POLICIES)
+        report.add(conversation_id, loan_type, inputs, outcomes)
+    return report
+
+
+def replay(rows, baseline, candidate, workers=None, batch_size=2000, window=None, data_dir=None):
+    """ReplayReport for application rows (dicts of CSV columns) under both policies
+
+    workers=0 replays in this process. At most `window` batches are in
+    flight, which bounds memory however many rows there are.
+    """
+    global _REFERENCE
+    policies = (baseline.to_dict(), candidate.to_dict())
+    slim = ((row['conversation_id'], row.get('loan_type'), row.get('customer_data_json')) for row in rows)
+    batches = iter(lambda: list(itertools.islice(slim, batch_size)), [])
+    report = ReplayReport()
+
+    if workers == 0:
+        _init_worker(*policies, data_dir)
+        for batch in batches:
+            report.merge(_replay_batch(batch))
+        return report
+
+    workers = workers or os.cpu_count() or 1
+    window = window or workers * 2
+    pending = deque()
+    fork = 'fork' in multiprocessing.get_all_start_methods()
+    if fork:
+        # Workers inherit the tables instead of each reading the CSVs; frozen
+        # objects are skipped by the collector, so it does not write to (and
+        # copy) their pages in every worker
+        _REFERENCE = load_reference(data_dir) if data_dir else None
+        gc.freeze()
+    try:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('fork') if fork else None,
+            initializer=_init_worker,
+            initargs=(*policies, None if fork else data_dir)
+        ) as executor:
+            for batch in batches:
+                pending.append(executor.submit(_replay_batch, batch))
+                if len(pending) >= window:
+                    report.merge(pending.popleft().result())
+            while pending:
+                report.merge(pending.popleft().result())
+    finally:
+        if fork:
+            gc.unfreeze()
+            _REFERENCE = None
+    return report
+
+
+def parse_policy(spec):
+    """A policy from a JSON file, or from 'field=value,...' overrides of the current defaults"""
+    if not spec:
+        return UnderwritingPolicy()
+    if os.path.exists(spec):
+        with open(spec, 'r', encoding='utf-8') as f:
+            return UnderwritingPolicy.from_dict(json.load(f))
+    overrides = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        field, sep, value = item.partition('=')
+        if not sep:
+            raise ValueError(f"Expected field=value, got {item!r}")
+        overrides[field.strip()] = value.strip()
+    return UnderwritingPolicy.from_dict(overrides)
+
+
+def print_summary(report, out=sys.stderr):
+    def rupees(value):
+        return f"₹{value:,.0f}"
+
+    approved = report['approved']
+    print(f"{'':<22}{'baseline':>18}{'candidate':>18}{'delta':>18}", file=out)
+    print(f"{'approved':<22}{approved['baseline']['count']:>18,}{approved['candidate']['count']:>18,}"
+          f"{approved['delta']['count']:>+18,}", file=out)
+    print(f"{'approved volume':<22}{rupees(approved['baseline']['volume']):>18}"
+          f"{rupees(approved['candidate']['volume']):>18}{approved['delta']['volume']:>+18,.0f}", file=out)
+    if report['flips']:
+        print("Decision flips:", file=out)
+        for flip in report['flips']:
+            print(f"  {flip['from']:>9} -> {flip['to']:<9} {flip['count']:>10,}  {rupees(flip['volume'])}", file=out)
+    else:
+        print("No decision flips", file=out)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay stored applications through two underwriting policies")
+    parser.add_argument('--baseline', help="JSON file or field=value,... overrides (default: the current policy)")
+    parser.add_argument('--candidate', required=True, help="JSON file or field=value,... overrides of the current policy")
+    parser.add_argument('--csv', nargs='+', default=['loan_applications.csv'], help="applications CSV, or every shard file")
+    parser.add_argument('--archive', metavar='DIR', help="also replay archived applications (the app's ARCHIVE_DIR)")
+    parser.add_argument('--from', dest='date_from', help="first updated_at date (YYYY-MM-DD), inclusive")
+    parser.add_argument('--to', dest='date_to', help="last updated_at date (YYYY-MM-DD), inclusive")
+    parser.add_argument('--reference-data', metavar='DIR',
+                        help="data/ directory to look up scores and limits for applications that never reached underwriting")
+    parser.add_argument('--workers', type=int, default=None, help="replay processes (default: CPU count; 0 runs inline)")
+    parser.add_argument('--batch-size', type=int, default=2000, help="applications per batch sent to a worker")
+    parser.add_argument('-o', '--output', help="write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    try:
+        baseline, candidate = parse_policy(args.baseline), parse_policy(args.candidate)
+    except ValueError as e:
+        parser.error(str(e))
+
+    archive = ApplicationArchive(args.archive) if args.archive else None
+    months = (args.date_from and args.date_from[:7], args.date_to and args.date_to[:7])
+    rows = (
+        row for row in iter_application_rows(args.csv, archive, *months)
+        if row.get('conversation_id')
+        and not (args.date_from and row['updated_at'][:10] < args.date_from)
+        and not (args.date_to and row['updated_at'][:10] > args.date_to)
+    )
+
+    started = time.monotonic()
+    result = replay(rows, baseline, candidate, workers=args.workers, batch_size=args.batch_size,
+                    data_dir=args.reference_data)
+    report = result.to_dict(baseline, candidate)
+    skipped = sum(report['skipped'].values())
+    print(f"🔁 Replayed {report['applications']:,} applications in {time.monotonic() - started:.1f}s "
+          f"({skipped:,} skipped)", file=sys.stderr)
+    print_summary(report)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"📄 Report written to {args.output}", file=sys.stderr)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
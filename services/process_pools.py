@@ -0,0 +1,38 @@
+"""
+Helpers for the process pools that render letters and parse salary slips.
+
+The pools are created inside a gunicorn worker that is already running
+request threads, job queue workers and the archiver. Forking such a process
+copies whatever locks those threads hold at that instant (logging handlers,
+SQLite connections, CSV writers), and a child that then takes one of them
+hangs for good. Pools therefore start their workers with forkserver (or
+spawn where that is unavailable): children start from a fresh interpreter
+that imports only the module holding the task function.
+"""
+
+import logging
+import multiprocessing
+
+logger = logging.getLogger(__name__)
+
+
+def mp_context():
+    """Start method for pools created in a threaded process"""
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+
+def terminate(executor):
+    """Kill an executor's worker processes and shut it down without waiting
+
+    A running task cannot be cancelled, so this is the only way to get back a
+    worker stuck on one. Every unfinished future of the executor fails with
+    BrokenProcessPool.
+    """
+    # ProcessPoolExecutor has no public handle on its processes
+    for process in list((getattr(executor, '_processes', None) or {}).values()):
+        try:
+            process.terminate()
+        except Exception as e:
+            logger.warning(f"Could not terminate pool worker {process.pid}: {e}")
+    executor.shutdown(wait=False, cancel_futures=True)
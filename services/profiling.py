@@ -0,0 +1,275 @@
+"""
+On-demand profiling and memory introspection for a running worker.
+
+Two profilers, one session at a time:
+
+- deterministic: cProfile around each of the next N requests, or every
+  request until a deadline; per-request profiles are merged into one pstats.
+  Only one request is profiled at a time: from Python 3.12 cProfile sits on
+  sys.monitoring, which allows a single active profiler per interpreter, so
+  requests arriving while one is being profiled run unprofiled.
+- sampling: a background thread snapshots every thread's stack with
+  sys._current_frames() at a fixed interval for a time window and counts
+  collapsed stacks (flamegraph.pl / speedscope input).
+
+Nothing is installed until a session starts; with no session the request
+hooks cost one attribute check. tracemalloc is likewise only started on
+request. Used by the guarded /debug/* endpoints in app.py.
+"""
+
+import cProfile
+import io
+import marshal
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter
+
+DETERMINISTIC = 'deterministic'
+SAMPLING = 'sampling'
+
+# Longest sampling window / request count accepted, so a forgotten session ends
+MAX_SECONDS = 300
+MAX_REQUESTS = 1000
+
+
+class ProfileSession:
+    def __init__(self, mode, requests=None, seconds=None, interval=0.005):
+        self.id = uuid.uuid4().hex
+        self.mode = mode
+        self.started_at = time.time()
+        self.deadline = self.started_at + seconds if seconds else None
+        self.remaining = requests
+        self.interval = interval
+        self.in_flight = 0
+        self.profiled_requests = 0
+        self.finished_at = None
+        self.stats = None          # pstats.Stats for deterministic sessions
+        self.stacks = Counter()    # collapsed stack -> samples for sampling sessions
+        self.samples = 0
+
+    @property
+    def done(self):
+        return self.finished_at is not None
+
+    def describe(self):
+        return {
+            'session_id': self.id,
+            'mode': self.mode,
+            'status': 'done' if self.done else 'running',
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'requests_remaining': self.remaining,
+            'profiled_requests': self.profiled_requests,
+            'samples': self.samples,
+        }
+
+
+class Profiler:
+    """Owns the current session and the hooks that feed it"""
+
+    def __init__(self):
+        self.session = None
+        self.active = False  # the only thing request hooks look at when idle
+        self._lock = threading.Lock()
+
+    def start(self, mode=DETERMINISTIC, requests=None, seconds=None, interval_ms=5):
+        if mode not in (DETERMINISTIC, SAMPLING):
+            raise ValueError(f"mode must be '{DETERMINISTIC}' or '{SAMPLING}'")
+        if mode == SAMPLING and not seconds:
+            raise ValueError("sampling sessions need a time window (seconds)")
+        if not requests and not seconds:
+            raise ValueError("give a request count (requests) or a time window (seconds)")
+        if (requests and requests > MAX_REQUESTS) or (seconds and seconds > MAX_SECONDS):
+            raise ValueError(f"at most {MAX_REQUESTS} requests or {MAX_SECONDS} seconds per session")
+
+        with self._lock:
+            if self.session is not None and not self.session.done:
+                raise RuntimeError(f"session {self.session.id} is still running")
+            session = ProfileSession(mode, requests, seconds, interval_ms / 1000)
+            self.session = session
+            self.active = True
+
+        if mode == SAMPLING:
+            threading.Thread(target=self._sample, args=(session,), name='stack-sampler', daemon=True).start()
+        return session
+
+    def current(self):
+        """The latest session, closing a deterministic window that has expired with no requests"""
+        with self._lock:
+            session = self.session
+            if (session is not None and not session.done and session.deadline
+                    and time.time() >= session.deadline and not session.in_flight):
+                self._finish(session)
+        return session
+
+    def stop(self):
+        with self._lock:
+            session = self.session
+            if session is not None and not session.done:
+                self._finish(session)
+        return session
+
+    def _finish(self, session):
+        # Called with the lock held
+        session.finished_at = time.time()
+        self.active = False
+
+    # Deterministic profiling: called from the request hooks
+
+    def begin_request(self):
+        """Start profiling this request; returns a handle for end_request(), or None"""
+        with self._lock:
+            session = self.session
+            if session is None or session.done or session.mode != DETERMINISTIC:
+                return None
+            if session.deadline and time.time() >= session.deadline:
+                if not session.in_flight:
+                    self._finish(session)
+                return None
+            if session.in_flight:
+                return None
+            if session.remaining is not None:
+                if session.remaining <= 0:
+                    return None
+                session.remaining -= 1
+            session.in_flight += 1
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiler (a debugger, coverage) already holds sys.monitoring
+            with self._lock:
+                session.in_flight -= 1
+                if session.remaining is not None:
+                    session.remaining += 1
+            return None
+        return session, profile
+
+    def end_request(self, handle):
+        session, profile = handle
+        profile.disable()
+        with self._lock:
+            if session.stats is None:
+                session.stats = pstats.Stats(profile)
+            else:
+                session.stats.add(profile)
+            session.in_flight -= 1
+            session.profiled_requests += 1
+            out_of_requests = session.remaining is not None and session.remaining <= 0
+            past_deadline = session.deadline and time.time() >= session.deadline
+            if (out_of_requests or past_deadline) and not session.in_flight and not session.done:
+                self._finish(session)
+
+    # Sampling profiler
+
+    def _sample(self, session):
+        own = threading.get_ident()
+        while not session.done and time.time() < session.deadline:
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                session.stacks[collapse(frame)] += 1
+            session.samples += 1
+            time.sleep(session.interval)
+        with self._lock:
+            if not session.done:
+                self._finish(session)
+
+
+def collapse(frame):
+    """'outer;...;inner' for a frame, in the folded format flamegraph tools read"""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{frame.f_lineno})")
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+def collapsed_text(stacks):
+    return ''.join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+def pstats_bytes(stats):
+    """Stats in the marshal format written by dump_stats (loadable with pstats.Stats(path))"""
+    return marshal.dumps(stats.stats)
+
+
+def pstats_text(stats, sort='cumulative', limit=50):
+    out = io.StringIO()
+    stats.stream = out
+    stats.sort_stats(sort).print_stats(limit)
+    return out.getvalue()
+
+
+# Memory introspection
+
+class MemoryTracker:
+    """tracemalloc snapshots with diffs against the previous snapshot"""
+
+    def __init__(self):
+        self._previous = None
+
+    @property
+    def tracing(self):
+        return tracemalloc.is_tracing()
+
+    def start(self, frames=10):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        self._previous = None
+
+    def stop(self):
+        tracemalloc.stop()
+        self._previous = None
+
+    def snapshot(self, limit=25, key='lineno'):
+        """Top allocators now and, if there was an earlier snapshot, the biggest changes since"""
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("tracemalloc is not running")
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        ))
+        current, peak = tracemalloc.get_traced_memory()
+        report = {
+            'traced_bytes': current,
+            'peak_bytes': peak,
+            'top': [_stat(stat) for stat in snapshot.statistics(key)[:limit]],
+        }
+        if self._previous is not None:
+            report['diff'] = [_stat(stat) for stat in snapshot.compare_to(self._previous, key)[:limit]]
+        self._previous = snapshot
+        return report
+
+
+def _stat(stat):
+    frame = stat.traceback[0]
+    entry = {'location': f"{frame.filename}:{frame.lineno}", 'size': stat.size, 'count': stat.count}
+    if hasattr(stat, 'size_diff'):
+        entry['size_diff'] = stat.size_diff
+        entry['count_diff'] = stat.count_diff
+    return entry
+
+
+def deep_sizeof(obj, max_objects=100000):
+    """Approximate retained size of a container tree (bounded walk, shared objects counted once)"""
+    seen = set()
+    stack = [obj]
+    total = 0
+    while stack and len(seen) < max_objects:
+        item = stack.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        total += sys.getsizeof(item)
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            stack.extend(item)
+    return total
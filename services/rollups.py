@@ -0,0 +1,359 @@
+"""
+Incremental time-series rollups for loan funnel analytics.
+
+Every application save is folded into pre-aggregated counters, so dashboard
+charts never rescan loan_applications.csv. Each application contributes to
+the minute, hour and day bucket of its created_at, per (loan_type, city):
+
+- applications: one per application
+- reached_<stage>: funnel stages the application has reached, in order
+  started -> kyc -> eligibility -> documents -> approved (monotonic, so an
+  instantly approved application also counts as having passed documents)
+- rejected
+- amount_bin_<i> / income_bin_<i>: loan amount and monthly income histograms
+
+The last contribution of every application is kept, so a later save (city
+or loan type filled in, status moved on) applies only the difference. State
+and counters live in SQLite next to the job queue; minute buckets are pruned
+after a retention window. Backfill from an existing CSV with:
+
+    python -m services.rollups --rebuild loan_applications.csv --db rollups.db [--archive archive]
+"""
+
+import argparse
+import bisect
+import csv
+import itertools
+import json
+import sqlite3
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+from services.archive import ApplicationArchive
+
+GRANULARITIES = {'minute': 60, 'hour': 3600, 'day': 86400}
+STAGES = ('started', 'kyc', 'eligibility', 'documents', 'approved')
+
+# Histogram bucket lower bounds (₹); the last bin is open-ended
+AMOUNT_BINS = (0, 50000, 100000, 200000, 300000, 500000, 750000, 1000000, 1500000, 2000000, 3000000, 5000000)
+INCOME_BINS = (0, 20000, 30000, 50000, 75000, 100000, 150000, 200000, 300000, 500000)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rollup_state (
+    conversation_id TEXT PRIMARY KEY,
+    created INTEGER NOT NULL,
+    contribution TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS rollups (
+    granularity TEXT NOT NULL,
+    bucket INTEGER NOT NULL,
+    loan_type TEXT NOT NULL,
+    city TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    value INTEGER NOT NULL,
+    PRIMARY KEY (granularity, bucket, loan_type, city, metric)
+) WITHOUT ROWID;
+"""
+
+
+def wall_seconds(value):
+    """Naive ISO timestamp -> seconds since the epoch of its wall-clock time (no timezone shift)"""
+    if isinstance(value, (int, float)):
+        return int(value)
+    moment = datetime.fromisoformat(value) if isinstance(value, str) else value
+    return int(moment.replace(tzinfo=timezone.utc).timestamp())
+
+
+def bucket_label(seconds):
+    return datetime.fromtimestamp(seconds, timezone.utc).replace(tzinfo=None).isoformat()
+
+
+def _as_number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def funnel_stage(status, customer_data):
+    """Index into STAGES of the furthest stage this snapshot shows"""
+    if status == 'completed':
+        return 4
+    if status == 'documents_verified' or customer_data.get('documents_verified'):
+        return 3
+    if (status == 'pending_verification' or 'credit_score' in customer_data
+            or customer_data.get('monthly_income')):
+        return 2
+    if customer_data.get('verified') or customer_data.get('phone'):
+        return 1
+    return 0
+
+
+def contribution(status, customer_data, previous_stage=0):
+    """(dimension key, {metric: count}) this application adds to its buckets"""
+    dims = (str(customer_data.get('loan_type') or ''), str(customer_data.get('city') or ''))
+    stage = max(previous_stage, funnel_stage(status, customer_data))
+    metrics = {'applications': 1}
+    for index in range(1, stage + 1):
+        metrics[f"reached_{STAGES[index]}"] = 1
+    if status == 'rejected':
+        metrics['rejected'] = 1
+    amount = _as_number(customer_data.get('loan_amount'))
+    if amount:
+        metrics[f"amount_bin_{bisect.bisect_right(AMOUNT_BINS, amount) - 1}"] = 1
+    income = _as_number(customer_data.get('monthly_income'))
+    if income:
+        metrics[f"income_bin_{bisect.bisect_right(INCOME_BINS, income) - 1}"] = 1
+    return dims, metrics, stage
+
+
+class Rollups:
+    """SQLite-backed rollup counters, updated per save and queried by time range"""
+
+    def __init__(self, db_path, minute_retention_days=14):
+        self.db_path = db_path
+        self.minute_retention = minute_retention_days * 86400
+        self._lock = threading.Lock()
+        self._last_prune = 0.0
+        self._db = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.executescript(SCHEMA)
+
+    # Writes. These take the write lock up front (BEGIN IMMEDIATE): a deferred BEGIN
+    # reads rollup_state on a WAL snapshot first, and if another process commits
+    # before the upgrade to a write lock SQLite fails with SQLITE_BUSY_SNAPSHOT
+    # instead of waiting out the connection's busy timeout.
+
+    def record(self, conversation_id, status, customer_data, created_at):
+        """Fold one saved snapshot of an application into the counters"""
+        with self._lock:
+            self._db.execute('BEGIN IMMEDIATE')
+            try:
+                self._record(conversation_id, status, customer_data, created_at)
+                self._db.execute('COMMIT')
+            except Exception:
+                self._db.execute('ROLLBACK')
+                raise
+        self._maybe_prune()
+
+    def record_many(self, snapshots):
+        """Bulk form of record() for backfills: (conversation_id, status, customer_data, created_at) tuples"""
+        with self._lock:
+            self._db.execute('BEGIN IMMEDIATE')
+            try:
+                count = 0
+                for conversation_id, status, customer_data, created_at in snapshots:
+                    self._record(conversation_id, status, customer_data, created_at)
+                    count += 1
+                    if count % 10000 == 0:
+                        self._db.execute('COMMIT')
+                        self._db.execute('BEGIN IMMEDIATE')
+                self._db.execute('COMMIT')
+            except Exception:
+                self._db.execute('ROLLBACK')
+                raise
+        return count
+
+    def _record(self, conversation_id, status, customer_data, created_at):
+        row = self._db.execute(
+            "SELECT created, contribution FROM rollup_state WHERE conversation_id = ?", (conversation_id,)
+        ).fetchone()
+        if row:
+            created = row[0]
+            old_dims, old_metrics, old_stage = json.loads(row[1])
+            old_dims = tuple(old_dims)
+        else:
+            created = wall_seconds(created_at)
+            old_dims, old_metrics, old_stage = None, {}, 0
+
+        dims, metrics, stage = contribution(status, customer_data, old_stage)
+        if row and old_dims == dims and old_metrics == metrics:
+            return
+
+        deltas = Counter()
+        for metric, value in old_metrics.items():
+            deltas[(old_dims, metric)] -= value
+        for metric, value in metrics.items():
+            deltas[(dims, metric)] += value
+
+        updates = []
+        for (key, metric), delta in deltas.items():
+            if not delta:
+                continue
+            for granularity, width in GRANULARITIES.items():
+                updates.append((granularity, created - created % width, key[0], key[1], metric, delta))
+        self._db.executemany(
+            "INSERT INTO rollups (granularity, bucket, loan_type, city, metric, value) VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (granularity, bucket, loan_type, city, metric) DO UPDATE SET value = value + excluded.value",
+            updates
+        )
+        self._db.execute(
+            "INSERT OR REPLACE INTO rollup_state (conversation_id, created, contribution) VALUES (?, ?, ?)",
+            (conversation_id, created, json.dumps([dims, metrics, stage]))
+        )
+
+    def _maybe_prune(self):
+        now = time.time()
+        if now - self._last_prune < 3600:
+            return
+        self._last_prune = now
+        cutoff = wall_seconds(datetime.now()) - self.minute_retention
+        with self._lock:
+            self._db.execute("DELETE FROM rollups WHERE granularity = 'minute' AND bucket < ?", (cutoff,))
+            # Counters an application moved away from (e.g. city filled in later)
+            self._db.execute("DELETE FROM rollups WHERE value = 0")
+
+    # Queries
+
+    def series(self, granularity, start, end, group_by=(), metrics=None, loan_type=None, city=None):
+        """Per-bucket totals in [start, end), optionally split by loan_type and/or city"""
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"granularity must be one of {', '.join(GRANULARITIES)}")
+        if any(dim not in ('loan_type', 'city') for dim in group_by):
+            raise ValueError("group_by accepts loan_type and city")
+        columns = ['bucket', *group_by, 'metric']
+        sql = (f"SELECT {', '.join(columns)}, SUM(value) FROM rollups "
+               "WHERE granularity = ? AND bucket >= ? AND bucket < ?")
+        params = [granularity, wall_seconds(start), wall_seconds(end)]
+        sql, params = self._filters(sql, params, metrics, loan_type, city)
+        sql += f" GROUP BY {', '.join(columns)} ORDER BY bucket"
+
+        points = {}
+        with self._lock:
+            rows = self._db.execute(sql, params).fetchall()
+        for row in rows:
+            key = row[:-2]
+            point = points.get(key)
+            if point is None:
+                point = points[key] = {'bucket': bucket_label(row[0])}
+                point.update(zip(group_by, row[1:-2]))
+            point[row[-2]] = row[-1]
+        return list(points.values())
+
+    def totals(self, start, end, metrics=None, loan_type=None, city=None):
+        """{metric: total} for applications created in [start, end)"""
+        spans = tile_range(wall_seconds(start), wall_seconds(end))
+        if not spans:
+            return {}
+        sql = "SELECT metric, SUM(value) FROM rollups WHERE (" + " OR ".join(
+            ["(granularity = ? AND bucket >= ? AND bucket < ?)"] * len(spans)) + ")"
+        params = [value for span in spans for value in span]
+        sql, params = self._filters(sql, params, metrics, loan_type, city)
+        with self._lock:
+            rows = self._db.execute(sql + " GROUP BY metric", params).fetchall()
+        return dict(rows)
+
+    def funnel(self, start, end, loan_type=None, city=None):
+        totals = self.totals(start, end, loan_type=loan_type, city=city)
+        started = totals.get('applications', 0)
+        stages = []
+        previous = started
+        for stage in STAGES:
+            count = started if stage == 'started' else totals.get(f"reached_{stage}", 0)
+            stages.append({
+                'stage': stage,
+                'count': count,
+                'conversion_from_previous': count / previous if previous else None,
+                'conversion_from_start': count / started if started else None,
+            })
+            previous = count
+        return {'stages': stages, 'rejected': totals.get('rejected', 0)}
+
+    def histograms(self, start, end, loan_type=None, city=None):
+        totals = self.totals(start, end, loan_type=loan_type, city=city)
+
+        def histogram(prefix, bounds):
+            return [{
+                'min': low,
+                'max': bounds[i + 1] if i + 1 < len(bounds) else None,
+                'count': totals.get(f"{prefix}_{i}", 0),
+            } for i, low in enumerate(bounds)]
+
+        return {'loan_amount': histogram('amount_bin', AMOUNT_BINS), 'monthly_income': histogram('income_bin', INCOME_BINS)}
+
+    def _filters(self, sql, params, metrics, loan_type, city):
+        if metrics:
+            sql += f" AND metric IN ({', '.join('?' * len(metrics))})"
+            params.extend(metrics)
+        if loan_type is not None:
+            sql += " AND loan_type = ?"
+            params.append(loan_type)
+        if city is not None:
+            sql += " AND city = ?"
+            params.append(city)
+        return sql, params
+
+    def stats(self):
+        with self._lock:
+            applications = self._db.execute("SELECT COUNT(*) FROM rollup_state").fetchone()[0]
+            rows = self._db.execute("SELECT granularity, COUNT(*) FROM rollups GROUP BY granularity").fetchall()
+        return {'applications': applications, 'rows': dict(rows)}
+
+    def reset(self):
+        with self._lock:
+            self._db.execute("DELETE FROM rollups")
+            self._db.execute("DELETE FROM rollup_state")
+
+
+def tile_range(start, end, granularities=('day', 'hour')):
+    """[(granularity, start, end)] spans covering [start, end): whole days in the middle, hours then minutes at the edges
+
+    Minute buckets are pruned after a couple of weeks, so a long range that
+    is not day-aligned still reads days and hours for everything but its
+    ragged ends.
+    """
+    if start >= end:
+        return []
+    if not granularities:
+        return [('minute', start, end)]
+    width = GRANULARITIES[granularities[0]]
+    low, high = -(-start // width) * width, end // width * width
+    if low >= high:
+        return tile_range(start, end, granularities[1:])
+    return (tile_range(start, low, granularities[1:]) + [(granularities[0], low, high)]
+            + tile_range(high, end, granularities[1:]))
+
+
+def iter_csv_snapshots(csv_file):
+    """(conversation_id, status, customer_data, created_at) for every row of loan_applications.csv"""
+    with open(csv_file, 'r', newline='', encoding='utf-8') as f:
+        yield from iter_row_snapshots(csv.DictReader(f))
+
+
+def iter_row_snapshots(rows):
+    """Snapshots from application rows (dicts of CSV columns), e.g. ApplicationArchive.iter_rows()"""
+    for row in rows:
+        if not row.get('conversation_id'):
+            continue
+        try:
+            customer_data = json.loads(row['customer_data_json']) if row['customer_data_json'] else {}
+        except ValueError:
+            customer_data = {}
+        yield row['conversation_id'], row['status'], customer_data, row['created_at'] or row['updated_at']
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rebuild funnel rollups from loan_applications.csv")
+    parser.add_argument('--rebuild', metavar='CSV', nargs='+', required=True,
+                        help="applications CSV to backfill from, or every shard file")
+    parser.add_argument('--db', default='rollups.db', help="rollup database (the app's ROLLUPS_DB)")
+    parser.add_argument('--archive', metavar='DIR', help="also backfill archived applications (the app's ARCHIVE_DIR)")
+    args = parser.parse_args(argv)
+
+    snapshots = itertools.chain.from_iterable(map(iter_csv_snapshots, args.rebuild))
+    if args.archive:
+        snapshots = itertools.chain(iter_row_snapshots(ApplicationArchive(args.archive).iter_rows()), snapshots)
+    rollups = Rollups(args.db)
+    rollups.reset()
+    started = time.monotonic()
+    count = rollups.record_many(snapshots)
+    print(f"✅ Rolled up {count:,} applications in {time.monotonic() - started:.1f}s", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,150 @@
+"""
+Pooled, cached salary slip extraction.
+
+PDF text extraction is CPU-bound, so slips are parsed in a small
+ProcessPoolExecutor rather than on the verification worker threads. Results
+are cached by the upload's SHA-256 (from services.uploads.ContentStore) both
+in memory and as a JSON file beside the stored slip, so re-uploads and job
+retries never parse the same document twice, even across restarts. A parse
+that runs past the timeout takes its pool down with it (the processes are
+terminated and the pool rebuilt), so a hung document cannot hold a worker or
+be waited on again by the job's retries.
+"""
+
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+
+from agents.salary_slip_parser import PARSER_VERSION, parse_salary_slip
+from services import tracing
+from services.instruments import STORE_WRITE_SECONDS
+from services.process_pools import mp_context, terminate
+
+logger = logging.getLogger(__name__)
+
+# Extractions kept in memory; the on-disk copies are unbounded like the uploads
+MAX_CACHED_RESULTS = 1024
+
+
+class SlipExtractionTimeout(Exception):
+    """Raised when a slip is not parsed within the per-document timeout"""
+
+
+class SlipExtractor:
+    """Parses salary slips in a process pool, caching results by content hash"""
+
+    def __init__(self, cache_dir, max_workers=2, timeout=30):
+        self.cache_dir = os.path.abspath(cache_dir)
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self._executor = None
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()
+        self._in_flight = {}
+
+    def _get_executor(self):
+        # Created on first use, and again after a hung parse took the old one down
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=mp_context())
+            return self._executor
+
+    def _cache_path(self, digest):
+        return os.path.join(self.cache_dir, digest[:2], f"{digest}.slip-v{PARSER_VERSION}.json")
+
+    def cached(self, digest):
+        """Cached extraction for a digest, or None"""
+        with self._lock:
+            if digest in self._cache:
+                self._cache.move_to_end(digest)
+                return self._cache[digest]
+
+        try:
+            with open(self._cache_path(digest), 'r', encoding='utf-8') as f:
+                result = json.load(f)
+        except (OSError, ValueError):
+            return None
+        self._remember(digest, result)
+        return result
+
+    def _remember(self, digest, result):
+        with self._lock:
+            self._cache[digest] = result
+            self._cache.move_to_end(digest)
+            while len(self._cache) > MAX_CACHED_RESULTS:
+                self._cache.popitem(last=False)
+
+    def _store(self, digest, result):
+        path = self._cache_path(digest)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with STORE_WRITE_SECONDS.time('slip_cache'), tracing.span('write', store='slip_cache'):
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(result, f)
+            os.replace(tmp_path, path)
+        self._remember(digest, result)
+
+    def extract(self, digest, path):
+        """Return the extracted fields for a stored slip, parsing it at most once"""
+        with tracing.span('slip_extract', sha256=digest[:12]):
+            return self._extract(digest, path)
+
+    def _extract(self, digest, path):
+        result = self.cached(digest)
+        if result is not None:
+            return result
+
+        if not self.max_workers:
+            result = parse_salary_slip(path)
+        else:
+            # Concurrent jobs for the same document share one parse
+            executor = self._get_executor()
+            with self._lock:
+                future = self._in_flight.get(digest)
+                if future is None:
+                    future = executor.submit(parse_salary_slip, path)
+                    self._in_flight[digest] = future
+            try:
+                result = future.result(timeout=self.timeout)
+            except FutureTimeoutError:
+                self._abandon(executor, digest, future)
+                raise SlipExtractionTimeout(f"Salary slip {digest[:12]} not parsed within {self.timeout}s")
+            finally:
+                with self._lock:
+                    if self._in_flight.get(digest) is future and future.done():
+                        del self._in_flight[digest]
+
+        # Unreadable files are not cached so a fixed deployment (e.g. pypdf
+        # installed) gets another go at them
+        if 'error' not in result or path.lower().endswith(('.jpg', '.png')):
+            self._store(digest, result)
+        else:
+            logger.warning(f"Salary slip {digest[:12]}: {result['error']}")
+        return result
+
+    def _abandon(self, executor, digest, future):
+        """Forget a parse that timed out and, if it is running, kill the pool it runs on
+
+        The next attempt for the digest submits a fresh parse. Other parses on
+        the terminated pool fail and are retried by their jobs.
+        """
+        with self._lock:
+            if self._in_flight.get(digest) is future:
+                del self._in_flight[digest]
+            if future.cancel():
+                return
+            if self._executor is executor:
+                self._executor = None
+        logger.error(f"Salary slip {digest[:12]} parse exceeded {self.timeout}s; restarting the parse processes")
+        terminate(executor)
+
+    def stats(self):
+        return {'cached': len(self._cache), 'in_flight': len(self._in_flight)}
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
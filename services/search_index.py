@@ -0,0 +1,353 @@
+"""
+In-process search index over loan applications for the dashboard.
+
+Every indexed term is stored with a field prefix ("n:" name, "p:" phone,
+"e:" email, "c:" city) in a dict of postings, plus a sorted list of the
+distinct terms so a prefix query is a bisect into that list followed by a
+walk over the matching range. Terms first seen after the bulk load go into a
+small sorted side list instead, which is merged into the main one once it
+reaches RECENT_TERMS, and removed terms stay listed (skipped by queries) until
+that merge; a save therefore never shifts the whole term list under the lock.
+Applications are numbered internally and most terms (phones, emails) belong
+to a single one, so a posting is a bare number while one application has the
+term and a set while several do. Each query word must match some field
+(AND across words); documents are ranked by how well each word matched:
+exact beats prefix, and phone/email beat name, which beats city. Ties go to
+the most recently updated application.
+
+The index is rebuilt from the applications CSV at startup and kept current
+by save_conversation_to_csv(), so it reflects only the saves made by this
+process after the rebuild.
+"""
+
+import bisect
+import csv
+import heapq
+import re
+import threading
+import time
+import unicodedata
+
+# Score for an exact term match; a prefix match scores half
+FIELD_WEIGHTS = {'p': 8, 'e': 8, 'n': 4, 'c': 2}
+# Fields a plain word, an all-digit word and an email-looking word are matched against
+WORD_FIELDS = ('n', 'c', 'e')
+DIGIT_FIELDS = ('p', 'n')
+EMAIL_FIELDS = ('e',)
+# A prefix expanding to more distinct terms than this is cut off (e.g. "a")
+MAX_EXPANSIONS = 256
+# New terms collected before they are merged into the main sorted list
+RECENT_TERMS = 1024
+
+_WORD = re.compile(r'[^\W_]+')
+_PHONE_QUERY = re.compile(r'^[\d\s+()-]+$')
+
+# Result fields, in the order summaries are stored
+SUMMARY_FIELDS = ('customer_name', 'phone', 'email', 'city', 'loan_type', 'loan_amount', 'status', 'updated_at')
+_UPDATED_AT = SUMMARY_FIELDS.index('updated_at')
+
+
+def _fold(text):
+    """Lowercase with accents stripped, so "José" is found by "jose\""""
+    text = str(text or '').lower()
+    if text.isascii():
+        return text
+    text = unicodedata.normalize('NFKD', text)
+    return ''.join(ch for ch in text if not unicodedata.combining(ch))
+
+
+def _phone_digits(phone):
+    digits = ''.join(ch for ch in str(phone or '') if ch.isdigit())
+    # Numbers are stored without the country code; accept it in either place
+    if len(digits) == 12 and digits.startswith('91'):
+        digits = digits[2:]
+    return digits
+
+
+def document_terms(name, phone, email, city):
+    """The field-prefixed terms an application is indexed under"""
+    terms = {f"n:{word}" for word in _WORD.findall(_fold(name))}
+    terms.update(f"c:{word}" for word in _WORD.findall(_fold(city)))
+    digits = _phone_digits(phone)
+    if digits:
+        terms.add(f"p:{digits}")
+    email = _fold(email).strip()
+    if email:
+        terms.add(f"e:{email}")
+        local = email.split('@', 1)[0]
+        terms.update(f"e:{word}" for word in _WORD.findall(local))
+    return terms
+
+
+def query_terms(query):
+    """[(text, fields)] for each word of a search query"""
+    query = _fold(query).strip()
+    if not query:
+        return []
+    # "+91 98765 43210" is one phone number, not three words
+    if _PHONE_QUERY.match(query) and sum(ch.isdigit() for ch in query) >= 4:
+        return [(_phone_digits(query), ('p',))]
+    terms = []
+    for word in query.split():
+        if '@' in word:
+            terms.append((word, EMAIL_FIELDS))
+        else:
+            terms.extend(
+                (part, DIGIT_FIELDS if part.isdigit() else WORD_FIELDS)
+                for part in _WORD.findall(word)
+            )
+    return terms
+
+
+class SearchIndex:
+    """Prefix-searchable inverted index of applications, keyed by conversation_id"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings = {}  # term -> doc number, or set of doc numbers
+        self._terms = []  # sorted distinct terms as of the last merge, plus removed ones
+        self._recent = []  # sorted terms added since the last merge
+        self._stale = 0  # removed terms still listed in _terms or _recent
+        self._numbers = {}  # conversation id -> doc number
+        self._ids = []  # doc number -> conversation id (None once removed)
+        self._summaries = []  # doc number -> SUMMARY_FIELDS tuple
+        self._updated = []  # doc number -> updated_at, the ranking tie-break
+        self.ready = False
+        self.build_seconds = None
+
+    # Writes
+
+    def add(self, conversation_id, summary):
+        """Index (or re-index) one application; summary is a SUMMARY_FIELDS tuple (see csv_summary)"""
+        with self._lock:
+            self._replace(conversation_id, summary, keep_sorted=self.ready)
+
+    def remove(self, conversation_id):
+        with self._lock:
+            self._replace(conversation_id, None, keep_sorted=self.ready)
+
+    def build(self, summaries):
+        """Bulk load (conversation_id, summary) pairs, e.g. from iter_csv_summaries()
+
+        Runs alongside add(): the lock is taken per batch, and an application
+        already indexed by a save is not overwritten with its older CSV row.
+        """
+        started = time.monotonic()
+        batch = []
+        for item in summaries:
+            batch.append(item)
+            if len(batch) >= 5000:
+                self._load_batch(batch)
+                batch = []
+        self._load_batch(batch)
+        with self._lock:
+            self._terms = sorted(self._postings)
+            self._recent = []
+            self._stale = 0
+            self.ready = True
+        self.build_seconds = time.monotonic() - started
+
+    def _load_batch(self, batch):
+        with self._lock:
+            for conversation_id, summary in batch:
+                if conversation_id not in self._numbers:
+                    self._replace(conversation_id, summary, keep_sorted=self.ready)
+
+    def _replace(self, conversation_id, summary, keep_sorted):
+        number = self._numbers.get(conversation_id)
+        old_terms = set()
+        if number is not None:
+            old_terms = document_terms(*self._summaries[number][:4])
+        new_terms = document_terms(*summary[:4]) if summary is not None else set()
+
+        if number is None:
+            if summary is None:
+                return
+            number = len(self._ids)
+            self._numbers[conversation_id] = number
+            self._ids.append(conversation_id)
+            self._summaries.append(summary)
+            self._updated.append(summary[_UPDATED_AT] or '')
+        elif summary is None:
+            del self._numbers[conversation_id]
+            self._ids[number] = None
+            self._summaries[number] = None
+            self._updated[number] = ''
+        else:
+            self._summaries[number] = summary
+            self._updated[number] = summary[_UPDATED_AT] or ''
+
+        postings = self._postings
+        for term in old_terms - new_terms:
+            docs = postings[term]
+            if isinstance(docs, int):
+                del postings[term]
+                if keep_sorted:
+                    self._stale += 1
+            else:
+                docs.discard(number)
+                if len(docs) == 1:
+                    postings[term] = docs.pop()
+        for term in new_terms - old_terms:
+            docs = postings.get(term)
+            if docs is None:
+                postings[term] = number
+                if keep_sorted:
+                    self._list_term(term)
+            elif isinstance(docs, int):
+                postings[term] = {docs, number}
+            else:
+                docs.add(number)
+        if keep_sorted and (len(self._recent) >= RECENT_TERMS or self._stale >= RECENT_TERMS):
+            self._merge_terms()
+
+    def _list_term(self, term):
+        """Make a newly indexed term visible to prefix queries"""
+        for terms in (self._terms, self._recent):
+            i = bisect.bisect_left(terms, term)
+            if i < len(terms) and terms[i] == term:
+                # Removed earlier but never merged away
+                self._stale -= 1
+                return
+        bisect.insort(self._recent, term)
+
+    def _merge_terms(self):
+        postings = self._postings
+        self._terms = [term for term in heapq.merge(self._terms, self._recent) if term in postings]
+        self._recent = []
+        self._stale = 0
+
+    # Queries
+
+    def search(self, query, limit=20):
+        """{'results': [...], 'total': n, 'truncated': bool} for the best `limit` matches"""
+        terms = query_terms(query)
+        if not terms:
+            return {'results': [], 'total': 0, 'truncated': False}
+        with self._lock:
+            truncated = False
+            matches = []
+            for text, fields in terms:
+                expansions, cut = self._expand(text, fields)
+                truncated = truncated or cut
+                matches.append(expansions)
+
+            if len(matches) == 1:
+                top, total = self._rank_single(matches[0], limit)
+                return {'results': self._results(top), 'total': total, 'truncated': truncated}
+
+            # Start from the word with the fewest candidates; every other word
+            # only filters and scores that set
+            matches.sort(key=lambda expansions: sum(len(docs) for docs, _ in expansions))
+            scores = {}
+            for docs, weight in sorted(matches[0], key=lambda expansion: expansion[1]):
+                # Ascending weight, so the best match for each application wins
+                scores.update(dict.fromkeys(docs, weight))
+            for expansions in matches[1:]:
+                if not scores:
+                    break
+                filtered = {}
+                for number, score in scores.items():
+                    best = 0
+                    for docs, weight in expansions:
+                        if weight > best and number in docs:
+                            best = weight
+                    if best:
+                        filtered[number] = score + best
+                scores = filtered
+
+            top = self._rank(scores, limit)
+            return {'results': self._results(top), 'total': len(scores), 'truncated': truncated}
+
+    def _results(self, top):
+        return [
+            dict(zip(SUMMARY_FIELDS, self._summaries[number]), id=self._ids[number], score=score)
+            for number, score in top
+        ]
+
+    def _rank(self, scores, limit):
+        """Best `limit` (doc number, score) pairs: highest score, then most recently updated"""
+        by_score = {}
+        for number, score in scores.items():
+            by_score.setdefault(score, []).append(number)
+        top = []
+        for score in sorted(by_score, reverse=True):
+            best = heapq.nlargest(limit - len(top), by_score[score], key=self._updated.__getitem__)
+            top.extend((number, score) for number in best)
+            if len(top) >= limit:
+                break
+        return top
+
+    def _rank_single(self, expansions, limit):
+        """_rank() for a one-word query, working on whole posting sets rather than per application"""
+        by_weight = {}
+        for docs, weight in expansions:
+            by_weight.setdefault(weight, []).append(docs)
+        seen = set()
+        top = []
+        for weight in sorted(by_weight, reverse=True):
+            matched = set().union(*by_weight[weight]) - seen
+            if len(top) < limit:
+                best = heapq.nlargest(limit - len(top), matched, key=self._updated.__getitem__)
+                top.extend((number, weight) for number in best)
+            seen |= matched
+        return top, len(seen)
+
+    def _expand(self, text, fields):
+        """[(doc numbers, weight)] for every indexed term `text` is a prefix of, in the given fields"""
+        expansions = []
+        truncated = False
+        postings = self._postings
+        for field in fields:
+            prefix = f"{field}:{text}"
+            weight = FIELD_WEIGHTS[field]
+            listed = heapq.merge(_prefix_range(self._terms, prefix), _prefix_range(self._recent, prefix))
+            for count, term in enumerate(term for term in listed if term in postings):
+                if count == MAX_EXPANSIONS:
+                    truncated = True
+                    break
+                docs = postings[term]
+                expansions.append((
+                    (docs,) if isinstance(docs, int) else docs,
+                    weight if term == prefix else weight / 2
+                ))
+        return expansions, truncated
+
+    def stats(self):
+        with self._lock:
+            return {
+                'ready': self.ready,
+                'applications': len(self._numbers),
+                'terms': len(self._postings),
+                'build_seconds': round(self.build_seconds, 3) if self.build_seconds is not None else None,
+            }
+
+
+def _prefix_range(terms, prefix):
+    """The terms of a sorted list that start with prefix, in order"""
+    for i in range(bisect.bisect_left(terms, prefix), len(terms)):
+        if not terms[i].startswith(prefix):
+            return
+        yield terms[i]
+
+
+def csv_summary(row):
+    """SUMMARY_FIELDS tuple from an applications CSV row (or the dict written as one)"""
+    return tuple(str(row.get(field) or '') for field in SUMMARY_FIELDS)
+
+
+def iter_csv_summaries(csv_file):
+    """(conversation_id, summary) for each application in the CSV"""
+    try:
+        with open(csv_file, 'r', newline='', encoding='utf-8') as f:
+            reader = csv.reader(f)
+            header = next(reader, None)
+            if not header:
+                return
+            columns = [header.index(field) for field in SUMMARY_FIELDS]
+            id_column = header.index('conversation_id')
+            for row in reader:
+                if len(row) == len(header) and row[id_column]:
+                    yield row[id_column], tuple(row[column] for column in columns)
+    except FileNotFoundError:
+        return
@@ -0,0 +1,334 @@
+"""
+Lightweight per-request tracing.
+
+A trace is started for each chat, upload and sanction letter request (and
+each background verification job); spans opened with span() inside it nest
+through a contextvar, so agents and services need no trace plumbing. Spans
+are buffered on the trace and the sampling decision is made when the root
+finishes (tail-based): every trace slower than the threshold or ending in an
+error is kept, plus a random sample of the rest. Kept traces are appended as
+one JSON object per line to a size-rotated file.
+
+When tracing is not configured, or no trace is active on the current thread,
+span() returns a shared no-op context manager.
+
+Inspect the slowest traces and their critical path with:
+
+    python -m services.tracing --file traces.ndjson -n 10
+"""
+
+import argparse
+import contextvars
+import heapq
+import json
+import logging
+import logging.handlers
+import os
+import random
+import sys
+import time
+
+_current = contextvars.ContextVar('trace_span', default=None)
+_tracer = None
+
+
+class Span:
+    __slots__ = ('trace', 'span_id', 'parent_id', 'name', 'attributes', 'start', 'end', 'error')
+
+    def __init__(self, trace, name, parent_id, attributes):
+        self.trace = trace
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.name = name
+        self.attributes = attributes
+        self.start = time.perf_counter()
+        self.end = None
+        self.error = None
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def record_error(self, error):
+        """Mark the span failed without raising (e.g. a handled exception)"""
+        self.error = error
+
+    def to_dict(self, origin):
+        record = {
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'start_ms': round((self.start - origin) * 1000, 3),
+            'duration_ms': round((self.end - self.start) * 1000, 3),
+        }
+        if self.attributes:
+            record['attributes'] = self.attributes
+        if self.error:
+            record['error'] = self.error
+        return record
+
+
+class _Trace:
+    __slots__ = ('trace_id', 'wall_start', 'root', 'spans')
+
+    def __init__(self):
+        self.trace_id = os.urandom(16).hex()
+        self.wall_start = time.time()
+        self.root = None
+        self.spans = []
+
+
+class _SpanContext:
+    """Context manager for a child span of whatever span is current"""
+
+    __slots__ = ('span', 'token')
+
+    def __init__(self, span):
+        self.span = span
+
+    def __enter__(self):
+        self.token = _current.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        span = self.span
+        span.end = time.perf_counter()
+        if exc_type is not None:
+            span.error = f"{exc_type.__name__}: {exc}"
+        span.trace.spans.append(span)
+        _current.reset(self.token)
+        return False
+
+
+class _NoopSpan:
+    """Stands in for both the span and its context manager when not tracing"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set_attribute(self, key, value):
+        pass
+
+    def record_error(self, error):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Tracer:
+    """Decides which finished traces to keep and writes them out"""
+
+    def __init__(self, path, slow_ms=500.0, sample_rate=0.0, max_bytes=10 * 1024 * 1024, backups=5):
+        self.path = os.path.abspath(path)
+        self.slow_ms = slow_ms
+        self.sample_rate = sample_rate
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        # RotatingFileHandler serialises writers and rotates by size for us
+        handler = logging.handlers.RotatingFileHandler(
+            self.path, maxBytes=max_bytes, backupCount=backups, encoding='utf-8'
+        )
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        self._writer = logging.getLogger(f"{__name__}.writer.{id(self)}")
+        self._writer.setLevel(logging.INFO)
+        self._writer.propagate = False
+        self._writer.addHandler(handler)
+
+    def keep(self, duration_ms, error):
+        return error is not None or duration_ms >= self.slow_ms or random.random() < self.sample_rate
+
+    def finish(self, trace):
+        root = trace.root
+        duration_ms = (root.end - root.start) * 1000
+        if not self.keep(duration_ms, root.error):
+            return False
+        record = {
+            'trace_id': trace.trace_id,
+            'name': root.name,
+            'timestamp': trace.wall_start,
+            'duration_ms': round(duration_ms, 3),
+            'attributes': root.attributes,
+            'error': root.error,
+            'spans': [span.to_dict(root.start) for span in trace.spans],
+        }
+        self._writer.info(json.dumps(record, default=str))
+        return True
+
+
+def configure(path, slow_ms=500.0, sample_rate=0.0, max_bytes=10 * 1024 * 1024, backups=5):
+    """Install the process-wide tracer; until then tracing is a no-op"""
+    global _tracer
+    _tracer = Tracer(path, slow_ms, sample_rate, max_bytes, backups)
+    return _tracer
+
+
+def begin(name, **attributes):
+    """Start a trace whose root span is current until finish(); returns a handle or None"""
+    if _tracer is None:
+        return None
+    trace = _Trace()
+    root = Span(trace, name, None, attributes)
+    trace.root = root
+    return root, _current.set(root)
+
+
+def finish(handle, error=None):
+    """End a trace started with begin() and hand it to the sampler"""
+    if handle is None:
+        return
+    root, token = handle
+    root.end = time.perf_counter()
+    if error is not None:
+        root.error = error if isinstance(error, str) else f"{type(error).__name__}: {error}"
+    root.trace.spans.append(root)
+    _current.reset(token)
+    try:
+        _tracer.finish(root.trace)
+    except Exception as e:
+        logging.getLogger(__name__).warning(f"Could not write trace {root.trace.trace_id}: {e}")
+
+
+class trace:
+    """Context manager form of begin()/finish() for work outside a request"""
+
+    def __init__(self, name, **attributes):
+        self.name = name
+        self.attributes = attributes
+
+    def __enter__(self):
+        self.handle = begin(self.name, **self.attributes)
+        return self.handle[0] if self.handle else NOOP_SPAN
+
+    def __exit__(self, exc_type, exc, tb):
+        finish(self.handle, exc if exc_type is not None else None)
+        return False
+
+
+def span(name, **attributes):
+    """Child span of the current span; a no-op outside a trace"""
+    parent = _current.get()
+    if parent is None:
+        return NOOP_SPAN
+    return _SpanContext(Span(parent.trace, name, parent.span_id, attributes))
+
+
+def set_attributes(**attributes):
+    """Attach attributes (e.g. conversation_id) to the current trace's root span"""
+    current = _current.get()
+    if current is not None:
+        current.trace.root.attributes.update(attributes)
+
+
+def record_error(error):
+    """Mark the current trace failed so the sampler keeps it"""
+    current = _current.get()
+    if current is not None:
+        current.trace.root.record_error(error)
+
+
+def current_trace_id():
+    current = _current.get()
+    return current.trace.trace_id if current is not None else None
+
+
+def critical_path(record):
+    """[(depth, span, exclusive_ms)] along the chain of spans that bounded the trace.
+
+    Walking back from a span's end, the latest-finishing child that ended
+    before the cursor is what the span was waiting on; the cursor then moves
+    to that child's start. Time not covered by such children is exclusive.
+    """
+    spans = record['spans']
+    children = {}
+    root = None
+    for s in spans:
+        if s['parent_id'] is None:
+            root = s
+        else:
+            children.setdefault(s['parent_id'], []).append(s)
+
+    def end(s):
+        return s['start_ms'] + s['duration_ms']
+
+    def walk(s, depth):
+        cursor = end(s)
+        blocking = []
+        for child in sorted(children.get(s['span_id'], ()), key=end, reverse=True):
+            if end(child) <= cursor + 1e-6:
+                blocking.append(child)
+                cursor = child['start_ms']
+        exclusive = s['duration_ms'] - sum(child['duration_ms'] for child in blocking)
+        path = [(depth, s, max(exclusive, 0.0))]
+        for child in reversed(blocking):
+            path.extend(walk(child, depth + 1))
+        return path
+
+    return walk(root, 0) if root else []
+
+
+def iter_traces(path):
+    """Yield trace records from the file and its rotated backups, oldest first"""
+    backups = []
+    index = 1
+    while os.path.exists(f"{path}.{index}"):
+        backups.append(f"{path}.{index}")
+        index += 1
+    for filename in list(reversed(backups)) + [path]:
+        if not os.path.exists(filename):
+            continue
+        with open(filename, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue
+
+
+def slowest(records, limit=10, name=None):
+    """The `limit` slowest traces, optionally only those with a given root name"""
+    if name:
+        records = (r for r in records if r['name'] == name)
+    return heapq.nlargest(limit, records, key=lambda r: r['duration_ms'])
+
+
+def format_trace(record):
+    attributes = ' '.join(f"{k}={v}" for k, v in (record.get('attributes') or {}).items())
+    lines = [f"{record['duration_ms']:9.1f} ms  {record['name']}  {record['trace_id']}  {attributes}".rstrip()]
+    if record.get('error'):
+        lines.append(f"             error: {record['error']}")
+    for depth, s, exclusive in critical_path(record):
+        label = s['name']
+        span_attributes = s.get('attributes') or {}
+        detail = ' '.join(f"{k}={v}" for k, v in span_attributes.items() if k != 'conversation_id')
+        lines.append(
+            f"   {'  ' * depth}{label:<{max(1, 28 - 2 * depth)}} {s['duration_ms']:9.1f} ms"
+            f"  (self {exclusive:.1f} ms)  {detail}".rstrip()
+        )
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Show the slowest traces and their critical path")
+    parser.add_argument('--file', default='traces.ndjson', help="trace log (rotated backups are read too)")
+    parser.add_argument('-n', '--limit', type=int, default=10, help="number of traces to show")
+    parser.add_argument('--name', help="only traces with this root name, e.g. chat")
+    args = parser.parse_args(argv)
+
+    records = slowest(iter_traces(args.file), args.limit, args.name)
+    if not records:
+        print(f"No traces in {args.file}", file=sys.stderr)
+        return 1
+    for record in records:
+        print(format_trace(record))
+        print()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
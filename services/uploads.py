@@ -0,0 +1,146 @@
+"""
+Content-addressed storage for uploaded documents.
+
+Uploads are written to disk as they arrive while a SHA-256 is computed, so
+memory stays flat regardless of file size. ContentStore.open() returns a
+PendingUpload that the request's multipart parser writes into directly (see
+UploadRequest in app.py), which means the body is hashed, size-checked and
+type-checked during parsing instead of being spooled by werkzeug and copied
+again afterwards. The file type comes from the leading magic bytes rather than
+the client-supplied extension, and files are stored once under their digest:
+uploading the same slip twice yields the same path and digest, which callers
+use to skip re-verification.
+"""
+
+import hashlib
+import os
+import tempfile
+from collections import namedtuple
+
+from services import tracing
+from services.instruments import STORE_WRITE_SECONDS
+
+CHUNK_SIZE = 64 * 1024
+
+# (magic prefix, extension, mimetype)
+MAGIC_TYPES = (
+    (b'%PDF-', '.pdf', 'application/pdf'),
+    (b'\xff\xd8\xff', '.jpg', 'image/jpeg'),
+    (b'\x89PNG\r\n\x1a\n', '.png', 'image/png'),
+)
+
+StoredFile = namedtuple('StoredFile', 'digest path extension mimetype size')
+
+# Enough leading bytes to tell every type in MAGIC_TYPES apart
+SNIFF_BYTES = max(len(magic) for magic, _, _ in MAGIC_TYPES)
+
+
+class UploadTooLarge(Exception):
+    """Raised when an upload exceeds the store's size limit"""
+
+
+class UnsupportedFileType(Exception):
+    """Raised when the magic bytes match none of the accepted types"""
+
+
+def sniff_type(head):
+    """Return (extension, mimetype) for the leading bytes of a file, or None"""
+    for magic, extension, mimetype in MAGIC_TYPES:
+        if head.startswith(magic):
+            return extension, mimetype
+    return None
+
+
+class PendingUpload:
+    """Write-only file that hashes and checks an upload as it is written
+
+    Used as werkzeug's file stream for multipart parts, so it also accepts the
+    seek(0) the parser makes once a part is complete. Nothing is readable:
+    commit it with ContentStore.commit(), or close() it to discard the data.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.digest = hashlib.sha256()
+        self.size = 0
+        self.head = b''
+        self.kind = None
+        os.makedirs(store.directory, exist_ok=True)
+        fd, self.tmp_path = tempfile.mkstemp(dir=store.directory, suffix='.part')
+        self.out = os.fdopen(fd, 'wb')
+
+    def write(self, data):
+        try:
+            self.size += len(data)
+            if self.size > self.store.max_bytes:
+                raise UploadTooLarge(f"File exceeds the {self.store.max_bytes / (1024 * 1024):g} MB limit")
+            if self.kind is None and len(self.head) < SNIFF_BYTES:
+                self.head += data[:SNIFF_BYTES - len(self.head)]
+                if len(self.head) == SNIFF_BYTES:
+                    self._sniff()
+            self.digest.update(data)
+            self.out.write(data)
+        except BaseException:
+            self.close()
+            raise
+        return len(data)
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        return self.size
+
+    def _sniff(self):
+        self.kind = sniff_type(self.head)
+        if self.kind is None:
+            raise UnsupportedFileType("File content is not a PDF, JPEG or PNG")
+
+    def close(self):
+        """Discard the upload unless it was committed"""
+        if not self.out.closed:
+            self.out.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+
+class ContentStore:
+    """Stores files under <directory>/<digest[:2]>/<digest><ext>"""
+
+    def __init__(self, directory, max_bytes=10 * 1024 * 1024, chunk_size=CHUNK_SIZE):
+        self.directory = os.path.abspath(directory)
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+
+    def path_for(self, digest, extension):
+        return os.path.join(self.directory, digest[:2], f"{digest}{extension}")
+
+    def open(self):
+        """Start an upload that is written piecewise and then committed"""
+        return PendingUpload(self)
+
+    def commit(self, upload):
+        """Move a fully written upload to its digest path and return a StoredFile"""
+        with STORE_WRITE_SECONDS.time('uploads'), tracing.span('write', store='uploads'):
+            return self._commit(upload)
+
+    def save(self, stream):
+        """Stream a file-like object into the store and return a StoredFile"""
+        with STORE_WRITE_SECONDS.time('uploads'), tracing.span('write', store='uploads'):
+            upload = self.open()
+            for chunk in iter(lambda: stream.read(self.chunk_size), b''):
+                upload.write(chunk)
+            return self._commit(upload)
+
+    def _commit(self, upload):
+        try:
+            if upload.kind is None:
+                # Shorter than SNIFF_BYTES, so never sniffed while writing
+                upload._sniff()
+            upload.out.close()
+            extension, mimetype = upload.kind
+            hexdigest = upload.digest.hexdigest()
+            path = self.path_for(hexdigest, extension)
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(upload.tmp_path, path)
+            return StoredFile(hexdigest, path, extension, mimetype, upload.size)
+        finally:
+            upload.close()
@@ -0,0 +1,116 @@
+"""
+Wire format helpers: a faster JSON encoder, negotiated compression and a
+columnar layout for listings.
+
+FastJSONProvider plugs into Flask (app.json) so every jsonify() uses orjson
+when it is installed and falls back to the standard encoder otherwise, or
+for the odd value orjson refuses. compress_response() gzips (or brotli
+compresses, if the brotli module is installed) text and JSON bodies the
+client accepts. to_columns() turns a list of dicts into one array per field,
+so field names are sent once instead of once per row.
+"""
+
+import gzip
+from itertools import chain
+from operator import itemgetter
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional: plain json is used instead
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+ORJSON_OPTIONS = (orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME) if orjson is not None else 0
+
+COMPRESSIBLE_TYPES = {
+    'application/json', 'application/javascript', 'text/html', 'text/css',
+    'text/plain', 'text/javascript', 'text/csv', 'image/svg+xml',
+}
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson, with the default provider as fallback
+
+    Output is compact and keeps dict insertion order (the default provider
+    sorts keys). Dates still go through the default provider's HTTP-date
+    formatting, so responses don't change shape with the encoder.
+    """
+
+    def dumps(self, obj, **kwargs):
+        if orjson is not None and not kwargs:
+            try:
+                return orjson.dumps(obj, default=self.default, option=ORJSON_OPTIONS).decode()
+            except TypeError:
+                pass
+        return super().dumps(obj, **kwargs)
+
+    def response(self, *args, **kwargs):
+        if orjson is None or self._app.debug:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        try:
+            body = orjson.dumps(obj, default=self.default, option=ORJSON_OPTIONS)
+        except TypeError:
+            return super().response(*args, **kwargs)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def to_columns(rows, fields=None):
+    """{'format': 'columnar', 'length': n, 'columns': {field: [values]}} for a list of dicts
+
+    Fields missing from a row are None; `fields` limits and orders the
+    columns. A field whose values are all dicts (or None) is itself made
+    columnar, so nested records such as customer_data don't repeat their
+    keys either.
+    """
+    if fields is None:
+        fields = dict.fromkeys(chain.from_iterable(rows))
+    columns = {}
+    for field in fields:
+        try:
+            column = list(map(itemgetter(field), rows))
+        except KeyError:
+            column = [row.get(field) for row in rows]
+        first = next((value for value in column if value is not None), None)
+        if isinstance(first, dict) and all(value is None or type(value) is dict for value in column):
+            column = to_columns([value or {} for value in column])
+        columns[field] = column
+    return {'format': 'columnar', 'length': len(rows), 'columns': columns}
+
+
+def negotiate_encoding(accept_encodings):
+    """'br', 'gzip' or None from a werkzeug Accept-Encoding header"""
+    offered = ['br', 'gzip'] if brotli is not None else ['gzip']
+    return accept_encodings.best_match(offered)
+
+
+def compress_response(response, accept_encodings, min_bytes=1024, level=6):
+    """Compress a buffered text/JSON response in place when the client accepts it"""
+    if (response.direct_passthrough or response.is_streamed
+            or response.status_code < 200 or response.status_code in (204, 206, 304)
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_TYPES):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = negotiate_encoding(accept_encodings)
+    if encoding is None:
+        return response
+    body = response.get_data()
+    if len(body) < min_bytes:
+        return response
+    if encoding == 'br':
+        body = brotli.compress(body, quality=min(level, 11))
+    else:
+        body = gzip.compress(body, compresslevel=level, mtime=0)
+    response.set_data(body)
+    response.headers['Content-Encoding'] = encoding
+    if response.headers.get('ETag'):
+        # A compressed body is a different representation of the resource
+        response.set_etag(f"{response.get_etag()[0]}-{encoding}", weak=response.get_etag()[1])
+    return response
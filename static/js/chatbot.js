@@ -208,16 +208,10 @@ class ChatBot {
         this.showTypingIndicator();
 
         try {
-            // Use relative URLs that work in both development and production
-            const response = await fetch('/api/chat', {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json',
-                },
-                body: JSON.stringify({
-                    message: message,
-                    conversation_id: this.conversationId
-                })
+            const response = await this.postChat({
+                message: message,
+                conversation_id: this.conversationId,
+                message_id: this.newMessageId()
             });
 
             const data = await response.json();
@@ -258,6 +252,45 @@ class ChatBot {
         }
     }
 
+    newMessageId() {
+        if (window.crypto && crypto.randomUUID) {
+            return crypto.randomUUID();
+        }
+        return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2, 12)}`;
+    }
+
+    // Retries send the same message_id, so the server replays its first reply
+    // instead of processing the message (and calling the LLM) again
+    async postChat(payload, attempts = 4) {
+        for (let attempt = 1; ; attempt++) {
+            let delay = 1000 * 2 ** (attempt - 1);
+            try {
+                // Use relative URLs that work in both development and production
+                const response = await fetch('/api/chat', {
+                    method: 'POST',
+                    headers: {
+                        'Content-Type': 'application/json',
+                    },
+                    body: JSON.stringify(payload)
+                });
+                if (![409, 429, 502, 503, 504].includes(response.status) || attempt >= attempts) {
+                    return response;
+                }
+                // Overloaded: wait at least as long as the server asks
+                const retryAfter = parseInt(response.headers.get('Retry-After'), 10);
+                if (response.status === 429 && retryAfter > 0) {
+                    delay = Math.max(delay, retryAfter * 1000);
+                }
+            } catch (error) {
+                if (attempt >= attempts) {
+                    throw error;
+                }
+            }
+            // Jitter, so clients refused together don't all come back together
+            await new Promise(resolve => setTimeout(resolve, delay * (0.75 + Math.random() / 2)));
+        }
+    }
+
     addMessage(content, sender, type = 'normal') {
         const chatMessages = document.getElementById('chatMessages');
         const messageDiv = document.createElement('div');
@@ -460,7 +493,23 @@ class ChatBot {
                 body: formData
             });
 
-            const data = await response.json();
+            let data = await response.json();
+            let ok = response.ok;
+
+            // Verification runs in the background; poll until the job settles
+            if (response.status === 202 && data.status_url) {
+                progress.querySelector('.progress-bar').style.width = '75%';
+                const job = await this.waitForJob(data.status_url);
+                ok = job.status === 'done';
+                data = ok ? job.result : { error: 'We could not verify your document right now. Our team will review it shortly.' };
+            }
+            // Figures unreadable (e.g. an image): queued for a person to check
+            const manualReview = ok && data.status === 'manual_review';
+            // Salary too low for the EMI
+            if (ok && data.success === false && !manualReview) {
+                ok = false;
+                data = { error: data.reason || data.message };
+            }
             progress.querySelector('.progress-bar').style.width = '100%';
 
             setTimeout(() => {
@@ -470,7 +519,9 @@ class ChatBot {
                 progress.querySelector('.progress-bar').style.width = '0%';
                 fileInput.value = '';
 
-                if (response.ok) {
+                if (manualReview) {
+                    this.addMessage('🕵️ ' + data.message, 'bot');
+                } else if (ok) {
                     this.addMessage('✅ ' + data.message, 'bot');
                     this.updateProcessSteps('underwriting');
                     
@@ -491,6 +542,17 @@ class ChatBot {
         }
     }
 
+    async waitForJob(statusUrl) {
+        while (true) {
+            const response = await fetch(statusUrl);
+            const job = await response.json();
+            if (response.status !== 202) {
+                return job;
+            }
+            await new Promise(resolve => setTimeout(resolve, 1000));
+        }
+    }
+
     showSanctionLetterButton() {
         const chatMessages = document.getElementById('chatMessages');
         const buttonDiv = document.createElement('div');
@@ -514,16 +576,32 @@ class ChatBot {
         }
 
         try {
-            const response = await fetch('/api/generate-sanction-letter', {
+            // Ask for the letter asynchronously, then download it with a GET so
+            // repeat downloads are revalidated by the browser cache (ETag -> 304)
+            const jobResponse = await fetch('/api/generate-sanction-letter', {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
                 },
                 body: JSON.stringify({
-                    conversation_id: this.conversationId
+                    conversation_id: this.conversationId,
+                    async: true
                 })
             });
 
+            let response = jobResponse;
+            const contentType = jobResponse.headers.get('Content-Type') || '';
+            if (jobResponse.ok && contentType.includes('application/json')) {
+                const job = await jobResponse.json();
+                let status = job.status;
+                while (status === 'pending') {
+                    await new Promise(resolve => setTimeout(resolve, 500));
+                    const poll = await fetch(job.status_url);
+                    status = (await poll.json()).status;
+                }
+                response = await fetch(job.download_url);
+            }
+
             if (response.ok) {
                 const blob = await response.blob();
                 const url = window.URL.createObjectURL(blob);
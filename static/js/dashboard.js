@@ -1,11 +1,33 @@
 // Dashboard functionality
 
+// Rebuild row objects from a ?format=columnar listing (one array per field)
+function fromColumns(table) {
+    const rows = Array.from({ length: table.length }, () => ({}));
+    for (const [field, column] of Object.entries(table.columns)) {
+        const values = column && column.format === 'columnar' ? fromColumns(column) : column;
+        values.forEach((value, index) => {
+            if (value !== null) {
+                rows[index][field] = value;
+            }
+        });
+    }
+    return rows;
+}
+
 class Dashboard {
     constructor() {
         this.init();
     }
 
     init() {
+        this.searchQuery = '';
+        const searchInput = document.getElementById('conversationSearch');
+        if (searchInput) {
+            searchInput.addEventListener('input', () => {
+                clearTimeout(this.searchTimer);
+                this.searchTimer = setTimeout(() => this.search(searchInput.value.trim()), 150);
+            });
+        }
         this.loadDashboardStats();
         this.refreshInterval = setInterval(() => {
             this.loadDashboardStats();
@@ -14,12 +36,15 @@ class Dashboard {
 
     async loadDashboardStats() {
         try {
-            const response = await fetch('/api/dashboard-stats');
+            const response = await fetch('/api/dashboard-stats?format=columnar&fields=id,customer_name,loan_amount,status,timestamp');
             const data = await response.json();
 
             if (response.ok) {
                 this.updateStatsCards(data);
-                this.updateConversationsTable(data.conversations);
+                // Don't replace search results with the periodic refresh
+                if (!this.searchQuery) {
+                    this.updateConversationsTable(fromColumns(data.conversations));
+                }
             } else {
                 console.error('Failed to load dashboard stats:', data.error);
             }
@@ -28,6 +53,33 @@ class Dashboard {
         }
     }
 
+    async search(query) {
+        this.searchQuery = query;
+        if (!query) {
+            this.loadDashboardStats();
+            return;
+        }
+        try {
+            const response = await fetch(`/api/search?q=${encodeURIComponent(query)}&limit=50`);
+            const data = await response.json();
+
+            // Ignore responses to queries the user has already typed past
+            if (query !== this.searchQuery) {
+                return;
+            }
+            if (response.ok) {
+                this.updateConversationsTable(data.results.map(result => ({
+                    ...result,
+                    timestamp: result.updated_at
+                })));
+            } else {
+                console.error('Search failed:', data.error);
+            }
+        } catch (error) {
+            console.error('Error searching conversations:', error);
+        }
+    }
+
     updateStatsCards(data) {
         document.getElementById('totalConversations').textContent = data.total_conversations;
         document.getElementById('activeConversations').textContent = data.active_conversations;
@@ -0,0 +1,20 @@
+import importlib
+import os
+
+import pytest
+
+
+@pytest.fixture(scope='session')
+def app_module(tmp_path_factory):
+    """app.py with its stores in a scratch directory, mock agents and no background workers"""
+    workdir = tmp_path_factory.mktemp('app')
+    os.environ.update(GROQ_API_KEY='', VERIFICATION_WORKERS='0', SLIP_PARSE_WORKERS='0', PDF_WORKERS='0',
+                      TRACE_FILE='', ARCHIVE_INTERVAL='0')
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        module = importlib.import_module('app')
+        module.ensure_services()
+    finally:
+        os.chdir(cwd)
+    return module
@@ -0,0 +1,26 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = """
+import os, threading
+before = set(os.listdir('.'))
+import app
+print(sorted(set(os.listdir('.')) - before))
+print(sorted(t.name for t in threading.enumerate() if t is not threading.main_thread()))
+app.ensure_services()
+print(sorted(set(os.listdir('.')) - before))
+"""
+
+
+def test_importing_the_app_writes_no_files_and_starts_no_threads(tmp_path):
+    env = dict(os.environ, PYTHONPATH=ROOT, GROQ_API_KEY='', VERIFICATION_WORKERS='0', ARCHIVE_INTERVAL='0')
+    completed = subprocess.run([sys.executable, '-c', PROBE], cwd=tmp_path, env=env,
+                               capture_output=True, text=True, timeout=60)
+    assert completed.returncode == 0, completed.stderr
+    created_on_import, threads, created_on_init = completed.stdout.splitlines()[-3:]
+    assert created_on_import == '[]'
+    assert threads == '[]'
+    assert 'loan_applications.csv' in created_on_init and 'jobs.db' in created_on_init
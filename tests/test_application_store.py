@@ -0,0 +1,60 @@
+import csv
+import os
+
+import pytest
+
+from services.application_store import ApplicationStore, CsvShard
+from services.process_pools import mp_context
+
+HEADERS = ['conversation_id', 'customer_name', 'status']
+
+
+def write_csv(path, rows):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=HEADERS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def save_many(path, prefix, count):
+    shard = CsvShard(path, HEADERS)
+    for i in range(count):
+        shard.save({'conversation_id': f"{prefix}{i}", 'customer_name': 'Asha Rao', 'status': 'active'})
+
+
+def test_saves_from_several_processes_are_all_kept(tmp_path):
+    path = str(tmp_path / 'loan_applications.csv')
+    CsvShard(path, HEADERS)
+    context = mp_context()
+    workers = [context.Process(target=save_many, args=(path, prefix, 40)) for prefix in 'ab']
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    assert [worker.exitcode for worker in workers] == [0, 0]
+    assert len(list(CsvShard(path, HEADERS).rows())) == 80
+    assert not [name for name in os.listdir(tmp_path) if name.endswith('.tmp')]
+
+
+def test_switching_to_shards_migrates_the_single_csv(tmp_path):
+    legacy = str(tmp_path / 'loan_applications.csv')
+    rows = [{'conversation_id': str(i), 'customer_name': f"Customer {i}", 'status': 'active'} for i in range(20)]
+    write_csv(legacy, rows)
+
+    store = ApplicationStore.sharded(str(tmp_path / 'applications'), 4, HEADERS, legacy_csv=legacy)
+
+    assert sorted(row['conversation_id'] for row in store.iter_rows()) == sorted(row['conversation_id'] for row in rows)
+    assert store.get('7')['customer_name'] == 'Customer 7'
+    assert not os.path.exists(legacy) and os.path.exists(f"{legacy}.migrated")
+
+
+def test_shards_and_single_csv_both_holding_rows_refuse_to_open(tmp_path):
+    directory = str(tmp_path / 'applications')
+    ApplicationStore.sharded(directory, 4, HEADERS).save({'conversation_id': '1', 'customer_name': 'Asha Rao'})
+    legacy = str(tmp_path / 'loan_applications.csv')
+    write_csv(legacy, [{'conversation_id': '2', 'customer_name': 'Ravi Kumar', 'status': 'active'}])
+
+    with pytest.raises(ValueError, match='hold applications'):
+        ApplicationStore.sharded(directory, 4, HEADERS, legacy_csv=legacy)
+    assert os.path.exists(legacy)
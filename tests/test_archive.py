@@ -0,0 +1,52 @@
+import csv
+
+from services.archive import ApplicationArchive
+
+HEADERS = ['conversation_id', 'customer_name', 'status', 'created_at', 'updated_at']
+
+
+def write_csv(path, rows):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=HEADERS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def row(conversation_id, name, updated_at='2025-06-10T10:00:00', status='completed'):
+    return {'conversation_id': conversation_id, 'customer_name': name, 'status': status,
+            'created_at': updated_at, 'updated_at': updated_at}
+
+
+def test_rearchived_application_in_same_month_replaces_old_copy(tmp_path):
+    csv_file = tmp_path / 'loan_applications.csv'
+    archive = ApplicationArchive(tmp_path / 'archive')
+
+    write_csv(csv_file, [row('1', 'Old'), row('2', 'Other')])
+    assert archive.archive(str(csv_file), 30) == 2
+
+    # Reopened, saved again and finished within the same month
+    write_csv(csv_file, [row('1', 'New', updated_at='2025-06-20T10:00:00')])
+    assert archive.archive(str(csv_file), 30) == 1
+
+    assert archive.find('1')['customer_name'] == 'New'
+    assert sorted((r['conversation_id'], r['customer_name']) for r in archive.iter_rows()) == [('1', 'New'), ('2', 'Other')]
+    assert archive.stats()['rows'] == 2
+    assert archive.status_counts() == {'completed': 2}
+
+    reopened = ApplicationArchive(tmp_path / 'archive')
+    assert reopened.find('1')['customer_name'] == 'New'
+    assert reopened.stats()['rows'] == 2
+
+
+def test_rearchived_application_in_other_month_replaces_old_copy(tmp_path):
+    csv_file = tmp_path / 'loan_applications.csv'
+    archive = ApplicationArchive(tmp_path / 'archive')
+
+    write_csv(csv_file, [row('1', 'Old', updated_at='2025-05-10T10:00:00')])
+    archive.archive(str(csv_file), 30)
+    write_csv(csv_file, [row('1', 'New', updated_at='2025-06-10T10:00:00', status='rejected')])
+    archive.archive(str(csv_file), 30)
+
+    assert archive.find('1')['customer_name'] == 'New'
+    assert [r['customer_name'] for r in archive.iter_rows()] == ['New']
+    assert archive.status_counts() == {'rejected': 1}
@@ -0,0 +1,30 @@
+import csv
+import json
+
+import pytest
+
+from services.bulk_letters import select_applications
+
+HEADERS = ['conversation_id', 'status', 'updated_at', 'customer_data_json']
+
+
+def write_applications(path, ids):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=HEADERS)
+        writer.writeheader()
+        for conversation_id in ids:
+            writer.writerow({'conversation_id': conversation_id, 'status': 'completed',
+                             'updated_at': '2025-10-05T10:00:00', 'customer_data_json': json.dumps({'name': 'A'})})
+
+
+def test_after_resumes_from_the_next_application(tmp_path):
+    csv_file = str(tmp_path / 'loan_applications.csv')
+    write_applications(csv_file, ['1', '2', '3'])
+    assert [cid for cid, _ in select_applications(csv_file, after='1')] == ['2', '3']
+
+
+def test_unknown_after_cursor_is_an_error_not_an_empty_selection(tmp_path):
+    csv_file = str(tmp_path / 'loan_applications.csv')
+    write_applications(csv_file, ['1', '2', '3'])
+    with pytest.raises(ValueError):
+        list(select_applications(csv_file, after='nope'))
@@ -0,0 +1,17 @@
+from datetime import datetime, timedelta, timezone
+
+from services.ids import IdGenerator, id_bounds, in_bounds
+
+
+def test_id_bounds_converts_aware_times_to_utc():
+    ist = timezone(timedelta(hours=5, minutes=30))
+    naive = id_bounds(datetime(2025, 10, 17, 9, 30), '2025-10-17T10:00:00')
+    assert id_bounds(datetime(2025, 10, 17, 15, 0, tzinfo=ist), '2025-10-17T15:30:00+05:30') == naive
+    assert naive == ('20251017093000000', '20251017100000000')
+
+
+def test_ids_fall_inside_the_bounds_of_their_creation_time():
+    created = datetime(2025, 10, 17, 9, 45, tzinfo=timezone.utc)
+    conversation_id = IdGenerator(worker_id=7, clock=created.timestamp).next_id()
+    assert in_bounds(conversation_id, *id_bounds('2025-10-17T15:00:00+05:30', '2025-10-17T15:30:00+05:30'))
+    assert not in_bounds(conversation_id, *id_bounds('2025-10-17T09:00:00+05:30', '2025-10-17T09:30:00+05:30'))
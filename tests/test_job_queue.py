@@ -0,0 +1,78 @@
+import threading
+import time
+
+from services.job_queue import DEAD, DONE, RUNNING, JobQueue
+
+
+def wait_for(queue, job_id, status, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if queue.get(job_id)['status'] == status:
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def test_start_leaves_jobs_running_in_a_live_process_alone(tmp_path):
+    db = str(tmp_path / 'jobs.db')
+    release = threading.Event()
+    first = JobQueue(db, workers=1, poll_interval=0.02, lease=0.3)
+    first.register('slow', lambda payload: release.wait(5) and {'ok': True})
+    job_id = first.enqueue('slow', {})
+    assert wait_for(first, job_id, RUNNING)
+
+    # Another worker process starting up (e.g. after a gunicorn restart of a sibling)
+    second = JobQueue(db, workers=1, poll_interval=0.02, lease=0.3)
+    ran = []
+    second.register('slow', lambda payload: ran.append(payload) or {'ok': True})
+    second.start()
+    time.sleep(1)  # several lease periods; the heartbeat keeps the job owned
+    assert ran == []
+
+    release.set()
+    assert wait_for(first, job_id, DONE)
+    first.stop()
+    second.stop()
+
+
+def test_job_from_a_dead_process_is_claimed_after_its_lease_lapses(tmp_path):
+    db = str(tmp_path / 'jobs.db')
+    crashed = JobQueue(db, workers=0, lease=0.2)
+    job_id = crashed.enqueue('verify', {'n': 1})
+    # The process died mid-job: running, owned by nobody alive, lease not renewed
+    crashed._execute("UPDATE jobs SET status = ?, owner = 'gone', lease_until = ? WHERE id = ?",
+                     (RUNNING, time.time() + 0.2, job_id))
+    crashed.stop()
+
+    survivor = JobQueue(db, workers=1, poll_interval=0.02, lease=0.2)
+    survivor.register('verify', lambda payload: {'n': payload['n']})
+    survivor.start()
+    assert wait_for(survivor, job_id, DONE)
+    assert survivor.get(job_id)['result'] == {'n': 1}
+    survivor.stop()
+
+
+def test_dead_lettered_slip_leaves_the_application_pending_verification(app_module, tmp_path):
+    conversation_id = app_module.conversation_ids.next_id()
+    app_module.save_conversation_to_csv(conversation_id, {
+        'customer_data': {'name': 'Ravi Kumar', 'loan_amount': 400000},
+        'status': 'active', 'created_at': '2025-10-01T10:00:00', 'messages': [],
+    })
+    # Not loaded in this process, e.g. the worker restarted since the upload
+    app_module.conversations.pop(conversation_id, None)
+
+    def failing(payload):
+        raise OSError("parser crashed")
+
+    queue = JobQueue(str(tmp_path / 'jobs.db'), workers=1, max_attempts=1, poll_interval=0.02)
+    queue.register('salary_slip', failing, on_dead=app_module.mark_salary_slip_dead)
+    job_id = queue.enqueue('salary_slip', {'conversation_id': conversation_id, 'sha256': 'ab' * 32})
+    try:
+        assert wait_for(queue, job_id, DEAD)
+        deadline = time.monotonic() + 5
+        while app_module.application_store.get(conversation_id)['status'] != 'pending_verification':
+            assert time.monotonic() < deadline
+            time.sleep(0.02)
+        assert app_module.conversations[conversation_id]['status'] == 'pending_verification'
+    finally:
+        queue.stop()
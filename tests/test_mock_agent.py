@@ -0,0 +1,36 @@
+from agents.mock_agent import MockAgent
+
+
+def reply(message, customer_data=None):
+    conversation = {'customer_data': dict(customer_data or {})}
+    response = MockAgent('test').process_message(message, conversation, 'conv-1')
+    return response, conversation['customer_data']
+
+
+def test_name_prefix_alone_is_not_a_name():
+    for message in ("I am 32", "I am", "my name is"):
+        response, customer_data = reply(message)
+        assert 'name' not in customer_data
+        assert response['action'] == 'collect_name'
+
+
+def test_name_prefix_is_stripped_before_the_other_slots():
+    response, customer_data = reply("I am Rahul Sharma 32")
+    assert customer_data == {'name': 'Rahul Sharma', 'age': 32}
+    assert response['action'] == 'collect_city'
+
+
+def test_every_slot_a_message_fills_is_acknowledged():
+    response, customer_data = reply("Rahul, 32, Pune")
+    assert customer_data == {'name': 'Rahul', 'age': 32, 'city': 'Pune'}
+    assert response['message'].startswith(
+        "Thank you Rahul! Great! You're 32 years old. Thank you! You're from Pune.")
+    assert response['action'] == 'collect_phone'
+
+
+def test_slots_saved_before_an_invalid_value_are_acknowledged():
+    response, customer_data = reply("Rahul, 15, Pune")
+    assert customer_data == {'name': 'Rahul'}
+    assert response['message'].startswith("Thank you Rahul! ")
+    assert response['action'] == 'collect_age'
+    assert response['data'] == {'name': 'Rahul'}
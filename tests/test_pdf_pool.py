@@ -0,0 +1,85 @@
+import threading
+import time
+
+import pytest
+
+from services import pdf_pool
+from services.pdf_pool import PdfJobTimeout, PdfPool
+
+
+def test_on_success_receives_the_rendered_pdf():
+    pool = PdfPool(max_workers=1)
+    received = []
+    called = threading.Event()
+
+    def store(pdf_bytes):
+        received.append(pdf_bytes)
+        called.set()
+
+    job_id = pool.submit('sanction', {'name': 'Asha Rao', 'loan_amount': 200000}, on_success=store)
+    try:
+        assert called.wait(60)
+        assert received[0] == pool.result(job_id).getvalue()
+        assert received[0].startswith(b'%PDF')
+    finally:
+        pool.shutdown()
+
+
+def slow_render(layout, customer_data, today=None):
+    # Stands in for _render_bytes in the pool's worker processes
+    time.sleep(customer_data.get('seconds', 0))
+    return b'%PDF-' + layout.encode()
+
+
+def wait_for(condition, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def test_timed_out_job_stays_failed_and_frees_its_worker(monkeypatch):
+    monkeypatch.setattr(pdf_pool, '_render_bytes', slow_render)
+    pool = PdfPool(max_workers=1, timeout=2)
+    finished = []
+    try:
+        # Let the worker process start before timing anything
+        pool.result(pool.submit('warmup', {}))
+        job_id = pool.submit('stuck', {'seconds': 60}, on_success=finished.append)
+        assert wait_for(lambda: pool.status(job_id) == 'failed')
+        with pytest.raises(PdfJobTimeout):
+            pool.result(job_id)
+
+        # The stuck render no longer holds the only worker
+        assert pool.result(pool.submit('next', {}), timeout=10).getvalue() == b'%PDF-next'
+        assert pool.status(job_id) == 'failed'
+        assert finished == []
+    finally:
+        pool.shutdown()
+
+
+def test_concurrent_submits_with_one_job_id_render_once(monkeypatch):
+    monkeypatch.setattr(pdf_pool, '_render_bytes', slow_render)
+    pool = PdfPool(max_workers=2, timeout=30)
+    rendered = []
+    start = threading.Barrier(8)
+
+    def submit():
+        start.wait()
+        pool.submit('sanction', {'seconds': 0.5}, job_id='letter-key', on_success=rendered.append)
+
+    try:
+        threads = [threading.Thread(target=submit) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        pool.result('letter-key')
+        assert wait_for(lambda: rendered)
+        time.sleep(0.5)
+        assert rendered == [b'%PDF-sanction']
+        assert pool.stats()['jobs'] == 1
+    finally:
+        pool.shutdown()
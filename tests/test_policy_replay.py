@@ -0,0 +1,37 @@
+import contextlib
+import json
+from unittest import mock
+
+import pytest
+
+from agents.underwriting_policy import UnderwritingPolicy
+from services import policy_replay
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    (tmp_path / 'credit_scores.csv').write_text('customer_id,credit_score\nC1,650\nC2,760\n')
+    (tmp_path / 'offers.csv').write_text('customer_id,pre_approved_limit\nC1,300000\nC2,300000\n')
+    return str(tmp_path)
+
+
+def rows():
+    # Neither application reached underwriting, so both are decided from the reference tables
+    for conversation_id, customer_id in (('1', 'C1'), ('2', 'C2')):
+        yield {'conversation_id': conversation_id, 'loan_type': 'personal',
+               'customer_data_json': json.dumps({'customer_id': customer_id, 'loan_amount': 200000})}
+
+
+@pytest.mark.parametrize('fork', [True, False])
+def test_workers_decide_from_the_reference_tables(data_dir, fork):
+    baseline, candidate = UnderwritingPolicy(), UnderwritingPolicy(min_credit_score=600)
+    start_methods = contextlib.nullcontext() if fork else \
+        mock.patch('multiprocessing.get_all_start_methods', return_value=['spawn'])
+    with start_methods:
+        report = policy_replay.replay(rows(), baseline, candidate, workers=2, batch_size=1, data_dir=data_dir)
+
+    assert report.applications == 2
+    assert report.approved['baseline'][0] == 1
+    assert report.approved['candidate'][0] == 2
+    # The tables loaded for the forked workers are not left behind in this process
+    assert policy_replay._REFERENCE is None
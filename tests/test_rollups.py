@@ -0,0 +1,49 @@
+import threading
+
+from services.rollups import Rollups, tile_range, wall_seconds
+
+
+def test_tile_range_uses_days_for_the_aligned_middle():
+    start = wall_seconds('2025-06-01T10:30:00')
+    end = wall_seconds('2025-06-04T02:15:30')
+    assert tile_range(start, end) == [
+        ('minute', start, wall_seconds('2025-06-01T11:00:00')),
+        ('hour', wall_seconds('2025-06-01T11:00:00'), wall_seconds('2025-06-02T00:00:00')),
+        ('day', wall_seconds('2025-06-02T00:00:00'), wall_seconds('2025-06-04T00:00:00')),
+        ('hour', wall_seconds('2025-06-04T00:00:00'), wall_seconds('2025-06-04T02:00:00')),
+        ('minute', wall_seconds('2025-06-04T02:00:00'), end),
+    ]
+
+
+def test_totals_survive_minute_pruning(tmp_path):
+    rollups = Rollups(str(tmp_path / 'rollups.db'))
+    rollups.record('1', 'active', {'loan_type': 'personal'}, '2025-06-02T09:17:00')
+    rollups.record('2', 'active', {'loan_type': 'personal'}, '2025-06-03T23:59:00')
+    # What _maybe_prune leaves once the minute retention has passed
+    rollups._db.execute("DELETE FROM rollups WHERE granularity = 'minute'")
+
+    totals = rollups.totals('2025-06-01T10:30:00', '2025-06-04T02:15:30')
+    assert totals['applications'] == 2
+
+
+def test_writers_in_separate_processes_do_not_conflict(tmp_path):
+    # Two connections stand in for two gunicorn workers sharing rollups.db
+    path = str(tmp_path / 'rollups.db')
+    writers = [Rollups(path), Rollups(path)]
+    errors = []
+
+    def write(rollups, prefix):
+        try:
+            for i in range(200):
+                rollups.record(f"{prefix}{i}", 'active', {'loan_type': 'personal'}, '2025-06-02T09:17:00')
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=write, args=(rollups, prefix)) for rollups, prefix in zip(writers, 'ab')]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert writers[0].totals('2025-06-02T00:00:00', '2025-06-03T00:00:00')['applications'] == 400
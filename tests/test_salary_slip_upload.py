@@ -0,0 +1,61 @@
+import io
+import os
+from unittest import mock
+
+from agents.underwriting_agent import UnderwritingAgent
+
+# Smallest valid PNG header: enough for the upload's type sniffing
+PNG = b'\x89PNG\r\n\x1a\n' + b'\x00' * 64
+
+
+def new_conversation(app_module):
+    conversation_id = app_module.conversation_ids.next_id()
+    app_module.conversations[conversation_id] = {
+        'customer_data': {'name': 'Asha Rao', 'loan_amount': 500000, 'monthly_income': 60000},
+        'status': 'active', 'created_at': '2025-10-01T10:00:00', 'messages': [],
+    }
+    return conversation_id
+
+
+def upload(app_module, conversation_id, content, filename='slip.pdf'):
+    return app_module.app.test_client().post('/api/upload-salary-slip', data={
+        'conversation_id': conversation_id, 'file': (io.BytesIO(content), filename),
+    }, content_type='multipart/form-data')
+
+
+def leftover_parts(app_module):
+    return [name for name in os.listdir(app_module.upload_store.directory) if name.endswith('.part')]
+
+
+def test_image_slip_goes_to_manual_review(app_module):
+    conversation_id = new_conversation(app_module)
+    # The real underwriting agent, without a Groq client
+    agent = object.__new__(UnderwritingAgent)
+    with mock.patch.object(app_module, 'underwriting_agent', agent), \
+            mock.patch.object(app_module, '_agents_ready', True):
+        response = upload(app_module, conversation_id, PNG, 'slip.png')
+
+    assert response.status_code == 200
+    assert response.get_json()['status'] == 'manual_review'
+    assert app_module.conversations[conversation_id]['status'] == 'pending_verification'
+    assert app_module.application_store.get(conversation_id)['status'] == 'pending_verification'
+
+
+def test_oversized_body_is_refused_from_its_content_length(app_module, monkeypatch):
+    monkeypatch.setattr(app_module.upload_store, 'max_bytes', 1024)
+    monkeypatch.setattr(app_module.upload_store, 'open', mock.Mock(side_effect=AssertionError('body was read')))
+    content = b'%PDF-' + b'x' * (1024 + app_module.UPLOAD_FORM_OVERHEAD)
+    response = upload(app_module, new_conversation(app_module), content)
+    assert response.status_code == 413
+
+
+def test_upload_is_checked_while_it_is_parsed(app_module, monkeypatch):
+    monkeypatch.setattr(app_module.upload_store, 'max_bytes', 1024)
+    conversation_id = new_conversation(app_module)
+
+    # Under the Content-Length allowance, so only the streaming check catches it
+    response = upload(app_module, conversation_id, b'%PDF-' + b'x' * 2048)
+    assert response.status_code == 413
+    response = upload(app_module, conversation_id, b'GIF89a' + b'x' * 64, 'slip.gif')
+    assert response.status_code == 400
+    assert leftover_parts(app_module) == []
@@ -0,0 +1,32 @@
+import time
+
+import pytest
+
+from services import salary_slips
+from services.salary_slips import SlipExtractionTimeout, SlipExtractor
+
+
+def fake_parse(path):
+    # Stands in for parse_salary_slip in the pool's worker processes
+    if 'hang' in path:
+        time.sleep(60)
+    return {'net_salary': 85000, 'parser_version': 0}
+
+
+def test_hung_parse_is_dropped_and_frees_the_worker(monkeypatch, tmp_path):
+    monkeypatch.setattr(salary_slips, 'parse_salary_slip', fake_parse)
+    extractor = SlipExtractor(str(tmp_path), max_workers=1, timeout=2)
+    try:
+        # Let the worker process start before timing anything
+        assert extractor.extract('a' * 64, 'warmup.pdf')['net_salary'] == 85000
+
+        with pytest.raises(SlipExtractionTimeout):
+            extractor.extract('b' * 64, 'hang.pdf')
+        assert extractor.stats()['in_flight'] == 0
+
+        # The only worker was stuck on the hung slip; a new pool serves the next one
+        started = time.monotonic()
+        assert extractor.extract('c' * 64, 'next.pdf')['net_salary'] == 85000
+        assert time.monotonic() - started < 10
+    finally:
+        extractor.shutdown()
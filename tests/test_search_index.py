@@ -0,0 +1,73 @@
+from services import search_index
+from services.search_index import SearchIndex
+
+
+def summary(name, phone='', email='', city='', updated_at='2025-10-01T10:00:00'):
+    return (name, phone, email, city, 'personal', '500000', 'active', updated_at)
+
+
+def ids(index, query):
+    return [result['id'] for result in index.search(query)['results']]
+
+
+def built_index(*applications):
+    index = SearchIndex()
+    index.build(applications)
+    return index
+
+
+def test_exact_matches_and_stronger_fields_rank_first():
+    index = built_index(
+        ('city', summary('Asha Rao', city='Ramnagar')),
+        ('prefix', summary('Ramesh Iyer')),
+        ('exact', summary('Ram Kumar')),
+        ('email', summary('Kiran Shah', email='ram@example.com')),
+    )
+    # Exact email (8) > exact name (4) > prefix name (2) > prefix city (1)
+    assert ids(index, 'ram') == ['email', 'exact', 'prefix', 'city']
+
+
+def test_ties_go_to_the_most_recently_updated():
+    index = built_index(
+        ('older', summary('Priya Nair', updated_at='2025-10-01T10:00:00')),
+        ('newer', summary('Priya Menon', updated_at='2025-10-02T10:00:00')),
+    )
+    assert ids(index, 'priya') == ['newer', 'older']
+
+
+def test_prefix_matching_covers_every_word_and_phone_formats():
+    index = built_index(
+        ('1', summary('José Fernandes', phone='9876543210', city='Pune')),
+        ('2', summary('Joseph Dsouza', phone='9123456789', city='Mumbai')),
+    )
+    assert sorted(ids(index, 'jos')) == ['1', '2']
+    assert ids(index, 'jose pu') == ['1']
+    assert ids(index, '+91 98765 43210') == ['1']
+
+
+def test_resaved_application_is_found_only_by_its_new_fields():
+    index = built_index(('1', summary('Asha Rao', city='Pune')))
+    index.add('1', summary('Asha Rao', city='Nagpur', updated_at='2025-10-02T10:00:00'))
+    index.add('2', summary('Vikram Singh', city='Nagpur'))
+
+    assert ids(index, 'pune') == []
+    assert sorted(ids(index, 'nagpur')) == ['1', '2']
+    assert index.search('asha')['results'][0]['city'] == 'Nagpur'
+
+
+def test_terms_no_application_has_are_dropped(monkeypatch):
+    monkeypatch.setattr(search_index, 'RECENT_TERMS', 4)
+    index = built_index(('1', summary('Asha Rao')), ('2', summary('Asha Menon')))
+    index.remove('1')
+    index.remove('2')
+    assert index.stats()['terms'] == 0
+    assert ids(index, 'asha') == []
+
+    for i in range(10):
+        index.add(str(i), summary(f"Name{i}"))
+        index.remove(str(i))
+    # Removed terms are merged out of the sorted lists too, not just out of the postings
+    assert index.stats()['terms'] == 0
+    assert len(index._terms) + len(index._recent) < search_index.RECENT_TERMS
+    index.add('5', summary('Asha Rao'))
+    assert ids(index, 'as') == ['5']